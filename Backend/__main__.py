@@ -1,4 +1,4 @@
-from asyncio import get_event_loop, sleep as asleep
+from asyncio import get_event_loop
 import asyncio
 import logging
 from traceback import format_exc
@@ -11,6 +11,7 @@ from Backend.fastapi import server
 from Backend.helper.pyro import restart_notification, setup_bot_commands
 from Backend.pyrofork.bot import Helper, StreamBot
 from Backend.pyrofork.clients import initialize_clients
+from Backend.helper.custom_dl import warm_media_sessions
 from Backend.pyrofork.plugins.channels import _load_channels_from_db
 from Backend.helper.subscription_checker import subscription_checker_loop
 from Backend.helper.link_checker import DeadLinkChecker
@@ -19,33 +20,32 @@ from Backend.fastapi.main import app
 
 loop = get_event_loop()
 
+async def _start_stream_bots():
+    await StreamBot.start()
+    StreamBot.username = StreamBot.me.username
+    LOGGER.info(f"Bot Client : [@{StreamBot.username}]")
+
+    LOGGER.info("Initializing Multi Clients...")
+    await initialize_clients()
+
+
+async def _start_helper():
+    await Helper.start()
+    Helper.username = Helper.me.username
+    LOGGER.info(f"Helper Bot Client : [@{Helper.username}]")
+
+
 async def start_services():
     try:
         LOGGER.info(f"Initializing Telegram-Stremio v-{__version__}")
-        await asleep(1.2)
-        
+
         await db.connect()
-        await asleep(1.2)
-        
-        await StreamBot.start()
-        StreamBot.username = StreamBot.me.username
-        LOGGER.info(f"Bot Client : [@{StreamBot.username}]")
-        await asleep(1.2)
-
-        await Helper.start()
-        Helper.username = Helper.me.username
-        LOGGER.info(f"Helper Bot Client : [@{Helper.username}]")
-        await asleep(1.2)
-
-        LOGGER.info("Initializing Multi Clients...")
-        await initialize_clients()
-        await asleep(2)
-
-        await _load_channels_from_db()
-        await asleep(2)
-        
-        await setup_bot_commands(StreamBot)
-        await asleep(2)
+
+        # The bots are independent: log them in side by side, then warm their
+        # media sessions while the commands are set, so the server only starts
+        # taking streams once every bot can serve them.
+        await asyncio.gather(_start_stream_bots(), _start_helper(), _load_channels_from_db())
+        await asyncio.gather(setup_bot_commands(StreamBot), warm_media_sessions())
 
         LOGGER.info('Initializing Telegram-Stremio Web Server...')
         await restart_notification()
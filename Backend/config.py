@@ -14,6 +14,31 @@ class Telegram:
 
     PARALLEL = int(getenv("PARALLEL", "1"))
     PRE_FETCH = int(getenv("PRE_FETCH", "1"))
+    MAX_PRE_FETCH = int(getenv("MAX_PRE_FETCH", "16"))
+    STRIPE_CLIENTS = int(getenv("STRIPE_CLIENTS", "1"))
+    PLAYBACK_GRACE_SECONDS = int(getenv("PLAYBACK_GRACE_SECONDS", "20"))
+    PLAYBACK_READAHEAD_MB = int(getenv("PLAYBACK_READAHEAD_MB", "32"))
+    FILE_ID_CACHE_TTL = int(getenv("FILE_ID_CACHE_TTL", "1800"))
+    FILE_ID_CACHE_SIZE = int(getenv("FILE_ID_CACHE_SIZE", "20000"))
+    FILE_ID_STORE_TTL = int(getenv("FILE_ID_STORE_TTL", "86400"))
+    PERSIST_BOT_SESSIONS = getenv("PERSIST_BOT_SESSIONS", "false").lower() == "true"
+    TOKEN_CACHE_TTL = int(getenv("TOKEN_CACHE_TTL", "60"))
+    PROBE_CACHE_MB = int(getenv("PROBE_CACHE_MB", "64"))
+    MAX_GETFILE_PER_SESSION = int(getenv("MAX_GETFILE_PER_SESSION", "32"))
+    MEDIA_SESSIONS_PER_DC = int(getenv("MEDIA_SESSIONS_PER_DC", "2"))
+    MEDIA_SESSION_IDLE_SEC = int(getenv("MEDIA_SESSION_IDLE_SEC", "300"))
+    STREAM_RATE_LIMIT_MBPS = float(getenv("STREAM_RATE_LIMIT_MBPS", "0"))
+    TOKEN_RATE_LIMIT_MBPS = float(getenv("TOKEN_RATE_LIMIT_MBPS", "0"))
+    PROBE_INTERVAL = int(getenv("PROBE_INTERVAL", "120"))
+    PROBE_BUDGET_MB = float(getenv("PROBE_BUDGET_MB", "8"))
+    SHARD_TIMEOUT = float(getenv("SHARD_TIMEOUT", "10"))
+    CATALOG_COUNT_TTL = int(getenv("CATALOG_COUNT_TTL", "300"))
+    CATALOG_CACHE_TTL = int(getenv("CATALOG_CACHE_TTL", "600"))
+    CATALOG_WARM_PAGES = int(getenv("CATALOG_WARM_PAGES", "3"))
+    CHUNK_CACHE_MB = int(getenv("CHUNK_CACHE_MB", "256"))
+    CHUNK_DISK_CACHE_DIR = getenv("CHUNK_DISK_CACHE_DIR", "").strip()
+    CHUNK_DISK_CACHE_GB = float(getenv("CHUNK_DISK_CACHE_GB", "20"))
+    CHUNK_DISK_CACHE_POLICY = getenv("CHUNK_DISK_CACHE_POLICY", "lru").lower()
 
     AUTH_CHANNEL = [channel.strip() for channel in (getenv("AUTH_CHANNEL") or "").split(",") if channel.strip()]
     DATABASE = [db.strip() for db in (getenv("DATABASE") or "").split(",") if db.strip()]
@@ -6,7 +6,10 @@ from starlette.middleware.sessions import SessionMiddleware
 from Backend import __version__
 from Backend.fastapi.security.credentials import require_auth
 from Backend.fastapi.routes.stream_routes import router as stream_router, decay_client_failures
-from Backend.fastapi.routes.stremio_routes import router as stremio_router
+from Backend.helper.prober import client_prober
+from Backend.helper.session_pool import session_pool
+from Backend.fastapi.routes.stremio_routes import router as stremio_router, warm_catalogs
+from Backend.helper.catalog_cache import catalog_cache
 from Backend.fastapi.routes.template_routes import (
     login_page, login_post, logout, set_theme, dashboard_page,
     media_management_page, edit_media_page, public_status_page, stremio_guide_page,
@@ -18,7 +21,7 @@ from Backend.fastapi.routes.api_routes import (
     delete_tv_episode_api, delete_tv_season_api,
     create_token_api, revoke_token_api, update_token_limits_api,
     speed_test_api, speed_test_stream_api,
-    get_admin_stats_api, clear_cache_api, get_dead_links_api,
+    get_admin_stats_api, clear_cache_api, get_dead_links_api, get_index_report_api,
     get_stream_analytics_api, clear_stream_analytics_api,
     get_subscription_plans_api, add_subscription_plan_api,
     update_subscription_plan_api, delete_subscription_plan_api,
@@ -52,6 +55,9 @@ except Exception:
 async def _startup():
     import asyncio
     asyncio.create_task(decay_client_failures())
+    client_prober.start()
+    session_pool.start()
+    catalog_cache.start(warm_catalogs)
 
 # --- Include existing API routers ---
 app.include_router(stream_router)
@@ -173,6 +179,10 @@ async def admin_system_stats(_: bool = Depends(require_auth)):
 async def clear_cache(_: bool = Depends(require_auth)):
     return await clear_cache_api()
 
+@app.get("/api/admin/indexes")
+async def get_index_report(_: bool = Depends(require_auth)):
+    return await get_index_report_api()
+
 @app.get("/api/admin/dead-links")
 async def get_dead_links(_: bool = Depends(require_auth)):
     return await get_dead_links_api()
@@ -12,7 +12,7 @@ from Backend.helper.metadata import (
     fetch_selected_tv_metadata,
 )
 from Backend.pyrofork.bot import multi_clients, StreamBot
-from Backend.helper.custom_dl import run_speed_test, _speed_test_single_client
+from Backend.helper.prober import client_prober
 from time import time
 
 
@@ -238,6 +238,7 @@ async def update_token_limits_api(token: str, payload: dict):
     try:
         daily_limit = payload.get("daily_limit_gb")
         monthly_limit = payload.get("monthly_limit_gb")
+        rate_limit = payload.get("rate_limit_mbps")
         
         def parse_limit(val):
             try:
@@ -249,7 +250,8 @@ async def update_token_limits_api(token: str, payload: dict):
         result = await db.update_api_token_limits(
             token,
             parse_limit(daily_limit),
-            parse_limit(monthly_limit)
+            parse_limit(monthly_limit),
+            parse_limit(rate_limit)
         )
         
         if result:
@@ -281,7 +283,8 @@ async def speed_test_api(
 ):
     """
     Decode quality_id using the same decode_string logic as the stream handler,
-    then run a parallel download speed test across all connected bot clients.
+    then probe every connected bot client against that file. Speeds are the
+    bandwidth model's estimates, kept current by the background prober.
     """
     from Backend.helper.encrypt import decode_string
 
@@ -299,7 +302,7 @@ async def speed_test_api(
         # Stream handler adds -100 prefix for channel IDs
         chat_id = int(f"-100{raw_cid}")
 
-        results = await run_speed_test(int(chat_id), int(msg_id))
+        results = await client_prober.speed_test(int(chat_id), int(msg_id))
         return {"results": results, "total_clients_tested": len(results)}
 
     except HTTPException:
@@ -317,7 +320,7 @@ async def speed_test_stream_api(
     media_type: str,
 ):
     """
-    SSE version of the speed test. Streams each per-client result as a
+    SSE version of the speed test. Streams each per-client probe result as a
     'data:' event the moment that client finishes, so the UI can update live.
     """
     from Backend.helper.encrypt import decode_string
@@ -347,10 +350,9 @@ async def speed_test_stream_api(
         # Try to resolve the FileId to get the target DC
         target_dc = "?"
         try:
-            from Backend.helper.custom_dl import ByteStreamer
-            primary_client = multi_clients.get(0) or next(iter(multi_clients.values()))
-            streamer = ByteStreamer(primary_client)
-            file_id = await streamer.get_file_properties(chat_id, int(msg_id))
+            from Backend.helper.file_resolver import file_id_resolver
+            file_id = await file_id_resolver.resolve_any(chat_id, int(msg_id))
+            client_prober.remember(file_id)
             target_dc = file_id.dc_id
         except Exception:
             pass
@@ -361,19 +363,11 @@ async def speed_test_stream_api(
         # Run all clients in parallel; feed results into a queue as they finish
         queue: asyncio.Queue = asyncio.Queue()
 
-        async def run_one(client, idx):
-            async def on_progress(prog_data):
-                await queue.put({"type": "progress", "data": prog_data})
-                
-            result = await _speed_test_single_client(
-                client, idx, chat_id, int(msg_id), progress_callback=on_progress
-            )
+        async def run_one(idx):
+            result = await client_prober.probe(idx, chat_id, int(msg_id))
             await queue.put({"type": "result", "data": result})
 
-        tasks = [
-            asyncio.create_task(run_one(client, idx))
-            for idx, client in multi_clients.items()
-        ]
+        tasks = [asyncio.create_task(run_one(idx)) for idx in list(multi_clients)]
 
         completed = 0
         while completed < total:
@@ -414,10 +408,15 @@ async def speed_test_stream_api(
 
 async def get_admin_stats_api() -> dict:
     from Backend.pyrofork.bot import work_loads, multi_clients, client_failures, client_avg_mbps
-    from Backend.fastapi.routes.stream_routes import _streamer_by_client
+    from Backend.helper.file_resolver import file_id_resolver
+    from Backend.helper.bandwidth import bandwidth_model
+    from Backend.helper.session_pool import session_pool
+    from Backend.helper.shards import shard_fanout
+    from Backend.helper.catalog_pager import catalog_pager
+    from Backend.helper.catalog_cache import catalog_cache
     
-    # Sum cache entries across all active ByteStreamer instances
-    cache_size = sum(len(s._file_id_cache) for s in _streamer_by_client.values())
+    # FileId entries are shared by every ByteStreamer
+    cache_size = len(file_id_resolver)
     
     # Calculate bot workloads and health
     bot_stats = []
@@ -438,27 +437,40 @@ async def get_admin_stats_api() -> dict:
             "current_load": load,
             "failures": failures,
             "avg_mbps": round(mbps, 2),
+            "est_mbps": round(bandwidth_model.throughput(client_index), 2),
             "status": status
         })
         
     return {
         "cache_size": cache_size,
         "total_bots": len(multi_clients),
-        "bot_workloads": bot_stats
+        "bot_workloads": bot_stats,
+        "media_sessions": session_pool.stats(),
+        "storage_shards": shard_fanout.stats(),
+        "catalog_pager": catalog_pager.stats(),
+        "catalog_cache": catalog_cache.stats(),
     }
 
 async def clear_cache_api() -> dict:
-    from Backend.fastapi.routes.stream_routes import _streamer_by_client
+    from Backend.helper.file_resolver import file_id_resolver
+    from Backend.helper.catalog_cache import catalog_cache
     from Backend.logger import LOGGER
     
-    # Clear cache across all active ByteStreamer instances
-    total_cleared = sum(len(s._file_id_cache) for s in _streamer_by_client.values())
-    for streamer in _streamer_by_client.values():
-        streamer._file_id_cache.clear()
-    LOGGER.info(f"Admin cleared the FileId cache ({total_cleared} items purged across {len(_streamer_by_client)} clients).")
+    # Clear the FileId cache shared by all ByteStreamer instances, and its DB store
+    total_cleared = file_id_resolver.clear() + await file_id_resolver.clear_store()
+    total_cleared += catalog_cache.clear()
+    LOGGER.info(f"Admin cleared the FileId cache ({total_cleared} items purged).")
     
     return {"status": "success", "message": f"{total_cleared} cached items cleared."}
 
+async def get_index_report_api() -> dict:
+    from Backend.helper.indexes import index_manager
+
+    try:
+        return await index_manager.report(db.dbs)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 async def get_dead_links_api() -> dict:
     from Backend import db
     try:
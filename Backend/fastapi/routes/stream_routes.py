@@ -1,4 +1,3 @@
-import math
 import secrets
 import mimetypes
 import time
@@ -6,14 +5,26 @@ from typing import Dict
 
 from fastapi import APIRouter, Request, HTTPException, Depends
 from fastapi.responses import StreamingResponse, JSONResponse
+from starlette.background import BackgroundTask
 
 from collections import deque
 
 from Backend import db
 from Backend.helper.encrypt import decode_string
 from Backend.helper.exceptions import InvalidHash
-from Backend.helper.custom_dl import ByteStreamer, ACTIVE_STREAMS, RECENT_STREAMS, get_adaptive_chunk_size
-from Backend.pyrofork.bot import StreamBot, work_loads, multi_clients, client_dc_map, client_failures, client_avg_mbps
+from Backend.helper.custom_dl import ByteStreamer, ACTIVE_STREAMS, RECENT_STREAMS
+from Backend.helper.bandwidth import bandwidth_model
+from Backend.helper.playback import playback_sessions
+from Backend.helper.chunk_cache import chunk_cache
+from Backend.helper.disk_cache import disk_chunk_cache
+from Backend.helper.file_resolver import file_id_resolver
+from Backend.helper.probe_cache import probe_cache
+from Backend.helper.fetch_scheduler import fetch_scheduler
+from Backend.helper.shaper import bandwidth_shaper
+from Backend.helper.client_selection import pick_client, client_cost, client_scores
+from Backend.helper.token_cache import token_cache
+from Backend.helper.prober import client_prober
+from Backend.pyrofork.bot import work_loads, multi_clients, client_dc_map, client_failures, client_avg_mbps
 from Backend.config import Telegram
 from Backend.logger import LOGGER
 from Backend.fastapi.security.tokens import verify_token
@@ -89,37 +100,25 @@ def parse_range_header(range_header: str, file_size: int):
 
 
 def select_best_client(target_dc: int) -> int:
-    """Pick the best available client.
+    """Pick the bot to serve a new stream of a file stored in ``target_dc``.
 
-    Score = work_loads + 3 × client_failures
-    Failures are weighted 3× so a bot that has been timing out / erroring
-    is deprioritised even if its current workload is low.
-    DC-aware selection is kept but currently commented out (uncomment to
-    prefer same-DC bots).
+    Bots homed in the target DC are preferred. Among the candidates,
+    ``pick_client`` compares two at random by EWMA latency and the
+    throughput they have left after their running streams, with recent
+    failures scaling the cost up (see ``Backend.helper.client_selection``).
     """
-    def _score(idx: int) -> int:
-        return work_loads.get(idx, 0) + 3 * client_failures.get(idx, 0)
-
-    # --- DC-aware selection (Enabled) ---------------------------------------
     matching = [
         idx for idx, dc in client_dc_map.items()
         if dc == target_dc and idx in multi_clients
     ]
-    if matching:
-        selected = min(matching, key=_score)
-        LOGGER.debug("DC-match client %s (DC %s) score=%s", selected, target_dc, _score(selected))
-        return selected
-    # ------------------------------------------------------------------------
-
-    if multi_clients:
-        selected = min(multi_clients.keys(), key=_score)
-        LOGGER.debug(
-            "Selected client %s (DC %s) score=%s",
-            selected, client_dc_map.get(selected, "?"), _score(selected),
-        )
-        return selected
-
-    return 0
+    selected = pick_client(matching or multi_clients.keys(), target_dc)
+    if selected is None:
+        return 0
+    LOGGER.debug(
+        "Selected client %s (DC %s) for DC %s cost=%.3f",
+        selected, client_dc_map.get(selected, "?"), target_dc, client_cost(selected, target_dc),
+    )
+    return selected
 
 
 async def decay_client_failures() -> None:
@@ -206,6 +205,25 @@ async def track_usage_from_stats(stream_id: str, token: str, token_data: dict):
                     LOGGER.error(f"Cancelled usage update failed: {e}")
 
 
+async def charge_probe_read(token: str, token_data: dict, nbytes: int) -> None:
+    """Pace a probe-cache response through the token's bucket like a stream part."""
+    flow = bandwidth_shaper.flow(token, token_data)
+    if flow is None:
+        return
+    flow.open()
+    try:
+        await flow.throttle(nbytes)
+    finally:
+        flow.close()
+
+
+async def track_probe_usage(token: str, nbytes: int) -> None:
+    try:
+        await db.update_token_usage(token, nbytes)
+    except Exception as e:
+        LOGGER.error(f"Probe usage update failed: {e}")
+
+
 @router.get("/dl/{token}/{id}/{name}")
 @router.head("/dl/{token}/{id}/{name}")
 async def stream_handler(
@@ -221,9 +239,9 @@ async def stream_handler(
         raise HTTPException(status_code=400, detail="Missing id")
 
     chat_id = int(f"-100{decoded['chat_id']}")
-    message = await StreamBot.get_messages(chat_id, int(msg_id))
-    file = message.video or message.document
-    secure_hash = file.file_unique_id[:6]
+    # Served from the shared resolver cache; only a cold entry hits Telegram.
+    file_id = await file_id_resolver.resolve_any(chat_id, int(msg_id))
+    secure_hash = file_id.unique_id[:6]
 
     return await media_streamer(
         request=request,
@@ -244,18 +262,53 @@ async def media_streamer(
     token_data: dict = None,
     stream_id_hash: str = None,
 ):
-    temp_client = multi_clients[min(multi_clients.keys(), key=lambda i: work_loads.get(i, 0) + 3 * client_failures.get(i, 0))]
-    if temp_client not in _streamer_by_client:
-        idx = next((i for i, c in multi_clients.items() if c is temp_client), -1)
-        _streamer_by_client[temp_client] = ByteStreamer(temp_client, idx)
-    temp_streamer = _streamer_by_client[temp_client]
-
-    file_id = await temp_streamer.get_file_properties(chat_id=chat_id, message_id=msg_id)
+    file_id = await file_id_resolver.resolve_any(chat_id, msg_id)
+    client_prober.remember(file_id)
 
     if secure_hash != "SKIP_HASH_CHECK":  # Don't check this it is for my Webdav
         if file_id.unique_id[:6] != secure_hash:
             raise InvalidHash
 
+    # Size, name and type come from the cached FileId; HEAD requests and
+    # head/tail probe ranges are answered below without starting a stream.
+    file_size = file_id.file_size
+    range_header = request.headers.get("Range", "")
+    start, end = parse_range_header(range_header, file_size)
+    req_length = end - start + 1
+
+    file_name = file_id.file_name or f"{secrets.token_hex(4)}.bin"
+    mime_type = file_id.mime_type or mimetypes.guess_type(file_name)[0] or "application/octet-stream"
+
+    if "." not in file_name and "/" in mime_type:
+        file_name = f"{file_name}.{mime_type.split('/')[1]}"
+
+    # HEAD: return headers only (no body), include Content-Length so the
+    # client knows the file size without opening a stream.
+    # GET: do NOT set Content-Length on the StreamingResponse.
+    # If a Telegram chunk fetch times out mid-stream the generator exits early,
+    # delivering fewer bytes than the declared length.  h11 enforces
+    # Content-Length strictly and raises LocalProtocolError in that case.
+    # Without Content-Length, uvicorn uses chunked transfer encoding which
+    # handles early termination gracefully.  Stremio / media players
+    # are fine with chunked 206 responses.
+    headers = {
+        "Content-Type": mime_type,
+        "Content-Disposition": f'inline; filename="{file_name}"',
+        "Accept-Ranges": "bytes",
+        "Cache-Control": "public, max-age=3600",
+        "Access-Control-Allow-Origin": "*",
+        "Access-Control-Expose-Headers": "Content-Length, Content-Range, Accept-Ranges",
+    }
+    if range_header:
+        headers["Content-Range"] = f"bytes {start}-{end}/{file_size}"
+    status = 206 if range_header else 200
+
+    # HEAD request support
+    from fastapi.responses import Response as PlainResponse
+
+    if request.method == "HEAD":
+        return PlainResponse(status_code=status, headers={**headers, "Content-Length": str(req_length)})
+
     target_dc = file_id.dc_id
     LOGGER.debug(f"File msg_id={msg_id} is in DC {target_dc}")
 
@@ -263,20 +316,32 @@ async def media_streamer(
     tg_client = multi_clients[index]
 
     if tg_client not in _streamer_by_client:
-        _streamer_by_client[tg_client] = ByteStreamer(tg_client, index)
+        _streamer_by_client[tg_client] = ByteStreamer._instances.get(index) or ByteStreamer(tg_client, index)
     streamer: ByteStreamer = _streamer_by_client[tg_client]
 
-    file_size = file_id.file_size
-    range_header = request.headers.get("Range", "")
-    start, end = parse_range_header(range_header, file_size)
-    req_length = end - start + 1
-
-    # Adaptive chunk size based on this client's recent measured throughput
-    chunk_size = get_adaptive_chunk_size(index)
-    offset = start - (start % chunk_size)
-    first_part_cut = start - offset
-    last_part_cut = (end % chunk_size) + 1
-    part_count = math.ceil(end / chunk_size) - math.floor(offset / chunk_size)
+    # File references are per session: stream with the chosen bot's own FileId.
+    file_id = await streamer.get_file_properties(chat_id=chat_id, message_id=msg_id)
+
+    # Container probes in the head or tail of the file come from the probe cache.
+    # A region that cannot be read (timeout, RPC error) is streamed instead,
+    # with prefetch_stream's retries and failover.
+    if probe_cache.region(start, end, file_size):
+        try:
+            data = await probe_cache.read(
+                file_id.media_id, file_size, start, end,
+                lambda off, limit: streamer.read_bytes(file_id, off, limit),
+            )
+        except Exception as e:
+            LOGGER.warning(f"Probe read of msg_id={msg_id} bytes {start}-{end} failed, streaming it: {e!r}")
+            data = None
+        if data is not None:
+            # Served bytes count against the token's usage and bandwidth share
+            # like streamed ones; usage is written after the response is sent.
+            await charge_probe_read(token, token_data, len(data))
+            return PlainResponse(
+                content=data, status_code=status, headers=headers, media_type=mime_type,
+                background=BackgroundTask(track_probe_usage, token, len(data)) if data else None,
+            )
 
     from urllib.parse import unquote
     
@@ -301,79 +366,28 @@ async def media_streamer(
     }
 
     prefetch_count = Telegram.PARALLEL
-    parallelism = Telegram.PRE_FETCH
 
+    # Chunk size and in-flight depth come from this bot's bandwidth model and
+    # keep adapting while the stream runs; STRIPE_CLIENTS > 1 lets other
+    # same-DC bots share the stream.
     body_gen = await streamer.prefetch_stream(
         file_id=file_id,
         client_index=index,
-        offset=offset,
-        first_part_cut=first_part_cut,
-        last_part_cut=last_part_cut,
-        part_count=part_count,
-        chunk_size=chunk_size,
+        start=start,
+        end=end,
         prefetch=prefetch_count,
         stream_id=stream_id,
         meta=meta,
-        parallelism=parallelism,
         request=request,
+        stripe=Telegram.STRIPE_CLIENTS,
+        # Consecutive Range requests of one viewer share their read-ahead.
+        playback=playback_sessions.get(token, chat_id, msg_id, file_size),
+        # Pace delivery to the token's share of the bandwidth budget.
+        flow=bandwidth_shaper.flow(token, token_data),
     )
 
     asyncio.create_task(track_usage_from_stats(stream_id, token, token_data))
 
-    file_name = file_id.file_name or f"{secrets.token_hex(4)}.bin"
-    mime_type = file_id.mime_type or mimetypes.guess_type(file_name)[0] or "application/octet-stream"
-
-    if "." not in file_name and "/" in mime_type:
-        file_name = f"{file_name}.{mime_type.split('/')[1]}"
-
-    # HEAD: return headers only (no body), include Content-Length so the
-    # client knows the file size without opening a stream.
-    # GET: do NOT set Content-Length on the StreamingResponse.
-    # If a Telegram chunk fetch times out mid-stream the generator exits early,
-    # delivering fewer bytes than the declared length.  h11 enforces
-    # Content-Length strictly and raises LocalProtocolError in that case.
-    # Without Content-Length, uvicorn uses chunked transfer encoding which
-    # handles early termination gracefully.  Stremio / media players
-    # are fine with chunked 206 responses.
-
-    # HEAD request support
-    from fastapi.responses import Response as PlainResponse
-
-    if request.method == "HEAD":
-        headers = {
-            "Content-Type": mime_type,
-            "Content-Length": str(req_length),
-            "Content-Disposition": f'inline; filename="{file_name}"',
-            "Accept-Ranges": "bytes",
-            "Cache-Control": "public, max-age=3600",
-            "Access-Control-Allow-Origin": "*",
-            "Access-Control-Expose-Headers": "Content-Length, Content-Range, Accept-Ranges",
-        }
-
-        if range_header:
-            headers["Content-Range"] = f"bytes {start}-{end}/{file_size}"
-
-        return PlainResponse(
-            status_code=206 if range_header else 200,
-            headers=headers,
-        )
-
-    headers = {
-        "Content-Type": mime_type,
-        "Content-Disposition": f'inline; filename="{file_name}"',
-        "Accept-Ranges": "bytes",
-        "Content-Length": str(req_length),
-        "Cache-Control": "public, max-age=3600",
-        "Access-Control-Allow-Origin": "*",
-        "Access-Control-Expose-Headers": "Content-Length, Content-Range, Accept-Ranges",
-    }
-
-    if range_header:
-        headers["Content-Range"] = f"bytes {start}-{end}/{file_size}"
-        status = 206
-    else:
-        status = 200
-
     return StreamingResponse(
         body_gen,
         headers=headers,
@@ -434,6 +448,9 @@ async def get_stream_stats():
                 "instant_mbps": round(info.get("instant_mbps", 0.0), 3),
                 "avg_mbps": round(info.get("avg_mbps", 0.0), 3),
                 "peak_mbps": round(info.get("peak_mbps", 0.0), 3),
+                "chunk_size": info.get("chunk_size"),
+                "parallelism": info.get("parallelism"),
+                "stripe": info.get("stripe"),
                 "start_ts": info.get("start_ts"),
             }
         )
@@ -463,6 +480,17 @@ async def get_stream_stats():
             "recent_streams": recent,
             "client_dc_map": client_dc_map,
             "work_loads": work_loads,
+            "chunk_cache": chunk_cache.stats(),
+            "disk_cache": disk_chunk_cache.stats(),
+            "file_id_cache": file_id_resolver.stats(),
+            "bandwidth_model": bandwidth_model.stats(),
+            "playback": playback_sessions.stats(),
+            "token_cache": token_cache.stats(),
+            "probe_cache": probe_cache.stats(),
+            "fetch_scheduler": fetch_scheduler.stats(),
+            "shaper": bandwidth_shaper.stats(),
+            "client_selection": client_scores(multi_clients, client_dc_map),
+            "prober": client_prober.stats(),
         }
     )
 
@@ -1,4 +1,6 @@
+import json
 from fastapi import APIRouter, HTTPException, Depends
+from fastapi.responses import Response
 from typing import Optional
 from urllib.parse import unquote
 from Backend.config import Telegram
@@ -7,6 +9,8 @@ import PTN
 from datetime import datetime, timezone, timedelta
 from Backend.fastapi.security.tokens import verify_token
 from Backend.helper.kitsu import get_animeapi_mappings
+from Backend.helper.catalog_cache import catalog_cache
+from Backend.logger import LOGGER
 
 
 # --- Kitsu ID support ---------------------------------------------------
@@ -107,6 +111,9 @@ BASE_URL = Telegram.BASE_URL
 ADDON_NAME = "Telegram"
 ADDON_VERSION = __version__
 PAGE_SIZE = 15
+# Catalog ids from the manifest, per Stremio type, and how many pages of each are kept warm.
+CATALOG_IDS = {"movie": ["latest_movies", "top_movies"], "series": ["latest_series", "top_series"]}
+CATALOG_WARM_PAGES = Telegram.CATALOG_WARM_PAGES
 
 router = APIRouter(prefix="/stremio", tags=["Stremio Addon"])
 
@@ -263,8 +270,10 @@ async def get_manifest(token: str, token_data: dict = Depends(verify_token)):
         user_id = token_data.get("user_id")
         if user_id:
             from Backend import db as _db
+            from Backend.helper.token_cache import token_cache
             try:
-                user = await _db.get_user(int(user_id))
+                # verify_token has just loaded this user; reuse its cache entry.
+                user = await token_cache.user(int(user_id), _db.get_user)
                 if user and user.get("subscription_status") == "active":
                     expiry_obj = user.get("subscription_expiry")
                     if expiry_obj:
@@ -499,26 +508,20 @@ async def get_catalog(token: str, media_type: str, id: str, extra: Optional[str]
 
     page = (stremio_skip // PAGE_SIZE) + 1
 
-    try:
-        if search_query:
-            search_results = await db.search_documents(query=search_query, page=page, page_size=PAGE_SIZE)
-            all_items = search_results.get("results", [])
-            db_media_type = "tv" if media_type == "series" else "movie"
-            items = [item for item in all_items if item.get("media_type") == db_media_type]
-        else:
-            if "latest" in id:
-                sort_params = [("updated_on", "desc")]
-            elif "top" in id:
-                sort_params = [("rating", "desc")]
-            else:
-                sort_params = [("updated_on", "desc")]
+    if not search_query:
+        # Catalog pages are the same for every token: served from the shared cache.
+        key = (media_type, id, genre_filter, (page - 1) * PAGE_SIZE)
+        try:
+            body = await catalog_cache.get(key, build_catalog_page, media_type, id, genre_filter, page)
+        except Exception:
+            return {"metas": []}
+        return Response(content=body, media_type="application/json")
 
-            if media_type == "movie":
-                data = await db.sort_movies(sort_params, page, PAGE_SIZE, genre_filter=genre_filter)
-                items = data.get("movies", [])
-            else:
-                data = await db.sort_tv_shows(sort_params, page, PAGE_SIZE, genre_filter=genre_filter)
-                items = data.get("tv_shows", [])
+    try:
+        search_results = await db.search_documents(query=search_query, page=page, page_size=PAGE_SIZE)
+        all_items = search_results.get("results", [])
+        db_media_type = "tv" if media_type == "series" else "movie"
+        items = [item for item in all_items if item.get("media_type") == db_media_type]
     except Exception as e:
         return {"metas": []}
 
@@ -526,6 +529,44 @@ async def get_catalog(token: str, media_type: str, id: str, extra: Optional[str]
     return {"metas": metas}
 
 
+async def build_catalog_page(media_type: str, id: str, genre_filter: Optional[str], page: int) -> bytes:
+    """Serialized ``{"metas": [...]}`` of one catalog page, independent of the token."""
+    if "latest" in id:
+        sort_params = [("updated_on", "desc")]
+    elif "top" in id:
+        sort_params = [("rating", "desc")]
+    else:
+        sort_params = [("updated_on", "desc")]
+
+    if media_type == "movie":
+        data = await db.sort_movies(sort_params, page, PAGE_SIZE, genre_filter=genre_filter)
+        items = data.get("movies", [])
+    else:
+        data = await db.sort_tv_shows(sort_params, page, PAGE_SIZE, genre_filter=genre_filter)
+        items = data.get("tv_shows", [])
+
+    metas = [convert_to_stremio_meta(item) for item in items]
+    return json.dumps({"metas": metas}, ensure_ascii=False, separators=(",", ":"), default=str).encode()
+
+
+async def warm_catalogs() -> int:
+    """Build the first ``CATALOG_WARM_PAGES`` pages of every catalog into the cache."""
+    if Telegram.HIDE_CATALOG:
+        return 0
+    warmed = 0
+    for media_type, catalog_ids in CATALOG_IDS.items():
+        for catalog_id in catalog_ids:
+            for page in range(1, CATALOG_WARM_PAGES + 1):
+                key = (media_type, catalog_id, None, (page - 1) * PAGE_SIZE)
+                try:
+                    await catalog_cache.get(key, build_catalog_page, media_type, catalog_id, None, page)
+                    warmed += 1
+                except Exception as e:
+                    LOGGER.warning(f"Could not warm catalog {catalog_id} page {page}: {e}")
+                    break
+    return warmed
+
+
 @router.get("/{token}/meta/{media_type}/{id}.json")
 async def get_meta(token: str, media_type: str, id: str, token_data: dict = Depends(verify_token)):
     if Telegram.HIDE_CATALOG:
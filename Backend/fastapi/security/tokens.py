@@ -2,6 +2,7 @@ from fastapi import HTTPException
 from datetime import datetime
 from Backend import db
 from Backend.config import Telegram
+from Backend.helper.token_cache import token_cache
 
 DAILY_LIMIT_VIDEO = "https://bit.ly/3YZFKT5"
 MONTHLY_LIMIT_VIDEO = "https://bit.ly/4rfjtgd"
@@ -9,7 +10,9 @@ SUBSCRIPTION_EXPIRED_VIDEO = "https://bit.ly/4rfjtgd"
 
 
 async def verify_token(token: str):
-    token_data = await db.get_api_token(token)
+    # Served from token_cache; usage there includes bytes streamed since the
+    # document was loaded, so limits are checked without re-reading Mongo.
+    token_data = await token_cache.token(token, db.get_api_token)
     if not token_data:
         raise HTTPException(status_code=401, detail="Invalid or expired API token")
 
@@ -28,7 +31,7 @@ async def verify_token(token: str):
             token_data["subscription_expired"] = True
             return token_data
 
-        user = await db.get_user(int(user_id))
+        user = await token_cache.user(int(user_id), db.get_user)
         if not user or user.get("subscription_status") != "active":
             token_data["subscription_expired"] = True
             return token_data
@@ -0,0 +1,216 @@
+import time
+from typing import Dict, Optional, Tuple
+
+from Backend.config import Telegram
+
+LinkKey = Tuple[int, int]  # (client_index, dc_id)
+
+
+class _LinkEstimate:
+    __slots__ = (
+        "goodput", "latency", "base_latency", "chunk_size", "depth", "samples", "updated",
+        "window_start", "window_bytes", "delivered", "peak", "peak_at",
+    )
+
+    def __init__(self, chunk_size: int, depth: float):
+        self.goodput = 0.0          # bytes/s of a single GetFile request (EWMA)
+        self.latency = 0.0          # seconds per GetFile request (EWMA)
+        self.base_latency = 0.0     # best recent latency, i.e. an unloaded link
+        self.chunk_size = chunk_size
+        self.depth = depth
+        self.samples = 0
+        self.updated = 0.0
+        self.window_start = 0.0     # the link's delivered-bytes meter
+        self.window_bytes = 0
+        self.delivered = 0.0        # bytes/s fetched over the last full window, all streams
+        self.peak = 0.0             # highest ``delivered`` seen, decaying
+        self.peak_at = 0.0
+
+
+class BandwidthModel:
+    """Online throughput/latency estimate per ``(client_index, dc_id)``.
+
+    The stream consumer feeds it one sample per chunk fetched from Telegram.
+    Chunk size follows per-request goodput: a request should take about
+    ``TARGET_FETCH_SECONDS`` so slow links are not stuck behind 1 MB requests
+    while fast links get the largest ``limit`` Telegram accepts. In-flight
+    depth is delay based: while latency stays close to the best seen the link
+    has headroom and depth grows by one per round-trip; once requests start
+    queueing and latency inflates, depth is halved per round-trip.
+
+    Every sample also goes into a per-link meter of the bytes fetched over
+    ``RATE_WINDOW`` seconds by all of the link's streams together. Its decaying
+    peak is the link's observed capacity, so ``capacity - delivered`` is the
+    throughput a bot has left.
+    """
+
+    MIN_CHUNK = 64 * 1024
+    MAX_CHUNK = 1024 * 1024  # upload.GetFile rejects a larger limit
+    DEFAULT_CHUNK = 512 * 1024
+    TARGET_FETCH_SECONDS = 0.25
+    ALPHA = 0.2
+    GROW_BELOW = 1.5   # latency / base_latency under which depth grows
+    SHRINK_ABOVE = 2.5  # latency / base_latency over which depth shrinks
+    RATE_WINDOW = 2.0   # seconds per reading of a link's delivered bytes
+    PEAK_HALF_LIFE = 60.0  # seconds for an observed capacity no longer reached to halve
+
+    def __init__(self, initial_depth: int, max_depth: int):
+        self.max_depth = max(1, max_depth)
+        self.initial_depth = min(self.max_depth, max(2, initial_depth))
+        self._links: Dict[LinkKey, _LinkEstimate] = {}
+        self.clock = time.time
+
+    def _link(self, client_index: int, dc_id: int) -> _LinkEstimate:
+        key = (client_index, dc_id)
+        est = self._links.get(key)
+        if est is None:
+            est = self._links[key] = _LinkEstimate(self.DEFAULT_CHUNK, float(self.initial_depth))
+        return est
+
+    def observe(self, client_index: int, dc_id: int, nbytes: int, latency: float) -> None:
+        """Record one successful GetFile of ``nbytes`` that took ``latency`` seconds."""
+        if nbytes <= 0 or latency <= 0:
+            return
+        est = self._link(client_index, dc_id)
+        rate = nbytes / latency
+        now = est.updated = self.clock()
+        self._meter(est, nbytes, now)
+
+        est.goodput = rate if est.samples == 0 else est.goodput + self.ALPHA * (rate - est.goodput)
+        if est.latency == 0:
+            est.latency = latency
+            est.base_latency = min(est.base_latency, latency) if est.base_latency else latency
+        else:
+            est.latency += self.ALPHA * (latency - est.latency)
+            if latency < est.base_latency:
+                est.base_latency = latency
+            elif est.depth <= 1.0:
+                # Nothing of ours is queueing at depth 1, so a persistently
+                # higher latency means the path itself got slower: re-learn it.
+                est.base_latency += 0.05 * (latency - est.base_latency)
+        est.samples += 1
+
+        # Only full chunks of the current size say anything about queueing;
+        # tails and chunks planned before a resize would skew the ratio.
+        if nbytes == est.chunk_size and est.base_latency > 0:
+            ratio = est.latency / est.base_latency
+            if ratio < self.GROW_BELOW:
+                est.depth = min(float(self.max_depth), est.depth + 1.0 / est.depth)
+            elif ratio > self.SHRINK_ABOVE:
+                est.depth = max(1.0, est.depth - 0.5)
+
+        self._resize(est)
+
+    def _meter(self, est: _LinkEstimate, nbytes: int, now: float) -> None:
+        if not est.window_start or now - est.window_start > 2 * self.RATE_WINDOW:
+            # First sample, or the link sat idle: start a fresh window.
+            est.window_start, est.window_bytes = now, 0
+        est.window_bytes += nbytes
+        elapsed = now - est.window_start
+        if elapsed < self.RATE_WINDOW:
+            return
+        est.delivered = est.window_bytes / elapsed
+        if est.base_latency and est.latency > self.SHRINK_ABOVE * est.base_latency:
+            # Requests are queueing, so the link moves all it can right now.
+            est.peak = est.delivered
+        else:
+            est.peak = max(est.delivered, self._decayed_peak(est, now))
+        est.peak_at = now
+        est.window_start, est.window_bytes = now, 0
+
+    def _decayed_peak(self, est: _LinkEstimate, now: float) -> float:
+        return est.peak * 0.5 ** (max(0.0, now - est.peak_at) / self.PEAK_HALF_LIFE)
+
+    def _resize(self, est: _LinkEstimate) -> None:
+        ideal = est.goodput * self.TARGET_FETCH_SECONDS
+        chunk_size = est.chunk_size
+        if ideal >= 2 * chunk_size:
+            while chunk_size < self.MAX_CHUNK and chunk_size * 2 <= ideal:
+                chunk_size *= 2
+        elif ideal < chunk_size / 2:
+            while chunk_size > self.MIN_CHUNK and chunk_size > ideal:
+                chunk_size //= 2
+        if chunk_size == est.chunk_size:
+            return
+
+        # Keep roughly the same number of bytes in flight. Smaller requests
+        # finish sooner, so scale the unloaded latency down with them; the
+        # latency average restarts from the first sample of the new size.
+        if chunk_size < est.chunk_size:
+            est.base_latency *= chunk_size / est.chunk_size
+        est.depth = min(float(self.max_depth), max(1.0, est.depth * est.chunk_size / chunk_size))
+        est.chunk_size = chunk_size
+        est.latency = 0.0
+
+    def plan(self, client_index: int, dc_id: int) -> Tuple[int, int]:
+        """Return ``(chunk_size, depth)`` to use for the next requests on this link."""
+        est = self._links.get((client_index, dc_id))
+        if est is None:
+            return self.DEFAULT_CHUNK, self.initial_depth
+        return est.chunk_size, max(1, round(est.depth))
+
+    def throughput(self, client_index: int, dc_id: Optional[int] = None) -> float:
+        """Best current estimate of achievable MB/s for a client (any DC if ``dc_id`` is None)."""
+        best = 0.0
+        for (idx, dc), est in self._links.items():
+            if idx == client_index and (dc_id is None or dc == dc_id) and est.samples:
+                best = max(best, est.goodput * est.depth)
+        return best / (1024 * 1024)
+
+    def delivered(self, client_index: int, dc_id: int) -> float:
+        """MB/s the link's streams fetched over the last window; 0 once it sits idle."""
+        est = self._links.get((client_index, dc_id))
+        if est is None or self.clock() - est.updated > 2 * self.RATE_WINDOW:
+            return 0.0
+        return est.delivered / (1024 * 1024)
+
+    def capacity(self, client_index: int, dc_id: int) -> float:
+        """Observed MB/s capacity of the link: its decaying peak of ``delivered``,
+        at least what one stream gets. 0 before the first sample.
+        """
+        est = self._links.get((client_index, dc_id))
+        if est is None or not est.samples:
+            return 0.0
+        peak = max(self._decayed_peak(est, self.clock()), est.goodput * est.depth)
+        return peak / (1024 * 1024)
+
+    def latency(self, client_index: int, dc_id: int) -> Optional[float]:
+        """EWMA seconds per GetFile on this link, or None before the first sample."""
+        est = self._links.get((client_index, dc_id))
+        if est is None or not est.samples:
+            return None
+        return est.latency or est.base_latency
+
+    def idle_for(self, client_index: int, dc_id: int) -> Optional[float]:
+        """Seconds since the last sample on this link, or None if it has none."""
+        est = self._links.get((client_index, dc_id))
+        if est is None or not est.updated:
+            return None
+        return self.clock() - est.updated
+
+    def forget(self, client_index: int) -> None:
+        for key in [k for k in self._links if k[0] == client_index]:
+            del self._links[key]
+
+    def stats(self) -> list:
+        now = self.clock()
+        return [
+            {
+                "client_index": idx,
+                "dc_id": dc,
+                "chunk_kb": est.chunk_size // 1024,
+                "depth": round(est.depth, 2),
+                "goodput_mbps": round(est.goodput / (1024 * 1024), 3),
+                "est_mbps": round(est.goodput * est.depth / (1024 * 1024), 3),
+                "delivered_mbps": round(self.delivered(idx, dc), 3),
+                "capacity_mbps": round(self.capacity(idx, dc), 3),
+                "latency_ms": round(est.latency * 1000, 1),
+                "base_latency_ms": round(est.base_latency * 1000, 1),
+                "samples": est.samples,
+                "idle_sec": round(now - est.updated, 1) if est.updated else None,
+            }
+            for (idx, dc), est in sorted(self._links.items())
+        ]
+
+
+bandwidth_model = BandwidthModel(Telegram.PRE_FETCH, Telegram.MAX_PRE_FETCH)
@@ -0,0 +1,169 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from Backend.config import Telegram
+from Backend.logger import LOGGER
+
+Builder = Callable[..., Awaitable[bytes]]
+Warmer = Callable[[], Awaitable[int]]
+
+MAX_ENTRIES = 2000
+# Quiet period after the last change before the first pages are rebuilt, so
+# a scan adding hundreds of files triggers one rebuild, not hundreds.
+REWARM_DELAY = 5.0
+
+# Database collection -> Stremio catalog type
+CATALOG_TYPES = {"movie": "movie", "tv": "series"}
+
+
+class CatalogCache:
+    """Serialized Stremio catalog pages shared by every token.
+
+    Catalog content does not depend on who asks, so a page is built once
+    (shard queries and meta conversion included) and its JSON bytes are
+    served to everyone. Keys start with the Stremio type; a change to a
+    movie or show bumps that type's generation, drops its pages and, after
+    ``REWARM_DELAY`` seconds without further changes, rebuilds the first
+    pages through the registered warmer. A build that raced with a change
+    is returned but not stored. ``ttl`` bounds how stale a page can get
+    after writes that bypass the Database methods.
+    """
+
+    def __init__(self, ttl: int):
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, Tuple[bytes, float]]" = OrderedDict()
+        self._in_flight: Dict[Hashable, asyncio.Future] = {}
+        self._generations: Dict[str, int] = {}
+        self._warmer: Optional[Warmer] = None
+        self._rewarm_task: Optional[asyncio.Task] = None
+        self._warm_task: Optional[asyncio.Task] = None
+        self._rewarm_at = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.warmed = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def get(self, key: Tuple, builder: Builder, *args) -> bytes:
+        """Cached bytes for ``key`` (whose first item is the catalog type), built on a miss."""
+        if not self.enabled:
+            return await builder(*args)
+
+        while True:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+
+            pending = self._in_flight.get(key)
+            if pending is None:
+                break
+            self.hits += 1
+            try:
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                # The Stremio client that started this build went away but we
+                # did not: look again, and build the page ourselves if nobody
+                # else already does.
+                if not pending.cancelled() or asyncio.current_task().cancelling():
+                    raise
+
+        self.misses += 1
+        generation = self._generations.get(key[0], 0)
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            body = await builder(*args)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # nobody may be waiting; mark as retrieved
+            raise
+        finally:
+            if self._in_flight.get(key) is future:
+                del self._in_flight[key]
+
+        if self._generations.get(key[0], 0) == generation:
+            self._entries[key] = (body, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > MAX_ENTRIES:
+                self._entries.popitem(last=False)
+        future.set_result(body)
+        return body
+
+    def invalidate(self, collection_name: str) -> None:
+        """Drop every page of the catalog type backed by ``collection_name``."""
+        catalog_type = CATALOG_TYPES.get(collection_name, collection_name)
+        self._generations[catalog_type] = self._generations.get(catalog_type, 0) + 1
+        for key in [k for k in self._entries if k[0] == catalog_type]:
+            del self._entries[key]
+        self.invalidations += 1
+        self._schedule_rewarm()
+
+    def clear(self) -> int:
+        for catalog_type in set(CATALOG_TYPES.values()):
+            self._generations[catalog_type] = self._generations.get(catalog_type, 0) + 1
+        count = len(self._entries)
+        self._entries.clear()
+        return count
+
+    def start(self, warmer: Warmer) -> None:
+        """Register the function that rebuilds the first pages and run it once."""
+        self._warmer = warmer
+        if self.enabled:
+            self._warm_task = asyncio.create_task(self._warm())
+
+    def _schedule_rewarm(self) -> None:
+        if not self.enabled or self._warmer is None:
+            return
+        self._rewarm_at = time.monotonic() + REWARM_DELAY
+        if self._rewarm_task is not None and not self._rewarm_task.done():
+            return  # the pending rewarm waits for the new deadline
+        try:
+            self._rewarm_task = asyncio.get_running_loop().create_task(self._rewarm())
+        except RuntimeError:
+            self._rewarm_task = None  # no running loop (e.g. a maintenance script)
+
+    async def _rewarm(self) -> None:
+        while True:
+            wait = self._rewarm_at - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+                continue
+            deadline = self._rewarm_at
+            await self._warm()
+            if self._rewarm_at == deadline:
+                return  # nothing changed while warming
+
+    async def _warm(self) -> None:
+        try:
+            self.warmed += await self._warmer()
+        except Exception as e:
+            LOGGER.error(f"Error warming catalog cache: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "ttl_sec": self.ttl,
+            "entries": len(self._entries),
+            "bytes": sum(len(body) for body, _ in self._entries.values()),
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "warmed_pages": self.warmed,
+            "generations": dict(self._generations),
+        }
+
+
+catalog_cache = CatalogCache(Telegram.CATALOG_CACHE_TTL)
@@ -0,0 +1,132 @@
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from pymongo import ASCENDING
+
+from Backend.config import Telegram
+
+# (sort value, _id) of the last item served; the next page starts after it.
+Position = Tuple[Any, Any]
+
+MAX_SCOPES = 256
+MAX_POSITIONS_PER_SCOPE = 2000
+# Most documents one storage DB returns per read while walking to an unremembered skip.
+CATALOG_WALK_BATCH = 200
+
+
+def sort_key(doc: dict, field: str) -> tuple:
+    """Orders documents the way MongoDB sorts ``(field, _id)``: missing/null values lowest."""
+    value = doc.get(field)
+    return value is not None, value, doc["_id"]
+
+
+def position_of(doc: dict, field: str) -> Position:
+    return doc.get(field), doc["_id"]
+
+
+def keyset_filter(field: str, direction: int, position: Position) -> dict:
+    """Documents strictly after ``position`` in ``(field, _id)`` order.
+
+    Range operators do not match null, so null/missing values, which sort
+    lowest, are matched explicitly: they come last in descending order and
+    first in ascending order.
+    """
+    value, last_id = position
+    if direction == ASCENDING:
+        if value is None:
+            return {"$or": [{field: None, "_id": {"$gt": last_id}}, {field: {"$ne": None}}]}
+        return {"$or": [{field: {"$gt": value}}, {field: value, "_id": {"$gt": last_id}}]}
+    if value is None:
+        return {field: None, "_id": {"$lt": last_id}}
+    return {"$or": [{field: {"$lt": value}}, {field: value, "_id": {"$lt": last_id}}, {field: None}]}
+
+
+class CatalogPager:
+    """Continuation positions for Stremio's ``skip`` and cached catalog counts.
+
+    Stremio only sends ``skip``, so each page served remembers where the next
+    one starts under that catalog's scope (collection, sort and filter). A
+    request for a remembered ``skip`` is a keyset read of one page per shard;
+    an unknown one walks forward from the nearest remembered position below
+    it in bounded batches and remembers the page boundaries it passes.
+
+    Totals are cached per collection and filter for ``count_ttl`` seconds.
+    Positions and totals are both dropped as soon as the collection changes,
+    since an added or removed title shifts every later page boundary.
+    """
+
+    def __init__(self, count_ttl: int):
+        self.count_ttl = count_ttl
+        self._positions: "OrderedDict[str, Dict[int, Position]]" = OrderedDict()
+        self._counts: Dict[str, Tuple[float, int]] = {}
+        self.position_hits = 0
+        self.position_misses = 0
+        self.count_hits = 0
+        self.count_misses = 0
+
+    @staticmethod
+    def scope(collection_name: str, filter_dict: dict, field: Optional[str] = None, direction: int = 0) -> str:
+        return f"{collection_name}|{field}|{direction}|{json.dumps(filter_dict, sort_keys=True, default=str)}"
+
+    def lookup(self, scope: str, skip: int) -> Tuple[int, Optional[Position]]:
+        """Nearest remembered ``(skip, position)`` at or below ``skip``; ``(0, None)`` is the start."""
+        positions = self._positions.get(scope)
+        if positions:
+            self._positions.move_to_end(scope)
+            if skip in positions:
+                self.position_hits += 1
+                return skip, positions[skip]
+            below = [s for s in positions if s < skip]
+            if below:
+                self.position_misses += 1
+                base = max(below)
+                return base, positions[base]
+        if skip:
+            self.position_misses += 1
+        return 0, None
+
+    def remember(self, scope: str, skip: int, position: Position) -> None:
+        positions = self._positions.setdefault(scope, {})
+        self._positions.move_to_end(scope)
+        positions[skip] = position
+        if len(positions) > MAX_POSITIONS_PER_SCOPE:
+            positions.pop(next(iter(positions)))
+        while len(self._positions) > MAX_SCOPES:
+            self._positions.popitem(last=False)
+
+    def cached_count(self, scope: str) -> Optional[int]:
+        entry = self._counts.get(scope)
+        if entry and time.monotonic() - entry[0] < self.count_ttl:
+            self.count_hits += 1
+            return entry[1]
+        self.count_misses += 1
+        return None
+
+    def store_count(self, scope: str, count: int) -> None:
+        if self.count_ttl > 0:
+            self._counts[scope] = (time.monotonic(), count)
+
+    def invalidate(self, collection_name: str) -> None:
+        """Drop the positions and totals of a collection after a title was added, edited or removed."""
+        prefix = f"{collection_name}|"
+        for scope in [s for s in self._positions if s.startswith(prefix)]:
+            del self._positions[scope]
+        for scope in [s for s in self._counts if s.startswith(prefix)]:
+            del self._counts[scope]
+
+    def stats(self) -> dict:
+        return {
+            "scopes": len(self._positions),
+            "positions": sum(len(p) for p in self._positions.values()),
+            "position_hits": self.position_hits,
+            "position_misses": self.position_misses,
+            "cached_counts": len(self._counts),
+            "count_hits": self.count_hits,
+            "count_misses": self.count_misses,
+            "count_ttl_sec": self.count_ttl,
+        }
+
+
+catalog_pager = CatalogPager(Telegram.CATALOG_COUNT_TTL)
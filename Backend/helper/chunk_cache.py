@@ -0,0 +1,277 @@
+import asyncio
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Hashable, Optional, Set, Tuple, Union
+
+from Backend.config import Telegram
+from Backend.logger import LOGGER
+
+
+# Chunks are cached in blocks of the largest GetFile ``limit``. Planned chunks
+# are powers of two aligned to their size, so each one lies inside one block.
+BLOCK_SIZE = 1024 * 1024
+# Blocks whose smaller parts are still being collected, i.e. at most this many
+# MB held outside the byte budget.
+MAX_ASSEMBLING = 32
+
+Chunk = Union[bytes, memoryview]
+
+# Lower-tier writes nobody awaits; the loop only keeps weak references to tasks.
+_writes: Set[asyncio.Task] = set()
+
+
+def block_key(media_id: int, offset: int) -> Tuple[int, int, int]:
+    return media_id, offset - offset % BLOCK_SIZE, BLOCK_SIZE
+
+
+def _write_behind(lower, key, data: Chunk) -> None:
+    task = asyncio.create_task(lower.write(key, data))
+    _writes.add(task)
+    task.add_done_callback(_writes.discard)
+
+
+class ChunkCache:
+    """Process-wide, byte-budgeted LRU cache for downloaded file chunks.
+
+    Keys are ``(media_id, aligned_offset, chunk_size)`` tuples so every
+    ByteStreamer (whatever bot it runs on) shares the same entries.
+    Concurrent misses on one key are coalesced: the first caller fetches,
+    everyone else awaits the same future.
+
+    :meth:`read_range` stores file data as ``BLOCK_SIZE`` blocks whatever size
+    the chunks were requested in, so links with different chunk sizes share
+    entries: smaller chunks are sliced out of a cached block, and once the
+    chunks fetched for a block cover it, they are joined and cached as one.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max(0, max_bytes)
+        self._entries: "OrderedDict[Hashable, bytes]" = OrderedDict()
+        self._in_flight: Dict[Hashable, asyncio.Future] = {}
+        self._parts: "OrderedDict[Hashable, Dict[int, Tuple[bytes, int]]]" = OrderedDict()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.assembled = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        data = self._entries.get(key)
+        if data is not None:
+            self._entries.move_to_end(key)
+        return data
+
+    def put(self, key: Hashable, data: bytes) -> None:
+        # Only plain bytes are kept: views over mmaps or pooled buffers must
+        # not be pinned by the memory tier.
+        if not self.enabled or not isinstance(data, bytes):
+            return
+        size = len(data)
+        if not size or size > self.max_bytes:
+            return
+
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.current_bytes -= len(old)
+
+        self._entries[key] = data
+        self.current_bytes += size
+
+        while self.current_bytes > self.max_bytes and self._entries:
+            _, evicted = self._entries.popitem(last=False)
+            self.current_bytes -= len(evicted)
+            self.evictions += 1
+
+    def discard_media(self, media_id: int) -> int:
+        """Drop every cached chunk belonging to one media id."""
+        keys = [k for k in self._entries if k[0] == media_id]
+        for key in keys:
+            self.current_bytes -= len(self._entries.pop(key))
+        return len(keys)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._parts.clear()
+        self.current_bytes = 0
+
+    async def get_or_fetch(
+        self,
+        key: Hashable,
+        fetcher: Callable[[], Awaitable[Optional[bytes]]],
+        store: bool = True,
+    ) -> Optional[bytes]:
+        """Return the cached chunk for ``key`` or fetch it exactly once.
+
+        ``None`` results (EOF / failed fetch) are passed through but never
+        cached. With ``store=False`` concurrent fetches are still coalesced
+        but the result is not kept.
+        """
+        if not self.enabled:
+            return await fetcher()
+
+        data = self.get(key)
+        if data is not None:
+            self.hits += 1
+            return data
+
+        pending = self._in_flight.get(key)
+        if pending is not None:
+            self.coalesced += 1
+            try:
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                # The leading fetch was cancelled (its viewer went away) but we
+                # were not, so fall through and fetch on our own.
+                if not pending.cancelled():
+                    raise
+            except Exception:
+                pass
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            data = await fetcher()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # nobody may be waiting; mark as retrieved
+            raise
+        finally:
+            if self._in_flight.get(key) is future:
+                del self._in_flight[key]
+
+        if data is not None and store:
+            self.put(key, data)
+        future.set_result(data)
+        return data
+
+    async def read_range(
+        self,
+        media_id: int,
+        offset: int,
+        size: int,
+        fetcher: Callable[[], Awaitable[Optional[bytes]]],
+        lower=None,
+    ) -> Optional[Chunk]:
+        """Bytes ``offset``..``offset + size`` of a file, through the block cache.
+
+        ``fetcher`` downloads exactly that range. ``lower`` is an optional
+        slower tier (the disk cache) with ``read(key)`` / ``write(key, data)``
+        of whole blocks. A chunk that is a whole block is cached as it is;
+        a smaller one is sliced out of its block when that is cached on
+        either tier, and otherwise fetched and kept until its block is whole.
+        """
+        key = block_key(media_id, offset)
+        start = offset - key[1]
+        if start + size > BLOCK_SIZE or not (self.enabled or (lower is not None and lower.enabled)):
+            return await fetcher()
+
+        if size == BLOCK_SIZE:
+            async def fetch_block() -> Optional[Chunk]:
+                cached = await lower.read(key) if lower is not None else None
+                if cached is not None:
+                    return cached
+                data = await fetcher()
+                if data:
+                    self._parts.pop(key, None)
+                    if lower is not None and lower.enabled:
+                        _write_behind(lower, key, data)
+                return data
+
+            return await self.get_or_fetch(key, fetch_block)
+
+        while True:
+            block = self.get(key)
+            if block is not None:
+                self.hits += 1
+                return _slice(block, start, size)
+            pending = self._in_flight.get(key)
+            if pending is None:
+                break
+            self.coalesced += 1
+            try:
+                block = await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                if not pending.cancelled():
+                    raise
+                continue
+            except Exception:
+                break
+            if block is not None:
+                return _slice(block, start, size)
+            break
+
+        async def fetch_part() -> Optional[Chunk]:
+            cached = await lower.read(key) if lower is not None else None
+            if cached is not None:
+                return _slice(cached, start, size)
+            data = await fetcher()
+            if data:
+                self._collect(key, start, size, data, lower)
+            return data
+
+        return await self.get_or_fetch((media_id, offset, size), fetch_part, store=False)
+
+    def _collect(self, key: Hashable, start: int, size: int, data: Chunk, lower) -> None:
+        """Keep a fetched part of a block; cache the block once its parts cover it."""
+        parts = self._parts.get(key)
+        if parts is None:
+            parts = self._parts[key] = {}
+            while len(self._parts) > MAX_ASSEMBLING:
+                self._parts.popitem(last=False)
+        self._parts.move_to_end(key)
+        parts[start] = (bytes(data), size)
+
+        # A part shorter than requested ends the file, and so the block.
+        end = min([s + len(d) for s, (d, n) in parts.items() if len(d) < n], default=BLOCK_SIZE)
+        pieces, pos = [], 0
+        while pos < end:
+            covering = [(s, d) for s, (d, _) in parts.items() if s <= pos < s + len(d)]
+            if not covering:
+                return
+            s, d = max(covering, key=lambda item: item[0] + len(item[1]))
+            pieces.append(d[pos - s:min(len(d), end - s)])
+            pos = s + len(d)
+
+        del self._parts[key]
+        block = b"".join(pieces)
+        self.assembled += 1
+        self.put(key, block)
+        if lower is not None and lower.enabled:
+            _write_behind(lower, key, block)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "bytes": self.current_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "in_flight": len(self._in_flight),
+            "assembling": len(self._parts),
+            "assembled": self.assembled,
+            "hit_ratio": round((self.hits + self.coalesced) / lookups, 4) if lookups else 0.0,
+        }
+
+
+def _slice(block: Chunk, start: int, size: int) -> Chunk:
+    if start == 0 and size >= len(block):
+        return block
+    view = block if isinstance(block, memoryview) else memoryview(block)
+    return view[start:start + size]
+
+
+chunk_cache = ChunkCache(Telegram.CHUNK_CACHE_MB * 1024 * 1024)
+if chunk_cache.enabled:
+    LOGGER.info(f"Chunk cache enabled ({Telegram.CHUNK_CACHE_MB} MB)")
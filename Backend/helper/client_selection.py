@@ -0,0 +1,75 @@
+import random
+from typing import Callable, Dict, Iterable, List, Optional
+
+from Backend.helper.bandwidth import bandwidth_model
+from Backend.pyrofork.bot import work_loads, client_failures
+
+# Assumed for bots the model has no samples for yet, so new bots get tried.
+DEFAULT_LATENCY = 0.3   # seconds per GetFile
+DEFAULT_MBPS = 8.0
+# Bots with more recent failures than this are only used when nothing else is left.
+MAX_FAILURES = 5
+# Spare MB/s a bot needs to count as having room for another stream; smaller
+# readings are measurement noise on a saturated link.
+MIN_HEADROOM_MBPS = 1.0
+
+_rng = random.Random()
+
+
+def capacity(client_index: int, dc_id: int) -> float:
+    """Observed total MB/s a bot moves from ``dc_id`` (see ``BandwidthModel.capacity``)."""
+    return bandwidth_model.capacity(client_index, dc_id) or DEFAULT_MBPS
+
+
+def headroom(client_index: int, dc_id: int) -> float:
+    """Estimated MB/s left: observed capacity minus what the bot's streams fetch right now."""
+    return capacity(client_index, dc_id) - bandwidth_model.delivered(client_index, dc_id)
+
+
+def client_cost(client_index: int, dc_id: int) -> float:
+    """Expected seconds until a new stream on this bot has its first MB.
+
+    One GetFile round-trip at the bot's EWMA latency, plus one MB at the
+    rate the stream would get: the bot's spare throughput, or an equal share
+    of its capacity next to the streams it already carries if that is more.
+    Recent failures scale the cost up.
+    """
+    latency = bandwidth_model.latency(client_index, dc_id) or DEFAULT_LATENCY
+    streams = work_loads.get(client_index, 0)
+    total = capacity(client_index, dc_id)
+    rate = max(headroom(client_index, dc_id), total / (streams + 1))
+    return (latency + 1 / rate) * (1 + client_failures.get(client_index, 0))
+
+
+def pick_client(
+    candidates: Iterable[int],
+    dc_id: int,
+    cost: Callable[[int, int], float] = client_cost,
+) -> Optional[int]:
+    """Power-of-two-choices pick among ``candidates`` by ``cost``.
+
+    Healthy bots with spare capacity are preferred; among them two are
+    sampled at random and the cheaper one wins. Always taking the global
+    minimum would send every request that arrives between two estimate
+    updates to the same bot.
+    """
+    pool: List[int] = list(candidates)
+    if not pool:
+        return None
+    healthy = [idx for idx in pool if client_failures.get(idx, 0) <= MAX_FAILURES] or pool
+    pool = [idx for idx in healthy if headroom(idx, dc_id) >= MIN_HEADROOM_MBPS] or healthy
+    if len(pool) > 2:
+        pool = _rng.sample(pool, 2)
+    return min(pool, key=lambda idx: cost(idx, dc_id))
+
+
+def client_scores(clients: Iterable[int], dc_of: Dict[int, int]) -> List[dict]:
+    return [
+        {
+            "client_index": idx,
+            "dc_id": dc_of.get(idx),
+            "cost": round(client_cost(idx, dc_of.get(idx)), 3),
+            "headroom_mbps": round(headroom(idx, dc_of.get(idx)), 2),
+        }
+        for idx in sorted(clients)
+    ]
@@ -2,143 +2,205 @@ import asyncio
 import time
 import secrets
 from collections import deque
-from typing import Dict, List, Union, Optional, Tuple
+from typing import Dict, List, Set, Union, Optional, Tuple
 import traceback
 from fastapi import Request
 from pyrogram import Client, raw, utils
-from pyrogram.errors import AuthBytesInvalid
+from pyrogram.errors import AuthBytesInvalid, FileReferenceExpired, Unauthorized
 from pyrogram.file_id import FileId, FileType, ThumbnailSource
 from pyrogram.session import Session, Auth
 from Backend.logger import LOGGER
 from Backend.helper.exceptions import FIleNotFound
 from Backend.helper.pyro import get_file_ids
+from Backend.helper.chunk_cache import chunk_cache
+from Backend.helper.disk_cache import disk_chunk_cache
+from Backend.helper.file_resolver import file_id_resolver
+from Backend.helper.bandwidth import bandwidth_model
+from Backend.helper.client_selection import pick_client
+from Backend.helper.fetch_scheduler import (
+    fetch_scheduler, PRIORITY_URGENT, PRIORITY_STREAM, PRIORITY_READAHEAD,
+)
+from Backend.helper.playback import PlaybackSession
+from Backend.helper.shaper import StreamFlow
+from Backend.helper.session_pool import session_pool
 from Backend import db
-from Backend.pyrofork.bot import work_loads, multi_clients, client_dc_map, client_failures, client_avg_mbps
+from Backend.config import Telegram
+from Backend.pyrofork.bot import (
+    work_loads, multi_clients, client_dc_map, client_failures, client_avg_mbps, client_session_keys,
+)
 
 ACTIVE_STREAMS: Dict[str, Dict] = {}
 RECENT_STREAMS = deque(maxlen=3)
 
+# Bots with more recent failures than this are not borrowed for striping.
+STRIPE_MAX_FAILURES = 5
 
-def get_adaptive_chunk_size(client_index: int) -> int:
-    """Return the best chunk size (bytes) for this client based on recent speed.
 
-    Speed tiers:
-      < 5  MB/s  → 512 KB  (small chunks, faster first-byte on slow sessions)
-      5-20 MB/s  →   1 MB  (default)
-      20-60 MB/s →   2 MB  (fewer round-trips on fast sessions)
-      > 60 MB/s  →   4 MB  (maximise throughput on very fast sessions)
+# Per chunk: tries on one bot before failing over, other bots tried, total tries.
+TRIES_PER_CLIENT = 2
+MAX_FAILOVER_CLIENTS = 2
+MAX_FETCH_ATTEMPTS = 6
+
+# Seconds a media session on a stored auth key gets to connect before the key
+# is dropped; Session.start() otherwise retries a dead key forever.
+STORED_KEY_TIMEOUT = 10.0
+
+# Clean-up a finished stream leaves running (lane release, stats logging);
+# held here until done, the event loop only keeps weak references to tasks.
+_background: Set[asyncio.Task] = set()
+
+
+def _spawn(coro) -> asyncio.Task:
+    task = asyncio.create_task(coro)
+    _background.add(task)
+    task.add_done_callback(_background.discard)
+    return task
+
+
+def slice_chunk(chunk, start: int = 0, stop: Optional[int] = None) -> memoryview:
+    """Cut a Range part out of a chunk without copying it.
+
+    The ASGI server writes memoryviews straight to the socket, so trimming the
+    first/last part of a request no longer duplicates up to a whole chunk.
+    """
+    view = chunk if isinstance(chunk, memoryview) else memoryview(chunk)
+    if start == 0 and stop is None:
+        return view
+    return view[start:stop]
+
+
+def aligned_chunk_size(offset: int, chunk_size: int) -> int:
+    """Largest power-of-two request size <= ``chunk_size`` that ``offset`` is aligned to.
+
+    upload.GetFile needs ``offset`` divisible by ``limit``, so after the
+    planned size grows mid-stream the first few requests are shrunk until the
+    position lines up again.
     """
-    speed = client_avg_mbps.get(client_index, 0.0)
-    if speed >= 60:
-        return 4 * 1024 * 1024
-    if speed >= 20:
-        return 2 * 1024 * 1024
-    if speed >= 5:
-        return 1 * 1024 * 1024
-    # Unknown speed or < 5 MB/s → start conservative
-    return 512 * 1024
+    while chunk_size > 4096 and offset % chunk_size:
+        chunk_size //= 2
+    return chunk_size
+
+
+class _Lane:
+    """One bot's share of a stream: its media session and its own file reference."""
+
+    __slots__ = ("client_index", "session", "location", "primary", "in_flight")
+
+    def __init__(self, client_index: int, session: Session, location, primary: bool = False):
+        self.client_index = client_index
+        self.session = session
+        self.location = location
+        self.primary = primary
+        self.in_flight = 0
+
 
 class ByteStreamer:
     CHUNK_SIZE = 1024 * 1024  # 1 MB
-    CLEAN_INTERVAL = 30 * 60  # 30 minutes
     _instances: Dict[int, "ByteStreamer"] = {}  # client_index → streamer (for fallback)
 
     def __init__(self, client: Client, client_index: int = -1):
         self.client = client
         self.client_index = client_index
-        self._file_id_cache: Dict[int, FileId] = {}
-        self._session_lock = asyncio.Lock()
+        self._session_locks: Dict[int, asyncio.Lock] = {}
         # Register this streamer so fallback logic can reuse it
         if client_index >= 0:
             ByteStreamer._instances[client_index] = self
-        asyncio.create_task(self._clean_cache())
-        asyncio.create_task(self._prewarm_sessions())
-
-    async def _prewarm_sessions(self):
-        common_dcs = [1, 2, 4, 5]  # Main Telegram DCs
-        LOGGER.debug("Pre-warming media sessions for common DCs...")
-        
-        for dc in common_dcs:
-            try:
-                if dc in self.client.media_sessions:
-                    LOGGER.debug(f"Media session for DC {dc} already exists, skipping")
-                    continue
-
-                test_mode = await self.client.storage.test_mode()
-                current_dc = await self.client.storage.dc_id()
- 
-                if dc == current_dc:
-                    continue
-                
-                auth_key = await Auth(self.client, dc, test_mode).create()
-                session = Session(self.client, dc, auth_key, test_mode, is_media=True)
-                session.no_updates = True
-                session.timeout = 30
-                session.sleep_threshold = 60
-                
-                await session.start()
-                
-                for attempt in range(6):
-                    try:
-                        exported = await self.client.invoke(
-                            raw.functions.auth.ExportAuthorization(dc_id=dc)
-                        )
-                        await session.send(
-                            raw.functions.auth.ImportAuthorization(
-                                id=exported.id, bytes=exported.bytes
-                            )
-                        )
-                        break
-                    except AuthBytesInvalid:
-                        LOGGER.debug(f"AuthBytesInvalid during pre-warm for DC {dc}; retrying...")
-                        await asyncio.sleep(0.5)
-                    except OSError:
-                        LOGGER.debug(f"OSError during pre-warm for DC {dc}; retrying...")
-                        await asyncio.sleep(1)
-                    except Exception as e:
-                        LOGGER.debug(f"Error during pre-warm for DC {dc}: {e}")
-                        break
-                
-                self.client.media_sessions[dc] = session
-                LOGGER.debug(f"Pre-warmed media session for DC {dc}")
-                
-            except Exception as e:
-                LOGGER.debug(f"Could not pre-warm DC {dc}: {e}")
-                continue
 
     async def get_file_properties(self, chat_id: int, message_id: int) -> FileId:
-        if message_id not in self._file_id_cache:
-            file_id = await get_file_ids(self.client, int(chat_id), int(message_id))
-            if not file_id:
-                LOGGER.warning("Message %s not found", message_id)
-                raise FIleNotFound
-            self._file_id_cache[message_id] = file_id
-        return self._file_id_cache[message_id]
+        # Registered streamers share the resolver cache; ad-hoc ones (speed
+        # tests) always want a fresh reference for their own session.
+        if self.client_index >= 0:
+            return await file_id_resolver.resolve(self.client_index, chat_id, message_id)
+
+        file_id = await get_file_ids(self.client, int(chat_id), int(message_id))
+        if not file_id:
+            LOGGER.warning("Message %s not found", message_id)
+            raise FIleNotFound
+        return file_id
+
+    async def read_bytes(self, file_id: FileId, offset: int, limit: int) -> Optional[bytes]:
+        """One-off GetFile outside the streaming pipeline, for small probe reads.
+
+        Nothing is registered in ACTIVE_STREAMS and ``work_loads`` is left
+        alone. An expired file reference is refreshed once; any other failure
+        is raised, and ``media_streamer`` then streams the range instead.
+        """
+        source_chat_id = getattr(file_id, "source_chat_id", None)
+        source_msg_id = getattr(file_id, "source_msg_id", None)
+        session = await self._get_media_session(file_id)
+        location = await self._get_location(file_id)
+        for attempt in range(2):
+            try:
+                async with fetch_scheduler.slot(self.client_index, file_id.dc_id, PRIORITY_URGENT):
+                    r = await asyncio.wait_for(
+                        session.send(raw.functions.upload.GetFile(location=location, offset=offset, limit=limit)),
+                        timeout=15.0,
+                    )
+                return getattr(r, "bytes", None) if r else None
+            except FileReferenceExpired:
+                if attempt or self.client_index < 0 or source_chat_id is None or source_msg_id is None:
+                    raise
+                fresh = await file_id_resolver.refresh(self.client_index, source_chat_id, source_msg_id)
+                location = await self._get_location(fresh)
+        return None
 
     async def prefetch_stream(
         self,
         file_id: FileId,
         client_index: int,
-        offset: int,
-        first_part_cut: int,
-        last_part_cut: int,
-        part_count: int,
-        chunk_size: int,
+        start: int,
+        end: int,
+        chunk_size: Optional[int] = None,
         prefetch: int = 3,
         stream_id: Optional[str] = None,
         meta: Optional[dict] = None,
-        parallelism: int = 2,
+        parallelism: Optional[int] = None,
         request: Optional[Request] = None,
+        stripe: int = 1,
+        playback: Optional[PlaybackSession] = None,
+        flow: Optional[StreamFlow] = None,
     ):
+        """Stream bytes ``start``..``end`` (inclusive) of a file.
+
+        ``chunk_size`` and ``parallelism`` pin the request size and the number
+        of in-flight requests. Left as ``None`` they follow ``bandwidth_model``
+        for this client and DC, and are re-read every time a part is scheduled
+        so a long stream keeps adapting while it runs.
+
+        With ``stripe > 1`` up to ``stripe - 1`` other healthy bots in the same
+        DC join the stream as extra lanes, each with its own FileId. Parts go to
+        the lane with the most spare estimated throughput, and a borrowed
+        lane's depth shrinks as its bot picks up streams of its own.
+
+        With a ``playback`` session, parts left over by the previous request of
+        the same playback are reused, and this request's unfinished parts are
+        handed back to the session when it ends instead of being cancelled.
+        The lanes' session leases are then held until those parts and the
+        session's read-ahead on this request's lanes have finished.
+
+        With a ``flow``, delivery is paced by its token's bandwidth bucket. The
+        flow is opened when the body starts and closed when it ends.
+        """
         if not stream_id:
             stream_id = secrets.token_hex(8)
 
+        dc_id = file_id.dc_id
+        source_chat_id = getattr(file_id, "source_chat_id", None)
+        source_msg_id = getattr(file_id, "source_msg_id", None)
+
+        def current_plan(lane_client: int = client_index) -> Tuple[int, int]:
+            planned_size, planned_depth = bandwidth_model.plan(lane_client, dc_id)
+            return chunk_size or planned_size, parallelism or planned_depth
+
+        first_size, first_depth = current_plan()
+        offset = start - (start % first_size)
+
         now = time.time()
         registry_entry = {
             "stream_id": stream_id,
-            "msg_id": getattr(file_id, "local_id", None) or None,
-            "chat_id": getattr(file_id, "chat_id", None),
-            "dc_id": file_id.dc_id,
+            "msg_id": source_msg_id,
+            "chat_id": source_chat_id,
+            "dc_id": dc_id,
             "client_index": client_index,
             "start_ts": now,
             "last_ts": now,
@@ -148,196 +210,423 @@ class ByteStreamer:
             "peak_mbps": 0.0,
             "recent_measurements": deque(maxlen=3),
             "status": "active",
-            "part_count": part_count,
+            "range": [start, end],
+            "chunk_size": first_size,
+            "parallelism": first_depth,
+            "stripe": {client_index: 0},
             "prefetch": prefetch,
             "meta": meta or {},
         }
-
-        ACTIVE_STREAMS[stream_id] = registry_entry
-        work_loads[client_index] += 1
+        if flow is not None:
+            registry_entry["shaping"] = flow.stats()
 
         queue_maxsize = max(1, prefetch)
         q: asyncio.Queue = asyncio.Queue(maxsize=queue_maxsize)
         stop_event = asyncio.Event()
 
-        media_session = await self._get_media_session(file_id)
-        location = await self._get_location(file_id)
+        # The primary lane is added when the body starts, see consumer_generator.
+        lanes: List[_Lane] = []
+        refresh_lock = asyncio.Lock()
+        # Every fetch task started on this request's lanes, finished or not.
+        lane_tasks: set = set()
 
-        async def fetch_chunk_with_retries(seq_idx: int, off: int) -> Tuple[int, Optional[bytes]]:
-            """Fetch one chunk with timeout, exponential back-off, and bot fallback.
+        def track(task: asyncio.Task) -> asyncio.Task:
+            lane_tasks.add(task)
+            task.add_done_callback(lane_tasks.discard)
+            return task
 
-            Retry schedule (max 3 tries):
-              tries 0    → same bot / same session, 15 s timeout each
-              tries 1-2  → try a healthier fallback bot (if available),
-                           still with 15 s timeout
-            On every TimeoutError the primary client's failure counter is incremented
-            so select_best_client will avoid it for future requests.
+        async def release_lanes(readahead: Optional[asyncio.Task] = None) -> None:
+            """Return the lanes' leases once nothing started on them still runs."""
+            try:
+                while True:
+                    running = [t for t in lane_tasks if not t.done()]
+                    if readahead is not None and not readahead.done():
+                        running.append(readahead)
+                    if not running:
+                        break
+                    await asyncio.wait(running)
+            finally:
+                for lane in (*lanes, *failover_lanes.values()):
+                    session_pool.release(lane.session)
+
+        async def refresh_location(lane: _Lane, stale_location) -> bool:
+            """Re-resolve a lane's expired file reference once for all its in-flight chunks."""
+            if source_chat_id is None or source_msg_id is None or lane.client_index < 0:
+                return False
+            async with refresh_lock:
+                if lane.location is not stale_location:
+                    return True
+                try:
+                    fresh = await file_id_resolver.refresh(lane.client_index, source_chat_id, source_msg_id)
+                except Exception as e:
+                    LOGGER.warning("File reference refresh failed for stream %s: %s", stream_id, e)
+                    return False
+                lane.location = await self._get_location(fresh)
+                LOGGER.debug("Refreshed file reference for stream %s client %s", stream_id, lane.client_index)
+                return True
+
+        async def attach_stripe_lanes() -> None:
+            """Add other same-DC bots as lanes, each resolving its own FileId."""
+            candidates = [
+                idx for idx in multi_clients
+                if idx != client_index
+                and client_dc_map.get(idx) == dc_id
+                and client_failures.get(idx, 0) <= STRIPE_MAX_FAILURES
+            ]
+            candidates.sort(key=lambda idx: (work_loads.get(idx, 0), -bandwidth_model.throughput(idx, dc_id)))
+
+            async def attach(idx: int) -> None:
+                streamer = ByteStreamer._instances.get(idx) or ByteStreamer(multi_clients[idx], idx)
+                lane_file_id = await file_id_resolver.resolve(idx, source_chat_id, source_msg_id)
+                session = await streamer.lease_media_session(lane_file_id)
+                lanes.append(_Lane(idx, session, await self._get_location(lane_file_id)))
+                registry_entry["stripe"][idx] = 0
+
+            results = await asyncio.gather(
+                *(attach(idx) for idx in candidates[:stripe - 1]), return_exceptions=True
+            )
+            for idx, result in zip(candidates, results):
+                if isinstance(result, Exception):
+                    LOGGER.debug("Stripe lane client=%s unavailable for stream %s: %s", idx, stream_id, result)
+
+        failover_lanes: Dict[int, _Lane] = {}
+        failover_stats = registry_entry["failover"] = {
+            "retries": 0, "refreshes": 0, "failovers": 0, "failed_parts": 0, "clients": {},
+        }
+
+        async def failover_lane(exclude: set) -> Optional[_Lane]:
+            """A lane on another bot, with that bot's own FileId and a leased media session."""
+            if source_chat_id is None or source_msg_id is None:
+                return None
+            candidates = [idx for idx in multi_clients if idx not in exclude]
+            while candidates:
+                idx = pick_client(candidates, dc_id)
+                lane = failover_lanes.get(idx)
+                if lane is not None:
+                    return lane
+                try:
+                    streamer = ByteStreamer._instances.get(idx) or ByteStreamer(multi_clients[idx], idx)
+                    lane_file_id = await file_id_resolver.resolve(idx, source_chat_id, source_msg_id)
+                    location = await self._get_location(lane_file_id)
+                    session = await streamer.lease_media_session(lane_file_id)
+                except Exception as e:
+                    LOGGER.debug("Failover client=%s unavailable for stream %s: %s", idx, stream_id, e)
+                    candidates.remove(idx)
+                    continue
+                if idx in failover_lanes:
+                    # Another part failed over to this bot meanwhile; share its lane.
+                    session_pool.release(session)
+                    return failover_lanes[idx]
+                lane = failover_lanes[idx] = _Lane(idx, session, location)
+                return lane
+            return None
+
+        async def fetch_chunk_with_retries(
+            seq_idx: int, off: int, size: int, lane: _Lane
+        ) -> Tuple[int, Optional[bytes], Optional[Tuple[int, float]]]:
+            """Fetch one chunk, failing over to other bots before giving up.
+
+            Each bot gets up to ``TRIES_PER_CLIENT`` tries, with back-off in
+            between; a timeout moves on at once. An expired file reference is
+            refreshed for the bot that hit it and retried. Then up to
+            ``MAX_FAILOVER_CLIENTS`` other bots, picked by latency and spare
+            throughput, take over with their own FileId and media session.
+            Timeouts count against the bot, and a chunk served by another bot
+            counts against the lane's own. ``None`` bytes mean every option
+            failed.
+
+            The third element is ``(client_index, seconds)`` of the successful
+            GetFile call, for the bandwidth model. Every attempt first waits
+            for a slot on the bot's session: the first part of a request goes
+            ahead of other streams' parts, read-ahead (``seq_idx < 0``) last.
             """
-            tries = 0
-            while tries < 3 and not stop_event.is_set():
-                # --- choose which media session to use this attempt ---
-                use_session = media_session
-                use_client_idx = client_index
-                if tries >= 1 and len(multi_clients) > 1:
-                    # Pick the best *other* client by score = workload + 3×failures
-                    def _score(idx):
-                        return work_loads.get(idx, 0) + 3 * client_failures.get(idx, 0)
-                    fallback_idx = min(
-                        (i for i in multi_clients if i != client_index),
-                        key=_score,
-                        default=None,
+            if seq_idx == 0:
+                priority = PRIORITY_URGENT
+            elif seq_idx < 0:
+                priority = PRIORITY_READAHEAD
+            else:
+                priority = PRIORITY_STREAM
+            current = lane
+            tried = {lane.client_index}
+            client_tries = 0
+            attempts = 0
+            while attempts < MAX_FETCH_ATTEMPTS and not stop_event.is_set():
+                if client_tries >= TRIES_PER_CLIENT:
+                    nxt = None
+                    if len(tried) <= MAX_FAILOVER_CLIENTS:
+                        nxt = await failover_lane(tried)
+                    if nxt is None:
+                        break
+                    LOGGER.debug(
+                        "Chunk failover: stream=%s seq=%s client=%s -> %s",
+                        stream_id, seq_idx, current.client_index, nxt.client_index,
                     )
-                    if fallback_idx is not None:
-                        fb_streamer = ByteStreamer._instances.get(fallback_idx)
-                        if fb_streamer is None:
-                            fb_streamer = ByteStreamer(multi_clients[fallback_idx], fallback_idx)
-                        try:
-                            use_session = await fb_streamer._get_media_session(file_id)
-                            use_client_idx = fallback_idx
-                            LOGGER.debug(
-                                "Chunk fallback: seq=%s try=%s primary=%s → fallback=%s",
-                                seq_idx, tries, client_index, fallback_idx,
-                            )
-                        except Exception:
-                            use_session = media_session  # revert if fallback session fails
-                            use_client_idx = client_index
+                    tried.add(nxt.client_index)
+                    current, client_tries = nxt, 0
+                    failover_stats["failovers"] += 1
+                    failover_stats["clients"][nxt.client_index] = failover_stats["clients"].get(nxt.client_index, 0) + 1
 
-                # --- attempt the fetch with a hard timeout ---
+                use_location = current.location
+                attempts += 1
                 try:
-                    r = await asyncio.wait_for(
-                        use_session.send(
-                            raw.functions.upload.GetFile(
-                                location=location, offset=off, limit=chunk_size
-                            )
-                        ),
-                        timeout=15.0,
-                    )
+                    async with fetch_scheduler.slot(current.client_index, dc_id, priority):
+                        sent_at = time.perf_counter()
+                        r = await asyncio.wait_for(
+                            current.session.send(
+                                raw.functions.upload.GetFile(
+                                    location=use_location, offset=off, limit=size
+                                )
+                            ),
+                            timeout=15.0,
+                        )
+                        elapsed = time.perf_counter() - sent_at
                     chunk_bytes = getattr(r, "bytes", None) if r else None
-                    
-                    if chunk_bytes == b"":
-                        return seq_idx, None
+                    if not chunk_bytes:
+                        # Nothing at an offset inside the requested range.
+                        LOGGER.debug("Empty chunk seq=%s off=%s client=%s", seq_idx, off, current.client_index)
+                        client_tries += 1
+                        continue
 
-                    # If we succeeded via a fallback, mark primary as degraded
-                    if use_client_idx != client_index:
-                        client_failures[client_index] = client_failures.get(client_index, 0) + 1
-                    return seq_idx, chunk_bytes
+                    if current is not lane:
+                        client_failures[lane.client_index] = client_failures.get(lane.client_index, 0) + 1
+                    return seq_idx, chunk_bytes, (current.client_index, elapsed)
 
+                except FileReferenceExpired:
+                    if await refresh_location(current, use_location):
+                        failover_stats["refreshes"] += 1
+                        continue
+                    LOGGER.debug(
+                        "File reference expired seq=%s off=%s client=%s", seq_idx, off, current.client_index,
+                    )
+                    client_tries = TRIES_PER_CLIENT
+                    continue
                 except asyncio.TimeoutError:
-                    tries += 1
-                    client_failures[use_client_idx] = client_failures.get(use_client_idx, 0) + 1
+                    client_failures[current.client_index] = client_failures.get(current.client_index, 0) + 1
+                    session_pool.report_failure(current.session)
                     LOGGER.warning(
                         "Chunk timeout seq=%s off=%s try=%s client=%s",
-                        seq_idx, off, tries, use_client_idx,
+                        seq_idx, off, attempts, current.client_index,
                     )
+                    client_tries = TRIES_PER_CLIENT
+                    continue
                 except Exception as e:
-                    tries += 1
+                    client_tries += 1
+                    failover_stats["retries"] += 1
                     LOGGER.debug(
                         "Fetch chunk error seq=%s off=%s try=%s client=%s err=%s",
-                        seq_idx, off, tries, use_client_idx, getattr(e, "args", e),
+                        seq_idx, off, attempts, current.client_index, getattr(e, "args", e),
                     )
 
-                # Exponential back-off: 0.5 s, 1 s, 2 s, 4 s, 8 s, 10 s (cap)
-                await asyncio.sleep(min(0.5 * (2 ** (tries - 1)), 10.0))
+                if client_tries < TRIES_PER_CLIENT:
+                    # Back off before retrying the same bot: 0.5 s, 1 s.
+                    await asyncio.sleep(0.5 * client_tries)
 
             LOGGER.error(
-                "Failed to fetch chunk seq=%s off=%s after 3 retries, client=%s",
-                seq_idx, off, client_index,
+                "Failed to fetch chunk seq=%s off=%s after %s tries on clients %s",
+                seq_idx, off, attempts, sorted(tried),
             )
-            return seq_idx, None
+            return seq_idx, None, None
+
+        async def fetch_chunk_cached(
+            seq_idx: int, off: int, size: int, lane: _Lane
+        ) -> Tuple[int, Optional[bytes], Optional[Tuple[int, float]]]:
+            """Serve a chunk from the memory cache, then the disk cache, then Telegram.
+
+            Both caches hold 1 MB blocks, so a chunk of any planned size is
+            sliced out of, or collected into, the block other viewers use.
+            Disk hits come back as mmap-backed memoryviews and are not copied
+            into the memory tier. Only chunks this call fetched from Telegram
+            carry a latency sample.
+            """
+            sample = None
 
-        async def producer():
+            async def _fetch() -> Optional[bytes]:
+                nonlocal sample
+                _, chunk_bytes, sample = await fetch_chunk_with_retries(seq_idx, off, size, lane)
+                return chunk_bytes
+
+            chunk_bytes = await chunk_cache.read_range(file_id.media_id, off, size, _fetch, disk_chunk_cache)
+            return seq_idx, chunk_bytes, sample
+
+        async def adopt_warm(seq_idx: int, off: int, size: int, source: asyncio.Future):
+            """Take over a part fetched for an earlier request of this playback."""
             try:
-                if part_count <= 0:
-                    await q.put((None, None))
-                    return
+                _, chunk_bytes, sample = await source
+                if chunk_bytes is not None:
+                    return seq_idx, chunk_bytes, sample
+            except asyncio.CancelledError:
+                if not source.cancelled():
+                    raise
+            return await fetch_chunk_cached(seq_idx, off, size, lanes[0])
+
+        def readahead_part(off: int) -> Tuple[int, asyncio.Task]:
+            size = aligned_chunk_size(off, current_plan()[0])
+            return size, track(asyncio.create_task(fetch_chunk_cached(-1, off, size, lanes[0])))
+
+        def lane_plan(lane: _Lane) -> Tuple[int, int]:
+            size, depth = current_plan(lane.client_index)
+            if not lane.primary:
+                # Borrowed capacity: hand it back as the bot picks up streams
+                # of its own, and drop it entirely once the bot turns flaky.
+                depth //= 1 + work_loads.get(lane.client_index, 0)
+                if client_failures.get(lane.client_index, 0) > STRIPE_MAX_FAILURES:
+                    depth = 0
+            return size, depth
 
+        async def producer():
+            """Fetch parts concurrently and hand them to the consumer in order.
+
+            Parts are variable-sized: each one takes the planned chunk size of
+            the lane it is assigned to, shrunk if needed so its offset stays
+            aligned. Each lane keeps at most its planned depth in flight, new
+            parts go to the lane with the lowest ``(in_flight + 1) / MB/s``, and
+            the newest scheduled part is never more than twice the total depth
+            ahead of the delivery cursor, so the reorder buffer stays bounded no
+            matter how long the head-of-line fetch stalls. Finished tasks are
+            pushed onto ``completed`` by a done-callback and mapped back to their
+            part through ``task_seq``.
+            """
+            task_seq: Dict[asyncio.Task, Tuple[int, int, int, _Lane]] = {}
+            reorder: Dict[int, Tuple[int, Union[bytes, memoryview], Optional[Tuple[int, float]]]] = {}
+            lanes_task = None
+            if stripe > 1 and client_index >= 0 and source_chat_id is not None and source_msg_id is not None:
+                lanes_task = asyncio.create_task(attach_stripe_lanes())
+            try:
+                completed: asyncio.Queue = asyncio.Queue()
+                next_offset = offset
+                if playback is not None:
+                    # Start on a warm part boundary so the handed-over parts line up.
+                    warm_offset = playback.covering(start)
+                    if warm_offset is not None:
+                        next_offset = warm_offset
                 next_to_schedule = 0
-                scheduled_tasks = {}
-                results_buffer = {}
                 next_to_put = 0
-                max_parallel = max(1, parallelism)
-
-                initial = min(part_count, max_parallel)
-                for i in range(initial):
-                    seq = next_to_schedule
-                    off = offset + seq * chunk_size
-                    task = asyncio.create_task(fetch_chunk_with_retries(seq, off))
-                    scheduled_tasks[seq] = task
-                    next_to_schedule += 1
-
-                while next_to_put < part_count:
-                    if stop_event.is_set():
-                        break
-
-                    if not scheduled_tasks:
+                failed_seq = None
+
+                def schedule() -> None:
+                    nonlocal next_offset, next_to_schedule
+                    planned = []
+                    for lane in lanes:
+                        size, depth = lane_plan(lane)
+                        planned.append((lane, size, depth, bandwidth_model.throughput(lane.client_index, dc_id)))
+                    # Lanes without measurements yet are treated optimistically
+                    # so they get the parts that produce their first samples.
+                    default_weight = max((p[3] for p in planned), default=0.0) or 1.0
+                    total_depth = sum(p[2] for p in planned)
+                    registry_entry["chunk_size"] = planned[0][1]
+                    registry_entry["parallelism"] = total_depth
+
+                    while next_offset <= end and next_to_schedule < next_to_put + 2 * total_depth:
                         seq = next_to_schedule
-                        off = offset + seq * chunk_size
-                        task = asyncio.create_task(fetch_chunk_with_retries(seq, off))
-                        scheduled_tasks[seq] = task
+                        warm = playback.take(next_offset) if playback is not None else None
+                        if warm is not None:
+                            lane = lanes[0]
+                            size, source = warm
+                            task = track(asyncio.create_task(adopt_warm(seq, next_offset, size, source)))
+                        else:
+                            best, best_score = None, 0.0
+                            for lane, size, depth, weight in planned:
+                                if lane.in_flight >= depth:
+                                    continue
+                                score = (lane.in_flight + 1) / (weight or default_weight)
+                                if best is None or score < best_score:
+                                    best, best_score = (lane, size), score
+                            if best is None:
+                                break
+
+                            lane, planned_size = best
+                            size = aligned_chunk_size(next_offset, planned_size)
+                            task = track(asyncio.create_task(fetch_chunk_cached(seq, next_offset, size, lane)))
+                        task_seq[task] = (seq, next_offset, size, lane)
+                        task.add_done_callback(completed.put_nowait)
+                        lane.in_flight += 1
+                        next_offset += size
                         next_to_schedule += 1
 
-                    done, _ = await asyncio.wait(scheduled_tasks.values(), return_when=asyncio.FIRST_COMPLETED)
-
-                    for completed in done:
-                        try:
-                            completed_seq = None
-                            for k, t in list(scheduled_tasks.items()):
-                                if t is completed:
-                                    completed_seq = k
-                                    break
-
-                            if completed_seq is None:
-                                continue
-
-                            seq_idx, chunk_bytes = completed.result()
-                            scheduled_tasks.pop(completed_seq, None)
-
-                            if chunk_bytes is None:
-                                LOGGER.error("Chunk fetch returned empty for stream=%s seq=%s. Filling with zero bytes.", stream_id, seq_idx)
-                                chunk_bytes = b"\x00" * chunk_size
-
-                            results_buffer[seq_idx] = chunk_bytes
+                schedule()
+                while task_seq:
+                    if stop_event.is_set():
+                        break
 
-                            if next_to_schedule < part_count:
-                                seq = next_to_schedule
-                                off = offset + seq * chunk_size
-                                task = asyncio.create_task(fetch_chunk_with_retries(seq, off))
-                                scheduled_tasks[seq] = task
-                                next_to_schedule += 1
+                    task = await completed.get()
+                    seq_idx, off, size, lane = task_seq.pop(task)
+                    lane.in_flight -= 1
+                    try:
+                        _, chunk_bytes, sample = task.result()
+                    except asyncio.CancelledError:
+                        raise
+                    except Exception as e:
+                        LOGGER.exception("Error processing completed fetch task: %s%s", e, traceback.format_exc())
+                        await q.put((None, None, None))
+                        return
+
+                    if chunk_bytes is None:
+                        # Never send filler: deliver what comes before this part,
+                        # then end the response so the player requests the rest.
+                        failover_stats["failed_parts"] += 1
+                        if failed_seq is None or seq_idx < failed_seq:
+                            failed_seq = seq_idx
+                            LOGGER.error(
+                                "Stream %s: part at offset %s unavailable from every client; ending the response there",
+                                stream_id, off,
+                            )
+                            registry_entry["status"] = "error"
+                    else:
+                        reorder[seq_idx] = (off, chunk_bytes, sample)
 
-                        except asyncio.CancelledError:
-                            raise
-                        except Exception as e:
-                            LOGGER.exception("Error processing completed fetch task: %s%s", e, traceback.format_exc())
-                            await q.put((None, None))
-                            return
-
-                    while next_to_put in results_buffer:
-                        chunk_bytes = results_buffer.pop(next_to_put)
-                        await q.put((offset + next_to_put * chunk_size, chunk_bytes))
+                    while next_to_put in reorder:
+                        await q.put(reorder.pop(next_to_put))
                         next_to_put += 1
 
-                await q.put((None, None))
+                    if failed_seq is not None:
+                        if next_to_put >= failed_seq:
+                            break
+                        continue
+                    schedule()
+
+                await q.put((None, None, None))
 
             except asyncio.CancelledError:
                 LOGGER.debug("Producer cancelled for stream %s", stream_id)
                 try:
-                    await q.put((None, None))
+                    await q.put((None, None, None))
                 except Exception:
                     pass
                 raise
             except Exception as e:
                 LOGGER.exception("Producer unexpected error for stream %s: %s", stream_id, e)
                 try:
-                    await q.put((None, None))
+                    await q.put((None, None, None))
                 except Exception:
                     pass
+            finally:
+                for task, (_, off, size, _) in task_seq.items():
+                    if playback is not None:
+                        playback.keep(off, size, task)
+                    else:
+                        task.cancel()
+                if playback is not None:
+                    for off, chunk_bytes, sample in reorder.values():
+                        playback.keep_data(off, chunk_bytes, sample)
+                if lanes_task is not None and not lanes_task.done():
+                    lanes_task.cancel()
 
         async def consumer_generator():
-            producer_task = asyncio.create_task(producer())
-            current_part_idx = 1
+            # Registration, the session lease and the flow all start with the
+            # body, so a response that is never sent holds none of them.
+            ACTIVE_STREAMS[stream_id] = registry_entry
+            work_loads[client_index] += 1
+            if flow is not None:
+                flow.open()
+            if playback is not None:
+                playback.begin(start)
+            producer_task = None
 
             try:
+                location = await self._get_location(file_id)
+                lanes.append(_Lane(client_index, await self.lease_media_session(file_id), location, primary=True))
+                producer_task = asyncio.create_task(producer())
+
                 while True:
                     try:
                         if request and await request.is_disconnected():
@@ -347,11 +636,11 @@ class ByteStreamer:
                     except Exception:
                         pass
 
-                    off_chunk = await q.get()
-                    if off_chunk is None:
+                    item = await q.get()
+                    if item is None:
                         break
 
-                    off, chunk = off_chunk
+                    off, chunk, sample = item
                     if off is None and chunk is None:
                         break
 
@@ -360,13 +649,27 @@ class ByteStreamer:
                     except Exception:
                         chunk_len = 0
 
+                    if sample is not None:
+                        bandwidth_model.observe(sample[0], dc_id, chunk_len, sample[1])
+                        stripe_bytes = ACTIVE_STREAMS[stream_id]["stripe"]
+                        stripe_bytes[sample[0]] = stripe_bytes.get(sample[0], 0) + chunk_len
+
+                    # Trim against the absolute requested range; parts no
+                    # longer share one size, so cuts are not per-index.
+                    lo = max(start - off, 0)
+                    hi = min(end + 1 - off, chunk_len)
+                    sent_len = max(hi - lo, 0)
+
+                    if flow is not None and sent_len and await flow.throttle(sent_len):
+                        registry_entry["shaping"] = flow.stats()
+
                     now_ts = time.time()
                     elapsed = now_ts - ACTIVE_STREAMS[stream_id]["last_ts"]
                     if elapsed <= 0:
                         elapsed = 1e-6
 
                     recent = ACTIVE_STREAMS[stream_id]["recent_measurements"]
-                    recent.append((chunk_len, elapsed))
+                    recent.append((sent_len, elapsed))
 
                     if len(recent) >= 2:
                         total_bytes = sum(b for b, _ in recent)
@@ -375,7 +678,7 @@ class ByteStreamer:
                     else:
                         instant_mbps = 0.0
 
-                    ACTIVE_STREAMS[stream_id]["total_bytes"] += chunk_len
+                    ACTIVE_STREAMS[stream_id]["total_bytes"] += sent_len
                     ACTIVE_STREAMS[stream_id]["last_ts"] = now_ts
 
                     total_time = now_ts - ACTIVE_STREAMS[stream_id]["start_ts"]
@@ -388,37 +691,47 @@ class ByteStreamer:
                     if instant_mbps > ACTIVE_STREAMS[stream_id]["peak_mbps"]:
                         ACTIVE_STREAMS[stream_id]["peak_mbps"] = instant_mbps
 
-                    if part_count == 1:
-                        yield chunk[first_part_cut:last_part_cut]
-                    elif current_part_idx == 1:
-                        yield chunk[first_part_cut:]
-                    elif current_part_idx == part_count:
-                        yield chunk[:last_part_cut]
-                    else:
-                        yield chunk
-
-                    current_part_idx += 1
+                    if playback is not None:
+                        playback.advance(off + hi)
+                    if sent_len:
+                        yield slice_chunk(chunk, lo, hi if hi < chunk_len else None)
+                    if off + chunk_len > end:
+                        break
 
             except asyncio.CancelledError:
                 LOGGER.debug("Consumer cancelled for stream %s", stream_id)
-                if not producer_task.done():
+                if producer_task is not None and not producer_task.done():
                     producer_task.cancel()
                 ACTIVE_STREAMS[stream_id]["status"] = "cancelled"
                 raise
             except Exception as e:
                 LOGGER.exception("Consumer error for stream %s: %s", stream_id, e)
                 ACTIVE_STREAMS[stream_id]["status"] = "error"
-                if not producer_task.done():
+                if producer_task is not None and not producer_task.done():
                     producer_task.cancel()
                 raise
             finally:
-                if not producer_task.done():
+                if producer_task is not None and not producer_task.done():
                     try:
                         producer_task.cancel()
                         await asyncio.wait_for(producer_task, timeout=2.0)
                     except (Exception, asyncio.CancelledError):
                         pass
 
+                if playback is not None:
+                    # Parts the producer already queued also stay warm.
+                    while not q.empty():
+                        off, chunk, sample = q.get_nowait()
+                        if off is not None and chunk is not None:
+                            playback.keep_data(off, chunk, sample)
+                    # Handed-over parts and the read-ahead keep using the lanes.
+                    _spawn(release_lanes(playback.end(readahead_part if lanes else None)))
+                else:
+                    _spawn(release_lanes())
+                if flow is not None:
+                    flow.close()
+                    registry_entry["shaping"] = flow.stats()
+
                 try:
                     end_ts = time.time()
                     total_bytes = ACTIVE_STREAMS[stream_id]["total_bytes"]
@@ -432,7 +745,6 @@ class ByteStreamer:
                         "duration": duration,
                         "avg_mbps": avg_mbps,
                         "status": "finished" if entry.get("status") == "active" else entry.get("status", "finished"),
-                        "parallelism": parallelism,
                     })
 
                     # --- Update rolling average speed for this client ---
@@ -442,10 +754,9 @@ class ByteStreamer:
                     else:
                         # Exponential moving average: 30% new, 70% history
                         client_avg_mbps[client_index] = 0.7 * prev + 0.3 * avg_mbps
-                    
+
                     # --- Log Analytics to DB ---
-                    entry["chunk_size"] = chunk_size
-                    asyncio.create_task(db.log_stream_stats(entry))
+                    _spawn(db.log_stream_stats(entry))
 
                     async def delayed_pop():
                         await asyncio.sleep(3)
@@ -454,26 +765,41 @@ class ByteStreamer:
                                 RECENT_STREAMS.appendleft(ACTIVE_STREAMS.pop(stream_id))
                         except Exception:
                             pass
-                    
-                    asyncio.create_task(delayed_pop())
+
+                    _spawn(delayed_pop())
                 finally:
                     try:
                         work_loads[client_index] -= 1
                     except Exception:
                         pass
 
-                stop_event.set()
+                # Parts handed to the playback session must be allowed to finish.
+                if playback is None:
+                    stop_event.set()
 
         return consumer_generator()
 
+    async def lease_media_session(self, file_id: FileId) -> Session:
+        """Media session for one stream, from the bot's connection pool for the DC.
+
+        Every call must be paired with ``session_pool.release(session)``.
+        """
+        primary = await self._get_media_session(file_id)
+        if self.client_index < 0:
+            return primary
+        return await session_pool.acquire(self.client_index, self.client, file_id.dc_id, primary)
+
     async def _get_media_session(self, file_id: FileId) -> Session:
-        dc = file_id.dc_id
+        return await self.get_dc_session(file_id.dc_id)
+
+    async def get_dc_session(self, dc: int) -> Session:
         media_session = self.client.media_sessions.get(dc)
 
         if media_session:
             return media_session
 
-        async with self._session_lock:
+        lock = self._session_locks.setdefault(dc, asyncio.Lock())
+        async with lock:
             media_session = self.client.media_sessions.get(dc)
             if media_session:
                 return media_session
@@ -481,35 +807,96 @@ class ByteStreamer:
             test_mode = await self.client.storage.test_mode()
             current_dc = await self.client.storage.dc_id()
 
-            if dc != current_dc:
-                auth_key = await Auth(self.client, dc, test_mode).create()
+            if dc == current_dc:
+                session = self._new_session(dc, await self.client.storage.auth_key(), test_mode)
+                await session.start()
             else:
-                auth_key = await self.client.storage.auth_key()
-
-            session = Session(self.client, dc, auth_key, test_mode, is_media=True)
-            session.no_updates = True
-            session.timeout = 30 
-            session.sleep_threshold = 60 
-
-            await session.start()
-
-            if dc != current_dc:
-                for _ in range(6):
+                # An auth key stored by an earlier run is still authorized on
+                # the DC, which skips both the key exchange and the import.
+                session = None
+                stored_key = await self._stored_auth_key(dc)
+                if stored_key:
+                    session = self._new_session(dc, stored_key, test_mode)
                     try:
-                        exported = await self.client.invoke(raw.functions.auth.ExportAuthorization(dc_id=dc))
-                        await session.send(raw.functions.auth.ImportAuthorization(id=exported.id, bytes=exported.bytes))
-                        break
-                    except AuthBytesInvalid:
-                        LOGGER.debug("AuthBytesInvalid during media session import; retrying...")
-                        await asyncio.sleep(0.5)
-                    except OSError:
-                        LOGGER.debug("OSError during media session import; retrying...")
-                        await asyncio.sleep(1)
+                        await asyncio.wait_for(session.start(), STORED_KEY_TIMEOUT)
+                        authorized = await self._is_authorized(session)
+                    except Exception as e:
+                        LOGGER.debug("Media session on stored auth key for DC %s failed: %r", dc, e)
+                        authorized = False
+                    if not authorized:
+                        LOGGER.debug("Stored auth key for DC %s rejected; authorizing again", dc)
+                        await self._stop_quietly(session)
+                        await self._store_auth_key(dc, None)
+                        session = None
+                if session is None:
+                    auth_key = await Auth(self.client, dc, test_mode).create()
+                    session = self._new_session(dc, auth_key, test_mode)
+                    await session.start()
+                    for _ in range(6):
+                        try:
+                            exported = await self.client.invoke(raw.functions.auth.ExportAuthorization(dc_id=dc))
+                            await session.send(raw.functions.auth.ImportAuthorization(id=exported.id, bytes=exported.bytes))
+                            await self._store_auth_key(dc, auth_key)
+                            break
+                        except AuthBytesInvalid:
+                            LOGGER.debug("AuthBytesInvalid during media session import; retrying...")
+                            await asyncio.sleep(0.5)
+                        except OSError:
+                            LOGGER.debug("OSError during media session import; retrying...")
+                            await asyncio.sleep(1)
+                        except Exception:
+                            # Never cache a session the import failed on.
+                            await session.stop()
+                            raise
 
             self.client.media_sessions[dc] = session
             LOGGER.debug("Created media session for DC %s", dc)
             return session
 
+    def _new_session(self, dc: int, auth_key: bytes, test_mode: bool) -> Session:
+        session = Session(self.client, dc, auth_key, test_mode, is_media=True)
+        session.no_updates = True
+        session.timeout = 30
+        session.sleep_threshold = 60
+        return session
+
+    @staticmethod
+    async def _stop_quietly(session: Session) -> None:
+        """Stop a session whose start may have been cut short."""
+        if session.connection is None:
+            return
+        try:
+            await session.stop()
+        except Exception as e:
+            LOGGER.debug("Could not stop media session: %r", e)
+
+    @staticmethod
+    async def _is_authorized(session: Session) -> bool:
+        try:
+            await session.send(raw.functions.updates.GetState(), timeout=10)
+        except Unauthorized:
+            return False
+        except Exception:
+            pass  # anything but 401 means the key itself was accepted
+        return True
+
+    async def _stored_auth_key(self, dc: int) -> Optional[bytes]:
+        key = client_session_keys.get(self.client_index)
+        if not key or not Telegram.PERSIST_BOT_SESSIONS:
+            return None
+        doc = await db.get_bot_session(key) or {}
+        return (doc.get("media_auth_keys") or {}).get(str(dc))
+
+    async def _store_auth_key(self, dc: int, auth_key: Optional[bytes]) -> None:
+        """Persist the auth key authorized on ``dc`` (in plaintext), or drop it with ``None``."""
+        key = client_session_keys.get(self.client_index)
+        if not key or not Telegram.PERSIST_BOT_SESSIONS:
+            return
+        try:
+            await db.save_media_auth_key(key, dc, auth_key)
+        except Exception as e:
+            LOGGER.debug("Could not store auth key for DC %s: %s", dc, e)
+
     @staticmethod
     async def _get_location(file_id: FileId) -> Union[
         raw.types.InputPhotoFileLocation,
@@ -550,188 +937,28 @@ class ByteStreamer:
             thumb_size=file_id.thumbnail_size,
         )
 
-    async def _clean_cache(self) -> None:
-        while True:
-            await asyncio.sleep(self.CLEAN_INTERVAL)
-            self._file_id_cache.clear()
-            LOGGER.debug("ByteStreamer: cleared file_id cache")
-
 
-# ---------------------------------------------------------------------------
-# Speed Test helper – runs independently, on-demand per file
-# ---------------------------------------------------------------------------
+# Telegram's production DCs; 3 hosts almost no media.
+WARM_DCS = (1, 2, 4, 5)
+WARMUP_TIMEOUT = 30.0
 
-TEST_CHUNK_SIZE = 100 * 1024 * 1024  # 100 MB per test download
 
+async def warm_media_sessions() -> None:
+    """Open a media session to every DC on every bot at once.
 
-async def _speed_test_single_client(
-    client: Client,
-    client_index: int,
-    chat_id: int,
-    message_id: int,
-    progress_callback=None,
-) -> dict:
-    """
-    Benchmark one client: fetch a FRESH FileId (file reference is per-session),
-    then measure ping (time-to-first-byte) and download throughput for
-    TEST_CHUNK_SIZE bytes of the target file.
-    """
-    dc_id = client_dc_map.get(client_index, "?")
-    result = {
-        "client_index": client_index,
-        "dc_id": dc_id,
-        "ping_ms": None,
-        "speed_mbps": None,
-        "time_taken_sec": None,
-        "bytes_downloaded": 0,
-        "error": None,
-    }
-    try:
-        # Each client MUST fetch its own FileId — file references are
-        # per-session and will raise FILE_REFERENCE_EXPIRED if shared.
-        streamer = ByteStreamer(client)
-        file_id = await streamer.get_file_properties(chat_id, message_id)
-
-        media_session = await streamer._get_media_session(file_id)
-        location = await ByteStreamer._get_location(file_id)
-
-        # --- Ping: time to first byte ---
-        ping_start = time.perf_counter()
-        tiny = await media_session.send(
-            raw.functions.upload.GetFile(location=location, offset=0, limit=4096)
-        )
-        ping_end = time.perf_counter()
-        ping_ms = (ping_end - ping_start) * 1000
-        result["ping_ms"] = round(ping_ms, 2)
-
-        if not getattr(tiny, "bytes", None):
-            result["error"] = "No data on ping probe"
-            return result
-
-        # --- Download: TEST_CHUNK_SIZE bytes with concurrency ---
-        dl_start = time.perf_counter()
-        last_progress_time = dl_start
-        total_bytes = 0
-        
-        chunk_size = 512 * 1024  # 512 KB per request
-        max_concurrent_chunks = 8 # Telegram caps around 8-10 connections/requests
-        
-        queue = asyncio.Queue()
-        # Seed the queue with offsets from 0 to TEST_CHUNK_SIZE
-        target_offsets = list(range(0, TEST_CHUNK_SIZE, chunk_size))
-        for off in target_offsets:
-            queue.put_nowait(off)
-            
-        eof_reached = False
-        
-        async def fetch_chunk_worker():
-            nonlocal total_bytes, last_progress_time, eof_reached
-            while not queue.empty() and not eof_reached:
-                offset = queue.get_nowait()
-                fetch_size = min(chunk_size, TEST_CHUNK_SIZE - offset)
-                
-                try:
-                    r = await asyncio.wait_for(
-                        media_session.send(
-                            raw.functions.upload.GetFile(
-                                location=location, offset=offset, limit=fetch_size
-                            )
-                        ),
-                        timeout=15.0,
-                    )
-                    chunk = getattr(r, "bytes", None)
-                    if not chunk:
-                        eof_reached = True
-                        queue.task_done()
-                        continue
-                        
-                    bytes_got = len(chunk)
-                    total_bytes += bytes_got
-                    
-                    if bytes_got < fetch_size:
-                        eof_reached = True  # Natural EOF
-                        
-                    # Fire progress callback roughly every 1 second
-                    now = time.perf_counter()
-                    if progress_callback and (now - last_progress_time) >= 1.0:
-                        elapsed_so_far = now - dl_start
-                        if elapsed_so_far > 0:
-                            current_speed = (total_bytes / (1024 * 1024)) / elapsed_so_far
-                            prog_res = dict(result)
-                            prog_res["bytes_downloaded"] = total_bytes
-                            prog_res["time_taken_sec"] = round(elapsed_so_far, 3)
-                            prog_res["speed_mbps"] = round(current_speed, 3)
-                            
-                            # Fire and forget callback (create_task) since we're in a worker
-                            if asyncio.iscoroutinefunction(progress_callback):
-                                asyncio.create_task(progress_callback(prog_res))
-                            else:
-                                progress_callback(prog_res)
-                        last_progress_time = now
-
-                except asyncio.TimeoutError:
-                    # Expected during a speed probe — Telegram throttled or DC is slow.
-                    # Log at DEBUG so it doesn't pollute the production error log.
-                    LOGGER.debug(
-                        "Speed-test chunk timeout client=%s offset=%s (skipping)",
-                        client_index, offset,
-                    )
-                except Exception as e:
-                    # Other transient errors (FloodWait, network blip, etc.)
-                    LOGGER.debug(
-                        "Speed-test fetch error client=%s offset=%s: %s",
-                        client_index, offset, e,
-                    )
-                    
-                finally:
-                    queue.task_done()
-
-        # Spawn workers
-        workers = [
-            asyncio.create_task(fetch_chunk_worker())
-            for _ in range(max_concurrent_chunks)
-        ]
-        
-        await queue.join()
-        for w in workers:
-            w.cancel()
-
-        dl_end = time.perf_counter()
-        elapsed = dl_end - dl_start
-        if elapsed <= 0:
-            elapsed = 1e-6
-
-        speed_mbps = (total_bytes / (1024 * 1024)) / elapsed
-        result["bytes_downloaded"] = total_bytes
-        result["time_taken_sec"] = round(elapsed, 3)
-        result["speed_mbps"] = round(speed_mbps, 3)
-
-    except Exception as exc:
-        result["error"] = str(exc)
-        LOGGER.warning("Speed test failed for client %s (DC %s): %s", client_index, dc_id, exc)
-
-    return result
-
-
-async def run_speed_test(chat_id: int, message_id: int) -> List[dict]:
-    """
-    Run a parallel speed test against all active bot clients for the file
-    identified by (chat_id, message_id).
-
-    Each client fetches its own fresh FileId to avoid FILE_REFERENCE_EXPIRED.
-    Returns a list of per-client result dicts sorted by speed descending.
+    Waits at most ``WARMUP_TIMEOUT`` seconds; sessions still connecting then
+    finish in the background.
     """
-    if not multi_clients:
-        return [{"error": "No bot clients connected"}]
-
-    tasks = [
-        _speed_test_single_client(client, idx, chat_id, message_id)
-        for idx, client in multi_clients.items()
-    ]
-
-    results = await asyncio.gather(*tasks, return_exceptions=False)
-    results.sort(
-        key=lambda r: r.get("speed_mbps") or -1,
-        reverse=True,
+    tasks = []
+    for idx, client in list(multi_clients.items()):
+        streamer = ByteStreamer._instances.get(idx) or ByteStreamer(client, idx)
+        tasks += [asyncio.create_task(streamer.get_dc_session(dc)) for dc in WARM_DCS]
+    if not tasks:
+        return
+    started = time.perf_counter()
+    done, pending = await asyncio.wait(tasks, timeout=WARMUP_TIMEOUT)
+    failed = sum(1 for task in done if task.exception() is not None)
+    LOGGER.info(
+        f"Warmed {len(done) - failed}/{len(tasks)} media sessions in {time.perf_counter() - started:.1f}s"
+        + (f" ({len(pending)} still connecting)" if pending else "")
     )
-    return list(results)
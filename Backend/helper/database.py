@@ -1,11 +1,13 @@
+import asyncio
 import secrets
 import string
 from asyncio import create_task
+from collections import deque
 from bson import ObjectId
 import motor.motor_asyncio
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 from pydantic import ValidationError
-from pymongo import ASCENDING, DESCENDING
+from pymongo import ASCENDING, DESCENDING, ReplaceOne
 from typing import Dict, List, Optional, Tuple, Any
 
 from Backend.logger import LOGGER
@@ -14,6 +16,13 @@ import re
 from Backend.helper.encrypt import decode_string
 from Backend.helper.modal import Episode, MovieSchema, QualityDetail, Season, TVShowSchema
 from Backend.helper.task_manager import delete_message
+from Backend.helper.token_cache import token_cache
+from Backend.helper.indexes import index_manager
+from Backend.helper.shards import ShardResults, shard_fanout
+from Backend.helper.catalog_cache import catalog_cache
+from Backend.helper.catalog_pager import (
+    CATALOG_WALK_BATCH, catalog_pager, keyset_filter, position_of, sort_key
+)
 
 
 def convert_objectid_to_str(document: Dict[str, Any]) -> Dict[str, Any]:
@@ -39,6 +48,9 @@ class Database:
         self.dbs: Dict[str, motor.motor_asyncio.AsyncIOMotorDatabase] = {}
 
         self.current_db_index = 1
+        # Set once the streams lookup covers the whole library; until then a
+        # miss there still falls back to scanning the storage databases.
+        self.streams_ready = False
 
     async def connect(self):
         try:
@@ -63,6 +75,12 @@ class Database:
 
             LOGGER.info(f"Active storage DB: storage_{self.current_db_index}")
 
+            self.streams_ready = bool(await self.dbs["tracking"]["state"].find_one({"_id": "streams_backfill"}))
+            if not self.streams_ready:
+                LOGGER.warning("Stream lookup not backfilled yet, run /backfillstreams once")
+
+            await index_manager.ensure(self.dbs)
+
         except Exception as e:
             LOGGER.error(f"Database connection error: {e}")
 
@@ -132,6 +150,7 @@ class Database:
                 "$unset": {"pending_payment": ""}
             }
         )
+        token_cache.invalidate_user(user_id)
         return await self.get_user(user_id)
 
     async def reject_payment(self, user_id: int) -> bool:
@@ -153,6 +172,7 @@ class Database:
             {"_id": user_id},
             {"$set": {"subscription_status": "expired"}}
         )
+        token_cache.invalidate_user(user_id)
 
     async def get_expiring_users(self, hours: int = 24) -> List[dict]:
         from datetime import timedelta
@@ -240,6 +260,7 @@ class Database:
                 {"_id": user_id},
                 {"$set": {"subscription_expiry": new_expiry, "subscription_status": status}}
             )
+            token_cache.invalidate_user(user_id)
             return result.modified_count > 0
             
         elif action == "delete":
@@ -247,6 +268,7 @@ class Database:
                 {"_id": user_id},
                 {"$unset": {"subscription_expiry": "", "subscription_status": ""}}
             )
+            token_cache.invalidate_user(user_id)
             return result.modified_count > 0
             
         return False
@@ -282,6 +304,7 @@ class Database:
             },
             upsert=True
         )
+        token_cache.invalidate_user(user_id)
         return {
             "user_id": user_id,
             "subscription_expiry": new_expiry.isoformat(),
@@ -299,6 +322,27 @@ class Database:
             return {sort_field: DESCENDING if sort_direction.lower() == "desc" else ASCENDING}
         return {"updated_on": DESCENDING}
 
+    def _storage_shards(self, all_dbs: bool = False) -> Dict[int, motor.motor_asyncio.AsyncIOMotorDatabase]:
+        last = len(self.dbs) - 1 if all_dbs else self.current_db_index
+        return {i: self.dbs[f"storage_{i}"] for i in range(1, last + 1) if f"storage_{i}" in self.dbs}
+
+    async def _scatter(self, query, all_dbs: bool = False, shards: Optional[dict] = None) -> ShardResults:
+        """Run ``query(db_index, db)`` on every storage DB concurrently; see ``ShardFanout``."""
+        return await shard_fanout.gather(self._storage_shards(all_dbs) if shards is None else shards, query)
+
+    async def _count_collection(self, collection_name: str, filter_dict: dict) -> int:
+        scope = catalog_pager.scope(collection_name, filter_dict)
+        total_count = catalog_pager.cached_count(scope)
+        if total_count is None:
+            async def count(db_index, db):
+                return await db[collection_name].count_documents(filter_dict)
+
+            counts = await self._scatter(count)
+            total_count = sum(counts.values.values())
+            if not counts.partial:
+                catalog_pager.store_count(scope, total_count)
+        return total_count
+
     async def _paginate_collection(
         self,
         collection_name: str,
@@ -307,52 +351,81 @@ class Database:
         page_size: int,
         filter_dict: Optional[dict] = None
     ):
+        """One catalog page in global ``(sort field, _id)`` order across all storage DBs.
+
+        Each DB returns its next sorted slice after its own position and the
+        slices are k-way merged. The start position is the one remembered for
+        this ``page``; for a page nobody asked for yet, the DBs are walked
+        from the nearest remembered position in keyset batches of at most
+        ``CATALOG_WALK_BATCH`` documents, remembering every page boundary on
+        the way. A DB is only read again once the merge has used up its
+        batch, so each one reads what it contributes plus one batch.
+        """
         filter_dict = filter_dict or {}
+        (field, direction), = sort_dict.items()
         skip = (page - 1) * page_size
-        results = []
-        dbs_checked = []
-        total_count = 0
-
-        db_counts = []
-        for i in range(1, self.current_db_index + 1):
-            db_key = f"storage_{i}"
-            db = self.dbs[db_key]
-            count = await db[collection_name].count_documents(filter_dict)
-            db_counts.append((i, count))
-            total_count += count
-
-        start_db_index = None
-        for db_index, count in reversed(db_counts):
-            if skip < count:
-                start_db_index = db_index
-                break
-            skip -= count
-
-        if not start_db_index:
-            return [], [], total_count
-
-        for db_index, count in reversed(db_counts):
-            if db_index < start_db_index:
-                continue
-
-            db_key = f"storage_{db_index}"
-            db = self.dbs[db_key]
-            dbs_checked.append(db_index)
-
+        scope = catalog_pager.scope(collection_name, filter_dict, field, direction)
+        base_skip, position = catalog_pager.lookup(scope, skip)
+        gap = skip - base_skip
+        batch = max(page_size, min(gap, CATALOG_WALK_BATCH))
+        descending = direction == DESCENDING
+
+        shards = self._storage_shards()
+        positions = {db_index: position for db_index in shards}
+        buffers: Dict[int, deque] = {db_index: deque() for db_index in shards}
+        exhausted = set()
+
+        async def fetch(db_index, db):
+            query = filter_dict
+            if positions[db_index] is not None:
+                after = keyset_filter(field, direction, positions[db_index])
+                query = {"$and": [filter_dict, after]} if filter_dict else after
             cursor = (
                 db[collection_name]
-                .find(filter_dict)
-                .sort(sort_dict)
-                .skip(skip if db_index == start_db_index else 0)
-                .limit(page_size - len(results))
+                .find(query)
+                .sort([(field, direction), ("_id", direction)])
+                .limit(batch)
             )
-
-            docs = await cursor.to_list(None)
-            results.extend(docs)
-
-            if len(results) >= page_size:
-                break
-
+            return await cursor.to_list(None)
+
+        async def refill():
+            empty = {i: shards[i] for i, buffer in buffers.items() if not buffer and i not in exhausted}
+            if not empty:
+                return
+            slices = await self._scatter(fetch, shards=empty)
+            for db_index in empty:
+                docs = slices.values.get(db_index, [])
+                buffers[db_index].extend(docs)
+                if len(docs) < batch:  # drained, or failed and left out of this page
+                    exhausted.add(db_index)
+
+        count_task = asyncio.create_task(self._count_collection(collection_name, filter_dict))
+        page_items = []
+        try:
+            consumed = 0
+            while consumed < gap + page_size:
+                await refill()
+                heads = [(sort_key(buffer[0], field), db_index) for db_index, buffer in buffers.items() if buffer]
+                if not heads:
+                    break
+                _, db_index = max(heads) if descending else min(heads)
+                doc = buffers[db_index].popleft()
+                positions[db_index] = position_of(doc, field)
+                consumed += 1
+                if consumed > gap:
+                    page_items.append((db_index, doc))
+                elif consumed % page_size == 0:
+                    catalog_pager.remember(scope, base_skip + consumed, positions[db_index])
+            total_count = await count_task
+        finally:
+            if not count_task.done():
+                count_task.cancel()
+
+        if len(page_items) == page_size:
+            catalog_pager.remember(scope, skip + page_size, position_of(page_items[-1][1], field))
+
+        results = [doc for _, doc in page_items]
+        dbs_checked = sorted({db_index for db_index, _ in page_items}, reverse=True)
         return results, dbs_checked, total_count
 
     async def _move_document(
@@ -501,6 +574,8 @@ class Database:
             try:
                 movie_dict["db_index"] = self.current_db_index
                 result = await self.dbs[current_db_key]["movie"].insert_one(movie_dict)
+                self._catalog_changed("movie")
+                await self._index_streams("movie", movie_dict, self.current_db_index)
                 return result.inserted_id
             except Exception as e:
                 LOGGER.error(f"Insertion failed in {current_db_key}: {e}")
@@ -545,6 +620,8 @@ class Database:
         if existing_db_index != self.current_db_index:
             try:
                 if await self._move_document("movie", existing_movie, existing_db_index):
+                    self._catalog_changed("movie")
+                    await self._index_streams("movie", existing_movie, self.current_db_index)
                     return movie_id
             except Exception as e:
                 LOGGER.error(f"Error moving movie to {current_db_key}: {e}")
@@ -553,6 +630,8 @@ class Database:
 
         try:
             await self.dbs[existing_db_key]["movie"].replace_one({"_id": movie_id}, existing_movie)
+            self._catalog_changed("movie")
+            await self._index_streams("movie", existing_movie, existing_db_index)
             return movie_id
         except Exception as e:
             LOGGER.error(f"Failed to update movie {tmdb_id} in {existing_db_key}: {e}")
@@ -606,6 +685,8 @@ class Database:
             try:
                 tv_show_dict["db_index"] = self.current_db_index
                 result = await self.dbs[current_db_key]["tv"].insert_one(tv_show_dict)
+                self._catalog_changed("tv")
+                await self._index_streams("tv", tv_show_dict, self.current_db_index)
                 return result.inserted_id
             except Exception as e:
                 LOGGER.error(f"Insertion failed in {current_db_key}: {e}")
@@ -685,6 +766,8 @@ class Database:
         if existing_db_index != self.current_db_index:
             try:
                 if await self._move_document("tv", existing_tv, existing_db_index):
+                    self._catalog_changed("tv")
+                    await self._index_streams("tv", existing_tv, self.current_db_index)
                     return tv_id
             except Exception as e:
                 LOGGER.error(f"Error moving TV show to {current_db_key}: {e}")
@@ -694,6 +777,8 @@ class Database:
 
         try:
             await self.dbs[existing_db_key]["tv"].replace_one({"_id": tv_id}, existing_tv)
+            self._catalog_changed("tv")
+            await self._index_streams("tv", existing_tv, existing_db_index)
             return tv_id
         except Exception as e:
             LOGGER.error(f"Failed to update TV show {tmdb_id} in {existing_db_key}: {e}")
@@ -744,12 +829,17 @@ class Database:
                 '$regex': '.*' + '.*'.join(words) + '.*', 
                 '$options': 'i'
             }
+            tv_match = {"$or": [
+                {"title": regex_query},
+                {"seasons.episodes.telegram.name": regex_query}
+            ]}
+            movie_match = {"$or": [
+                {"title": regex_query},
+                {"telegram.name": regex_query}
+            ]}
             
             tv_pipeline = [
-                {"$match": {"$or": [
-                    {"title": regex_query},
-                    {"seasons.episodes.telegram.name": regex_query}
-                ]}},
+                {"$match": tv_match},
                 {"$project": {
                     "_id": 1, "tmdb_id": 1, "title": 1, "genres": 1, "rating": 1, "imdb_id": 1,
                     "release_year": 1, "poster": 1, "backdrop": 1, "description": 1, "logo": 1,
@@ -758,58 +848,29 @@ class Database:
             ]
             
             movie_pipeline = [
-                {"$match": {"$or": [
-                    {"title": regex_query},
-                    {"telegram.name": regex_query}
-                ]}},
+                {"$match": movie_match},
                 {"$project": {
                     "_id": 1, "tmdb_id": 1, "title": 1, "genres": 1, "rating": 1,
                     "release_year": 1, "poster": 1, "backdrop": 1, "description": 1,
                     "media_type": 1, "db_index": 1, "imdb_id": 1, "logo": 1
                 }}
             ]
-            
-            results = []
-            dbs_checked = []
-            
-            active_db_key = f"storage_{self.current_db_index}"
-            active_db = self.dbs[active_db_key]
-            dbs_checked.append(self.current_db_index)
-            
-            tv_results = await active_db["tv"].aggregate(tv_pipeline).to_list(None)
-            movie_results = await active_db["movie"].aggregate(movie_pipeline).to_list(None)
-            combined = tv_results + movie_results
-            results.extend(combined)
-            
-            if len(results) < page_size:
-                previous_db_index = self.current_db_index - 1
-                while previous_db_index > 0 and len(results) < page_size:
-                    prev_db_key = f"storage_{previous_db_index}"
-                    prev_db = self.dbs[prev_db_key]
-                    tv_results_prev = await prev_db["tv"].aggregate(tv_pipeline).to_list(None)
-                    movie_results_prev = await prev_db["movie"].aggregate(movie_pipeline).to_list(None)
-                    combined_prev = tv_results_prev + movie_results_prev
-                    results.extend(combined_prev)
-                    dbs_checked.append(previous_db_index)
-                    previous_db_index -= 1
-
-            total_count = 0
-            for db_index in dbs_checked:
-                key = f"storage_{db_index}"
-                db = self.dbs[key]
-                tv_count = await db["tv"].count_documents({
-                    "$or": [
-                        {"title": regex_query},
-                        {"seasons.episodes.telegram.name": regex_query}
-                    ]
-                })
-                movie_count = await db["movie"].count_documents({
-                    "$or": [
-                        {"title": regex_query},
-                        {"telegram.name": regex_query}
-                    ]
-                })
-                total_count += (tv_count + movie_count)
+
+            # Results only need to reach the end of the requested page.
+            limit = skip + page_size
+
+            async def search(db_index, db):
+                tv_results, movie_results, tv_count, movie_count = await asyncio.gather(
+                    db["tv"].aggregate(tv_pipeline + [{"$limit": limit}]).to_list(None),
+                    db["movie"].aggregate(movie_pipeline + [{"$limit": limit}]).to_list(None),
+                    db["tv"].count_documents(tv_match),
+                    db["movie"].count_documents(movie_match),
+                )
+                return tv_results + movie_results, tv_count + movie_count
+
+            found = await self._scatter(search)
+            results = [doc for docs, _ in found.ordered(reverse=True) for doc in docs]
+            total_count = sum(count for _, count in found.values.values())
             
             paged_results = results[skip:skip + page_size]
 
@@ -853,12 +914,10 @@ class Database:
                 "kitsu_id": doc.get("kitsu_id") or kitsu_id,
             }
 
-        for db_idx in range(self.current_db_index, 0, -1):
-            db_key = f"storage_{db_idx}"
-
+        async def lookup(db_idx, db):
             # ---------- absolute episode (Kitsu-style) ----------
             if absolute_episode is not None:
-                tv_show = await self.dbs[db_key]["tv"].find_one(doc_filter)
+                tv_show = await db["tv"].find_one(doc_filter)
                 if tv_show:
                     for season in tv_show.get("seasons", []):
                         for episode in season.get("episodes", []):
@@ -899,7 +958,7 @@ class Database:
 
             # ---------- season + episode ----------
             elif episode_number is not None and season_number is not None:
-                tv_show = await self.dbs[db_key]["tv"].find_one(doc_filter)
+                tv_show = await db["tv"].find_one(doc_filter)
                 if tv_show:
                     for season in tv_show.get("seasons", []):
                         if season.get("season_number") == season_number:
@@ -918,7 +977,7 @@ class Database:
 
             # ---------- season only ----------
             elif season_number is not None:
-                tv_show = await self.dbs[db_key]["tv"].find_one(doc_filter)
+                tv_show = await db["tv"].find_one(doc_filter)
                 if tv_show:
                     for season in tv_show.get("seasons", []):
                         if season.get("season_number") == season_number:
@@ -933,20 +992,27 @@ class Database:
 
             # ---------- whole series / movie ----------
             else:
-                tv_doc = await self.dbs[db_key]["tv"].find_one(doc_filter)
+                tv_doc = await db["tv"].find_one(doc_filter)
                 if tv_doc:
                     tv_doc = convert_objectid_to_str(tv_doc)
                     tv_doc["type"] = "tv"
                     tv_doc["db_index"] = db_idx
                     return tv_doc
 
-                movie_doc = await self.dbs[db_key]["movie"].find_one(doc_filter)
+                movie_doc = await db["movie"].find_one(doc_filter)
                 if movie_doc:
                     movie_doc = convert_objectid_to_str(movie_doc)
                     movie_doc["type"] = "movie"
                     movie_doc["db_index"] = db_idx
                     return movie_doc
 
+            return None
+
+        # Every storage DB is asked at once; the newest one holding the title wins.
+        found = await self._scatter(lookup)
+        for details in found.ordered(reverse=True):
+            if details:
+                return details
         return None
 
     # -------------------------------
@@ -975,6 +1041,8 @@ class Database:
 
         try:
             result = await collection.update_one({"tmdb_id": int(tmdb_id)}, {"$set": update_data})
+            if result.modified_count > 0:
+                await self._reindex_streams(collection_name, db_index, update_data.get("tmdb_id", tmdb_id), tmdb_id)
 
             return result.modified_count > 0
 
@@ -1007,6 +1075,7 @@ class Database:
                     LOGGER.info(f"Deleted document tmdb_id {tmdb_id} from {db_key}")
                     self.current_db_index = next_db_index
                     await self.update_current_db_index()
+                    await self._reindex_streams(collection_name, next_db_index, old_doc.get("tmdb_id", tmdb_id), tmdb_id)
                     LOGGER.info(f"Switched to {new_db_key} and document migrated successfully.")
                     return True
 
@@ -1052,73 +1121,69 @@ class Database:
             result = await self.dbs[db_key]["tv"].delete_one({"tmdb_id": tmdb_id})
         
         if result.deleted_count > 0:
+            await self._unindex_streams("movie" if media_type == "Movie" else "tv", tmdb_id)
             LOGGER.info(f"{media_type} with tmdb_id {tmdb_id} deleted successfully.")
             return True
         LOGGER.info(f"No document found with tmdb_id {tmdb_id}.")
         return False
 
     async def get_title_by_stream_id(self, stream_id_hash: str) -> Optional[str]:
-        """Look up the original media title across all storage DBs using the telegram file ID hash.
+        """Look up the original media title using the telegram file ID hash.
         For TV shows, it includes the Season and Episode number in the title."""
-        for i in range(1, self.current_db_index + 1):
-            db = self.dbs[f"storage_{i}"]
-            
-            # Check Movies
-            movie = await db["movie"].find_one({"telegram.id": stream_id_hash})
-            if movie and "telegram" in movie:
-                for t in movie["telegram"]:
-                    if t.get("id") == stream_id_hash:
-                        return movie.get("title")
-
-            # Check TV Shows
-            tv = await db["tv"].find_one({"seasons.episodes.telegram.id": stream_id_hash})
-            if tv and "seasons" in tv:
-                title = tv.get("title", "Unknown Series")
-                for season in tv.get("seasons", []):
-                    for episode in season.get("episodes", []):
-                        for t in episode.get("telegram", []):
-                            if t.get("id") == stream_id_hash:
-                                s_num = season.get("season_number", 0)
-                                e_num = episode.get("episode_number", 0)
-                                return f"{title} S{s_num:02d}E{e_num:02d}"
+        entry = await self.get_stream_entry(stream_id_hash)
+        if not entry:
+            return None
+        if entry["media_type"] == "movie":
+            return entry.get("title")
+        title = entry.get("title") or "Unknown Series"
+        return f"{title} S{entry.get('season') or 0:02d}E{entry.get('episode') or 0:02d}"
+
+    async def _delete_stream_in(self, db, stream_id_hash: str) -> bool:
+        # Check Movies
+        movie = await db["movie"].find_one({"telegram.id": stream_id_hash})
+        if movie:
+            movie["telegram"] = [q for q in movie.get("telegram", []) if q.get("id") != stream_id_hash]
+            if len(movie["telegram"]) == 0:
+                await db["movie"].delete_one({"_id": movie["_id"]})
+            else:
+                movie['updated_on'] = datetime.utcnow()
+                await db["movie"].replace_one({"_id": movie["_id"]}, movie)
+            return True
 
-        return None
+        # Check TV Shows
+        tv = await db["tv"].find_one({"seasons.episodes.telegram.id": stream_id_hash})
+        if tv:
+            for season in tv.get("seasons", []):
+                for episode in season.get("episodes", []):
+                    for q in episode.get("telegram", []):
+                        if q.get("id") == stream_id_hash:
+                            episode["telegram"] = [t for t in episode.get("telegram", []) if t.get("id") != stream_id_hash]
+                            if len(episode["telegram"]) == 0:
+                                season["episodes"] = [e for e in season.get("episodes", []) if e.get("episode_number") != episode.get("episode_number")]
+                                if len(season["episodes"]) == 0:
+                                    tv["seasons"] = [s for s in tv.get("seasons", []) if s.get("season_number") != season.get("season_number")]
+                                    if len(tv["seasons"]) == 0:
+                                        await db["tv"].delete_one({"_id": tv["_id"]})
+                                        return True
+                            tv['updated_on'] = datetime.utcnow()
+                            await db["tv"].replace_one({"_id": tv["_id"]}, tv)
+                            return True
+        return False
 
     async def delete_media_by_stream_id(self, stream_id_hash: str) -> bool:
-        """Finds and removes a specific stream quality by its hash across all DBs. 
+        """Finds and removes a specific stream quality by its hash.
         If it's the last quality, it cleans up the movie or episode/season/show."""
-        for i in range(1, self.current_db_index + 1):
-            db = self.dbs[f"storage_{i}"]
-            
-            # Check Movies
-            movie = await db["movie"].find_one({"telegram.id": stream_id_hash})
-            if movie:
-                movie["telegram"] = [q for q in movie.get("telegram", []) if q.get("id") != stream_id_hash]
-                if len(movie["telegram"]) == 0:
-                    await db["movie"].delete_one({"_id": movie["_id"]})
-                else:
-                    movie['updated_on'] = datetime.utcnow()
-                    await db["movie"].replace_one({"_id": movie["_id"]}, movie)
+        entry = await self.get_stream_entry(stream_id_hash)
+        if not entry:
+            return False
+        db_indexes = [entry["db_index"]] + [i for i in range(1, self.current_db_index + 1) if i != entry["db_index"]]
+        for i in db_indexes:
+            db = self.dbs.get(f"storage_{i}")
+            if db is not None and await self._delete_stream_in(db, stream_id_hash):
+                self._catalog_changed(entry["media_type"])
+                await self.dbs["tracking"]["streams"].delete_one({"_id": stream_id_hash})
                 return True
-
-            # Check TV Shows
-            tv = await db["tv"].find_one({"seasons.episodes.telegram.id": stream_id_hash})
-            if tv:
-                for season in tv.get("seasons", []):
-                    for episode in season.get("episodes", []):
-                        for q in episode.get("telegram", []):
-                            if q.get("id") == stream_id_hash:
-                                episode["telegram"] = [t for t in episode.get("telegram", []) if t.get("id") != stream_id_hash]
-                                if len(episode["telegram"]) == 0:
-                                    season["episodes"] = [e for e in season.get("episodes", []) if e.get("episode_number") != episode.get("episode_number")]
-                                    if len(season["episodes"]) == 0:
-                                        tv["seasons"] = [s for s in tv.get("seasons", []) if s.get("season_number") != season.get("season_number")]
-                                        if len(tv["seasons"]) == 0:
-                                            await db["tv"].delete_one({"_id": tv["_id"]})
-                                            return True
-                                tv['updated_on'] = datetime.utcnow()
-                                await db["tv"].replace_one({"_id": tv["_id"]}, tv)
-                                return True
+        await self.dbs["tracking"]["streams"].delete_one({"_id": stream_id_hash})
         return False
 
     async def delete_movie_quality(self, tmdb_id: int, db_index: int, id: str) -> bool:
@@ -1149,6 +1214,9 @@ class Database:
         
         movie['updated_on'] = datetime.utcnow()
         result = await self.dbs[db_key]["movie"].replace_one({"tmdb_id": tmdb_id}, movie)
+        if result.modified_count > 0:
+            self._catalog_changed("movie")
+            await self._index_streams("movie", movie, db_index)
         return result.modified_count > 0
 
     async def delete_tv_episode(self, tmdb_id: int, db_index: int, season_number: int, episode_number: int) -> bool:
@@ -1185,6 +1253,9 @@ class Database:
         
         tv['updated_on'] = datetime.utcnow()
         result = await self.dbs[db_key]["tv"].replace_one({"tmdb_id": tmdb_id}, tv)
+        if result.modified_count > 0:
+            self._catalog_changed("tv")
+            await self._index_streams("tv", tv, db_index)
         return result.modified_count > 0
 
     async def delete_tv_season(self, tmdb_id: int, db_index: int, season_number: int) -> bool:
@@ -1217,6 +1288,9 @@ class Database:
         
         tv['updated_on'] = datetime.utcnow()
         result = await self.dbs[db_key]["tv"].replace_one({"tmdb_id": tmdb_id}, tv)
+        if result.modified_count > 0:
+            self._catalog_changed("tv")
+            await self._index_streams("tv", tv, db_index)
         return result.modified_count > 0
 
     async def delete_tv_quality(self, tmdb_id: int, db_index: int, season_number: int, episode_number: int, id: str) -> bool:
@@ -1253,26 +1327,40 @@ class Database:
             return False
         tv['updated_on'] = datetime.utcnow()
         result = await self.dbs[db_key]["tv"].replace_one({"tmdb_id": tmdb_id}, tv)
+        if result.modified_count > 0:
+            self._catalog_changed("tv")
+            await self._index_streams("tv", tv, db_index)
         return result.modified_count > 0
 
 
     # Get per-DB statistics (movies, tv shows, used size, etc.)
     async def get_database_stats(self):
-        stats = []
-        for key in self.dbs.keys():
-            if key.startswith("storage_"):
-                db = self.dbs[key]
-                movie_count = await db["movie"].count_documents({})
-                tv_count = await db["tv"].count_documents({})
-                db_stats = await db.command("dbstats")
-                stats.append({
-                    "db_name": key,
-                    "movie_count": movie_count,
-                    "tv_count": tv_count,
-                    "storageSize": db_stats.get("storageSize", 0),
-                    "dataSize": db_stats.get("dataSize", 0)
-                })
-        return stats
+        async def shard_stats(db_index, db):
+            movie_count, tv_count, db_stats = await asyncio.gather(
+                db["movie"].count_documents({}),
+                db["tv"].count_documents({}),
+                db.command("dbstats"),
+            )
+            return {
+                "db_name": f"storage_{db_index}",
+                "movie_count": movie_count,
+                "tv_count": tv_count,
+                "storageSize": db_stats.get("storageSize", 0),
+                "dataSize": db_stats.get("dataSize", 0)
+            }
+
+        found = await self._scatter(shard_stats, all_dbs=True)
+        stats = list(found.ordered())
+        for db_index, error in sorted(found.failed.items()):
+            stats.append({
+                "db_name": f"storage_{db_index}",
+                "movie_count": 0,
+                "tv_count": 0,
+                "storageSize": 0,
+                "dataSize": 0,
+                "error": error
+            })
+        return sorted(stats, key=lambda row: int(row["db_name"].split("_")[1]))
 
 
 
@@ -1307,6 +1395,8 @@ class Database:
         }
         
         await self.dbs["tracking"]["api_tokens"].insert_one(token_doc)
+        # A lookup made before the insert may have cached a miss.
+        token_cache.invalidate_token(token)
         return convert_objectid_to_str(token_doc)
 
     async def get_api_token(self, token: str) -> Optional[dict]:
@@ -1320,6 +1410,7 @@ class Database:
 
     async def revoke_api_token(self, token: str) -> bool:
         result = await self.dbs["tracking"]["api_tokens"].delete_one({"token": token})
+        token_cache.invalidate_token(token)
         return result.deleted_count > 0
 
     async def link_token_user(self, token: str, user_id: int) -> bool:
@@ -1328,6 +1419,7 @@ class Database:
             {"token": token},
             {"$set": {"user_id": user_id}}
         )
+        token_cache.invalidate_token(token)
         return result.modified_count > 0
 
     async def update_token_usage(self, token: str, bytes_delta: int):
@@ -1362,17 +1454,22 @@ class Database:
                 }
             }
         )
+        token_cache.add_usage(token, bytes_delta)
 
-    async def update_api_token_limits(self, token: str, daily_limit_gb: float, monthly_limit_gb: float) -> bool:
+    async def update_api_token_limits(
+        self, token: str, daily_limit_gb: float, monthly_limit_gb: float, rate_limit_mbps: float = None
+    ) -> bool:
         result = await self.dbs["tracking"]["api_tokens"].update_one(
             {"token": token},
             {"$set": {
                 "limits": {
                     "daily_limit_gb": daily_limit_gb if daily_limit_gb else 0,
-                    "monthly_limit_gb": monthly_limit_gb if monthly_limit_gb else 0
+                    "monthly_limit_gb": monthly_limit_gb if monthly_limit_gb else 0,
+                    "rate_limit_mbps": rate_limit_mbps if rate_limit_mbps else 0
                 }
             }}
         )
+        token_cache.invalidate_token(token)
         return result.modified_count > 0
 
     # -------------------------------
@@ -1422,11 +1519,8 @@ class Database:
         Scans all active storage databases for both movies and TV shows, returning a
         flattened list of dead links with their metadata for the Admin UI.
         """
-        dead_links = []
-        
-        for i in range(1, self.current_db_index + 1):
-            db_key = f"storage_{i}"
-            db = self.dbs[db_key]
+        async def scan(i, db):
+            dead_links = []
             
             # --- Scan Movies ---
             # Match any movie where at least one telegram entry has is_dead=True
@@ -1474,8 +1568,11 @@ class Database:
                                     "size": quality.get("size"),
                                     "date_added": quality.get("date_added")
                                 })
-                                
-        return dead_links
+
+            return dead_links
+
+        found = await self._scatter(scan)
+        return [link for links in found.ordered() for link in links]
 
     # -------------------------------
     # Stream Analytics
@@ -1562,6 +1659,227 @@ class Database:
             LOGGER.error(f"get_stream_analytics error: {e}")
             return {"summary": {}, "per_client": [], "recent": []}
 
+    # -------------------------------
+    # FileId Store
+    # -------------------------------
+
+    async def get_file_id_entry(self, key: str) -> Optional[dict]:
+        return await self.dbs["tracking"]["file_ids"].find_one(
+            {"_id": key, "expires_at": {"$gt": datetime.utcnow()}}
+        )
+
+    async def save_file_id_entry(self, key: str, entry: dict, ttl: int) -> None:
+        entry = dict(entry, expires_at=datetime.utcnow() + timedelta(seconds=ttl))
+        await self.dbs["tracking"]["file_ids"].replace_one({"_id": key}, entry, upsert=True)
+
+    async def clear_file_id_entries(self) -> int:
+        result = await self.dbs["tracking"]["file_ids"].delete_many({})
+        return result.deleted_count
+
+    # -------------------------------
+    # Bot Sessions
+    # -------------------------------
+
+    async def get_bot_session(self, key: str) -> Optional[dict]:
+        """Stored session string and media auth keys of one bot, keyed by a hash of its token.
+
+        Both are kept in plaintext; they are only written with PERSIST_BOT_SESSIONS.
+        """
+        try:
+            return await self.dbs["tracking"]["bot_sessions"].find_one({"_id": key})
+        except Exception as e:
+            LOGGER.warning(f"Could not load bot session {key}: {e}")
+            return None
+
+    async def save_bot_session(self, key: str, session_string: Optional[str]) -> None:
+        await self.dbs["tracking"]["bot_sessions"].update_one(
+            {"_id": key},
+            {"$set": {"session_string": session_string, "updated_at": datetime.utcnow()}},
+            upsert=True
+        )
+
+    async def save_media_auth_key(self, key: str, dc_id: int, auth_key: Optional[bytes]) -> None:
+        """Store the auth key authorized on ``dc_id`` for this bot, or drop it with ``None``."""
+        field = f"media_auth_keys.{dc_id}"
+        update = {"$set": {field: auth_key}} if auth_key else {"$unset": {field: ""}}
+        await self.dbs["tracking"]["bot_sessions"].update_one({"_id": key}, update, upsert=True)
+
+    # -------------------------------
+    # Stream Lookup
+    # -------------------------------
+
+    @staticmethod
+    def _catalog_changed(collection_name: str) -> None:
+        catalog_pager.invalidate(collection_name)
+        catalog_cache.invalidate(collection_name)
+
+    @staticmethod
+    async def _stream_entries(collection_name: str, doc: dict, db_index: int) -> List[dict]:
+        """One ``streams`` entry per quality of a stored movie or show."""
+        if collection_name == "movie":
+            located = [(None, None, q) for q in doc.get("telegram", [])]
+        else:
+            located = [
+                (season.get("season_number"), episode.get("episode_number"), q)
+                for season in doc.get("seasons", [])
+                for episode in season.get("episodes", [])
+                for q in episode.get("telegram", [])
+            ]
+
+        now = datetime.utcnow()
+        entries = []
+        for season_number, episode_number, quality in located:
+            stream_id = quality.get("id")
+            if not stream_id:
+                continue
+            try:
+                decoded = await decode_string(stream_id)
+                chat_id = int(f"-100{decoded['chat_id']}")
+                msg_id = int(decoded['msg_id'])
+            except Exception:
+                chat_id = msg_id = None
+            entries.append({
+                "_id": stream_id,
+                "db_index": int(db_index),
+                "media_type": collection_name,
+                "tmdb_id": doc.get("tmdb_id"),
+                "season": season_number,
+                "episode": episode_number,
+                "title": doc.get("title"),
+                "chat_id": chat_id,
+                "msg_id": msg_id,
+                "indexed_at": now,
+            })
+        return entries
+
+    async def _index_streams(self, collection_name: str, doc: dict, db_index: int) -> int:
+        """Point the lookup entries of ``doc`` at where it is stored and drop the ones it lost.
+
+        Failures are logged, not raised: the media write already succeeded and
+        ``/backfillstreams`` repairs the lookup. Also used on the read path, so
+        callers that changed the media drop the catalog caches themselves.
+        """
+        try:
+            streams = self.dbs["tracking"]["streams"]
+            entries = await self._stream_entries(collection_name, doc, db_index)
+            if entries:
+                await streams.bulk_write(
+                    [ReplaceOne({"_id": e["_id"]}, e, upsert=True) for e in entries], ordered=False
+                )
+            if doc.get("tmdb_id") is not None:
+                await streams.delete_many({
+                    "media_type": collection_name,
+                    "tmdb_id": doc["tmdb_id"],
+                    "_id": {"$nin": [e["_id"] for e in entries]},
+                })
+            return len(entries)
+        except Exception as e:
+            LOGGER.error(f"Failed to index streams of {collection_name} {doc.get('tmdb_id')}: {e}")
+            return 0
+
+    async def _unindex_streams(self, collection_name: str, tmdb_id: int) -> None:
+        self._catalog_changed(collection_name)
+        try:
+            await self.dbs["tracking"]["streams"].delete_many({"media_type": collection_name, "tmdb_id": int(tmdb_id)})
+        except Exception as e:
+            LOGGER.error(f"Failed to unindex streams of {collection_name} {tmdb_id}: {e}")
+
+    async def _reindex_streams(self, collection_name: str, db_index: int, tmdb_id: int, old_tmdb_id: int = None) -> None:
+        """Re-read a document after an edit and index it, clearing entries left under a changed tmdb_id."""
+        self._catalog_changed(collection_name)
+        if old_tmdb_id is not None and int(old_tmdb_id) != int(tmdb_id):
+            await self._unindex_streams(collection_name, old_tmdb_id)
+        doc = await self.dbs[f"storage_{db_index}"][collection_name].find_one({"tmdb_id": int(tmdb_id)})
+        if doc:
+            await self._index_streams(collection_name, doc, db_index)
+        else:
+            await self._unindex_streams(collection_name, tmdb_id)
+
+    async def _scan_for_stream(self, stream_id_hash: str) -> Optional[dict]:
+        # Library not backfilled yet: find the document the slow way and index it.
+        async def find(db_index, db):
+            for collection_name, field in (("movie", "telegram.id"), ("tv", "seasons.episodes.telegram.id")):
+                doc = await db[collection_name].find_one({field: stream_id_hash})
+                if doc:
+                    return collection_name, doc
+            return None
+
+        found = await self._scatter(find)
+        for db_index in sorted(found.values):
+            if found.values[db_index]:
+                collection_name, doc = found.values[db_index]
+                await self._index_streams(collection_name, doc, db_index)
+                return await self.dbs["tracking"]["streams"].find_one({"_id": stream_id_hash})
+        return None
+
+    async def get_stream_entry(self, stream_id_hash: str) -> Optional[dict]:
+        """Where a stream is stored: db_index, media type, tmdb_id, season, episode, title, chat and message."""
+        entry = await self.dbs["tracking"]["streams"].find_one({"_id": stream_id_hash})
+        if entry or self.streams_ready:
+            return entry
+        return await self._scan_for_stream(stream_id_hash)
+
+    async def has_stream(self, stream_id_hash: str) -> bool:
+        return await self.get_stream_entry(stream_id_hash) is not None
+
+    async def iter_stream_ids(self, batch_size: int = 100):
+        """Yield lists of every indexed stream id, paged by ``_id``."""
+        last_id = None
+        streams = self.dbs["tracking"]["streams"]
+        while True:
+            query = {"_id": {"$gt": last_id}} if last_id else {}
+            docs = await streams.find(query, {"_id": 1}).sort("_id", 1).limit(batch_size).to_list(length=batch_size)
+            if not docs:
+                return
+            last_id = docs[-1]["_id"]
+            yield [d["_id"] for d in docs]
+
+    async def delete_stream_entries_for_chat(self, chat_id: int) -> int:
+        result = await self.dbs["tracking"]["streams"].delete_many({"chat_id": chat_id})
+        return result.deleted_count
+
+    async def backfill_streams(self, batch_size: int = 500) -> dict:
+        """Rebuild the streams lookup from every storage database.
+
+        Entries are upserted in bulk and stamped with ``indexed_at``; anything
+        older than this run afterwards no longer belongs to a stored quality
+        and is removed. Writes made while it runs carry a newer stamp and
+        survive.
+        """
+        started = datetime.utcnow()
+        streams = self.dbs["tracking"]["streams"]
+        counts = {"movie": 0, "tv": 0, "streams": 0, "removed": 0}
+        total_storage_dbs = len(self.dbs) - 1
+
+        for i in range(1, total_storage_dbs + 1):
+            db = self.dbs[f"storage_{i}"]
+            for collection_name in ("movie", "tv"):
+                ops = []
+                projection = {"tmdb_id": 1, "title": 1, "telegram.id": 1, "seasons.season_number": 1,
+                              "seasons.episodes.episode_number": 1, "seasons.episodes.telegram.id": 1}
+                async for doc in db[collection_name].find({}, projection):
+                    counts[collection_name] += 1
+                    for entry in await self._stream_entries(collection_name, doc, i):
+                        ops.append(ReplaceOne({"_id": entry["_id"]}, entry, upsert=True))
+                    if len(ops) >= batch_size:
+                        await streams.bulk_write(ops, ordered=False)
+                        counts["streams"] += len(ops)
+                        ops = []
+                if ops:
+                    await streams.bulk_write(ops, ordered=False)
+                    counts["streams"] += len(ops)
+
+        result = await streams.delete_many({"indexed_at": {"$lt": started}})
+        counts["removed"] = result.deleted_count
+        await self.dbs["tracking"]["state"].update_one(
+            {"_id": "streams_backfill"},
+            {"$set": {"completed_at": datetime.utcnow(), **counts}},
+            upsert=True
+        )
+        self.streams_ready = True
+        LOGGER.info(f"Backfilled stream lookup: {counts}")
+        return counts
+
 
 
     async def replace_media_metadata(
@@ -1625,4 +1943,5 @@ class Database:
         await collection.insert_one(current_doc)
 
         updated_doc = await collection.find_one({"tmdb_id": new_tmdb_id})
+        await self._reindex_streams(collection_name, db_index, new_tmdb_id, tmdb_id)
         return convert_objectid_to_str(updated_doc) if updated_doc else None
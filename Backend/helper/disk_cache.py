@@ -0,0 +1,203 @@
+import asyncio
+import mmap
+import os
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional, Tuple
+
+from Backend.config import Telegram
+from Backend.logger import LOGGER
+
+
+class DiskChunkCache:
+    """Size-capped on-disk chunk store sitting behind the in-memory ChunkCache.
+
+    Each chunk lives in ``<directory>/<media_id>/<offset>-<chunk_size>.chunk``.
+    Reads are served as read-only ``memoryview``s over an mmap of the file, so
+    cached segments reach the ASGI send path without being copied into Python
+    ``bytes``. Eviction is LRU by default or LFU when ``policy == "lfu"``.
+    """
+
+    SUFFIX = ".chunk"
+
+    def __init__(self, directory: str, max_bytes: int, policy: str = "lru"):
+        self.directory = directory
+        self.max_bytes = max(0, max_bytes)
+        self.policy = "lfu" if policy.lower() == "lfu" else "lru"
+        self._index: "OrderedDict[Tuple[int, int, int], int]" = OrderedDict()
+        self._freq: Dict[Tuple[int, int, int], int] = {}
+        self._writing: set = set()
+        self._loaded = False
+        self._load_lock = asyncio.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self.errors = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.directory) and self.max_bytes > 0
+
+    def _path(self, key: Tuple[int, int, int]) -> str:
+        media_id, offset, chunk_size = key
+        return os.path.join(self.directory, str(media_id), f"{offset}-{chunk_size}{self.SUFFIX}")
+
+    def _scan(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        found = []
+        for media_dir in os.scandir(self.directory):
+            if not media_dir.is_dir() or not media_dir.name.lstrip("-").isdigit():
+                continue
+            for entry in os.scandir(media_dir.path):
+                if not entry.name.endswith(self.SUFFIX):
+                    continue
+                try:
+                    offset, chunk_size = entry.name[:-len(self.SUFFIX)].split("-")
+                    stat = entry.stat()
+                except (ValueError, OSError):
+                    continue
+                found.append((stat.st_atime, (int(media_dir.name), int(offset), int(chunk_size)), stat.st_size))
+
+        # Oldest access first so the rebuilt index keeps a sensible LRU order.
+        for _, key, size in sorted(found):
+            self._index[key] = size
+            self._freq[key] = 0
+            self.current_bytes += size
+
+    async def _ensure_loaded(self) -> None:
+        if self._loaded:
+            return
+        async with self._load_lock:
+            if self._loaded:
+                return
+            try:
+                await asyncio.to_thread(self._scan)
+                LOGGER.info(
+                    f"Disk chunk cache ready at {self.directory}: "
+                    f"{len(self._index)} chunks, {self.current_bytes / (1024 ** 3):.2f} GB"
+                )
+            except OSError as e:
+                LOGGER.error(f"Disk chunk cache disabled, cannot use {self.directory}: {e}")
+                self.max_bytes = 0
+            self._loaded = True
+
+    @staticmethod
+    def _map(path: str) -> memoryview:
+        with open(path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        # The mapping stays valid after the fd is closed and is released once
+        # the last view handed out to a consumer is dropped.
+        return memoryview(mapped)
+
+    async def read(self, key: Hashable) -> Optional[memoryview]:
+        if not self.enabled:
+            return None
+        await self._ensure_loaded()
+        if key not in self._index:
+            self.misses += 1
+            return None
+        try:
+            view = await asyncio.to_thread(self._map, self._path(key))
+        except (OSError, ValueError):
+            # File vanished or is empty/corrupt: forget about it.
+            self._forget(key)
+            self.misses += 1
+            self.errors += 1
+            return None
+
+        self._index.move_to_end(key)
+        self._freq[key] = self._freq.get(key, 0) + 1
+        self.hits += 1
+        return view
+
+    @staticmethod
+    def _write_file(path: str, data: bytes) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    async def write(self, key: Hashable, data: bytes) -> None:
+        if not self.enabled or not data or len(data) > self.max_bytes:
+            return
+        await self._ensure_loaded()
+        if key in self._index or key in self._writing:
+            return
+
+        self._writing.add(key)
+        try:
+            await asyncio.to_thread(self._write_file, self._path(key), data)
+        except OSError as e:
+            self.errors += 1
+            LOGGER.warning(f"Disk chunk cache write failed for {key}: {e}")
+            return
+        finally:
+            self._writing.discard(key)
+
+        self._index[key] = len(data)
+        self._freq[key] = 0
+        self.current_bytes += len(data)
+        self.writes += 1
+
+        if self.current_bytes > self.max_bytes:
+            await self._evict()
+
+    def _forget(self, key: Hashable) -> None:
+        size = self._index.pop(key, None)
+        self._freq.pop(key, None)
+        if size is not None:
+            self.current_bytes -= size
+
+    async def _evict(self) -> None:
+        # Evict down to 90% of the cap so we don't unlink on every write.
+        target = int(self.max_bytes * 0.9)
+        if self.policy == "lfu":
+            order = sorted(self._index, key=lambda k: self._freq.get(k, 0))
+        else:
+            order = list(self._index)
+
+        victims = []
+        freed = 0
+        for key in order:
+            if self.current_bytes - freed <= target:
+                break
+            victims.append(key)
+            freed += self._index[key]
+
+        paths = [self._path(key) for key in victims]
+        for key in victims:
+            self._forget(key)
+        self.evictions += len(victims)
+
+        def _unlink_all():
+            for path in paths:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+        await asyncio.to_thread(_unlink_all)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "directory": self.directory,
+            "policy": self.policy,
+            "entries": len(self._index),
+            "bytes": self.current_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "evictions": self.evictions,
+            "errors": self.errors,
+        }
+
+
+disk_chunk_cache = DiskChunkCache(
+    Telegram.CHUNK_DISK_CACHE_DIR,
+    int(Telegram.CHUNK_DISK_CACHE_GB * 1024 ** 3),
+    Telegram.CHUNK_DISK_CACHE_POLICY,
+)
@@ -0,0 +1,125 @@
+import asyncio
+import heapq
+import itertools
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, List, Tuple
+
+from Backend.config import Telegram
+
+# Lower runs first. Within one priority, requests are served in arrival order.
+PRIORITY_URGENT = 0     # first part of a request (start / seek) and probes
+PRIORITY_STREAM = 1     # parts a connected viewer is waiting for
+PRIORITY_READAHEAD = 2  # playback read-ahead nobody is blocked on yet
+
+_PRIORITY_NAMES = {PRIORITY_URGENT: "urgent", PRIORITY_STREAM: "stream", PRIORITY_READAHEAD: "readahead"}
+
+GateKey = Tuple[int, int]  # (client_index, dc_id)
+
+
+class _Gate:
+    __slots__ = ("active", "waiting", "granted", "wait_total", "wait_max")
+
+    def __init__(self):
+        self.active = 0
+        self.waiting: List[Tuple[int, int, asyncio.Future]] = []
+        self.granted = dict.fromkeys(_PRIORITY_NAMES, 0)
+        self.wait_total = dict.fromkeys(_PRIORITY_NAMES, 0.0)
+        self.wait_max = 0.0
+
+
+class FetchScheduler:
+    """Admission control for ``upload.GetFile`` per ``(client_index, dc_id)``.
+
+    Every chunk fetch, whichever stream it belongs to, takes a slot on its
+    bot's media session first. At most ``max_concurrent`` requests run on a
+    session at once; the rest queue by priority, so the first part of a new
+    stream or a seek overtakes read-ahead that is already queued by others.
+    Time spent queueing is excluded from the latency the bandwidth model sees.
+    """
+
+    def __init__(self, max_concurrent: int):
+        self.max_concurrent = max(0, max_concurrent)
+        self._gates: Dict[GateKey, _Gate] = {}
+        self._order = itertools.count()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_concurrent > 0
+
+    def _gate(self, key: GateKey) -> _Gate:
+        gate = self._gates.get(key)
+        if gate is None:
+            gate = self._gates[key] = _Gate()
+        return gate
+
+    @asynccontextmanager
+    async def slot(self, client_index: int, dc_id: int, priority: int = PRIORITY_STREAM):
+        """Hold one of the session's GetFile slots for the duration of the block."""
+        if not self.enabled:
+            yield
+            return
+        gate = self._gate((client_index, dc_id))
+        await self._acquire(gate, priority)
+        try:
+            yield
+        finally:
+            self._release(gate)
+
+    async def _acquire(self, gate: _Gate, priority: int) -> None:
+        queued_at = time.perf_counter()
+        if gate.active < self.max_concurrent:
+            # A free slot means every live waiter has been served already;
+            # whatever is left in the heap was cancelled.
+            gate.waiting.clear()
+            gate.active += 1
+        else:
+            future = asyncio.get_running_loop().create_future()
+            heapq.heappush(gate.waiting, (priority, next(self._order), future))
+            try:
+                await future
+            except asyncio.CancelledError:
+                if future.done() and not future.cancelled():
+                    # Granted just as we were cancelled: pass the slot on.
+                    self._release(gate)
+                # Otherwise the cancelled future stays in the heap and is
+                # skipped when it reaches the top.
+                raise
+
+        waited = time.perf_counter() - queued_at
+        gate.granted[priority] += 1
+        gate.wait_total[priority] += waited
+        gate.wait_max = max(gate.wait_max, waited)
+
+    def _release(self, gate: _Gate) -> None:
+        gate.active -= 1
+        while gate.waiting:
+            _, _, future = heapq.heappop(gate.waiting)
+            if not future.done():
+                gate.active += 1
+                future.set_result(None)
+                return
+
+    def stats(self) -> dict:
+        gates = []
+        for (idx, dc), gate in sorted(self._gates.items()):
+            queued = dict.fromkeys(_PRIORITY_NAMES.values(), 0)
+            for priority, _, future in gate.waiting:
+                if not future.done():
+                    queued[_PRIORITY_NAMES[priority]] += 1
+            gates.append({
+                "client_index": idx,
+                "dc_id": dc,
+                "active": gate.active,
+                "queued": queued,
+                "granted": {_PRIORITY_NAMES[p]: n for p, n in gate.granted.items()},
+                "avg_wait_ms": {
+                    _PRIORITY_NAMES[p]: round(gate.wait_total[p] / n * 1000, 1) if n else 0.0
+                    for p, n in gate.granted.items()
+                },
+                "max_wait_ms": round(gate.wait_max * 1000, 1),
+            })
+        return {"enabled": self.enabled, "max_concurrent": self.max_concurrent, "sessions": gates}
+
+
+fetch_scheduler = FetchScheduler(Telegram.MAX_GETFILE_PER_SESSION)
@@ -0,0 +1,226 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Set, Tuple
+
+from pyrogram.file_id import FileId
+
+from Backend import db
+from Backend.config import Telegram
+from Backend.logger import LOGGER
+from Backend.helper.exceptions import FIleNotFound
+from Backend.helper.pyro import get_file_ids
+from Backend.pyrofork.bot import multi_clients, work_loads, client_failures, client_session_keys
+
+ResolverKey = Tuple[int, int, int]  # (client_index, chat_id, msg_id)
+
+# Stored-FileId saves run after the caller has its answer; kept referenced until done.
+_saves: Set[asyncio.Task] = set()
+
+
+class FileIdResolver:
+    """Shared, TTL-bounded cache of resolved FileIds.
+
+    File references are bound to the session that fetched them, so entries
+    are keyed by ``(client_index, chat_id, msg_id)``. Size, mime type, name,
+    unique id and DC are identical for every bot, so metadata-only callers can
+    use :meth:`resolve_any` and reuse whichever bot's entry is already cached.
+    Concurrent misses on one key share a single ``get_messages`` call.
+
+    The memory tier is an LRU of at most ``max_entries``. Behind it, resolved
+    FileIds are kept in the tracking DB for ``store_ttl`` seconds under the
+    bot's token hash rather than its index, so after a restart bots pick up
+    their references from there instead of all calling ``get_messages`` at
+    once. A refresh always goes to Telegram and overwrites the stored entry.
+    """
+
+    def __init__(self, ttl: int, max_entries: int, store_ttl: int):
+        self.ttl = ttl
+        self.max_entries = max(1, max_entries)
+        self.store_ttl = store_ttl
+        self._entries: "OrderedDict[ResolverKey, Tuple[FileId, float]]" = OrderedDict()
+        self._in_flight: Dict[ResolverKey, asyncio.Future] = {}
+        self._last_purge = time.monotonic()
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.store_hits = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _get(self, key: ResolverKey) -> Optional[FileId]:
+        entry = self._entries.get(key)
+        if not entry:
+            return None
+        file_id, expires_at = entry
+        if expires_at < time.monotonic():
+            self._entries.pop(key, None)
+            return None
+        self._entries.move_to_end(key)
+        return file_id
+
+    def _store(self, key: ResolverKey, file_id: FileId) -> None:
+        now = time.monotonic()
+        self._entries[key] = (file_id, now + self.ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        if now - self._last_purge > self.ttl:
+            self._last_purge = now
+            for k, (_, expires_at) in list(self._entries.items()):
+                if expires_at < now:
+                    self._entries.pop(k, None)
+
+    def peek(self, chat_id: int, msg_id: int) -> Optional[FileId]:
+        """Return any bot's cached FileId for this message without any I/O."""
+        for client_index in multi_clients:
+            file_id = self._get((client_index, int(chat_id), int(msg_id)))
+            if file_id is not None:
+                return file_id
+        return None
+
+    @staticmethod
+    def _store_key(key: ResolverKey) -> Optional[str]:
+        bot_key = client_session_keys.get(key[0])
+        return f"{bot_key}:{key[1]}:{key[2]}" if bot_key and db.dbs else None
+
+    async def _load_stored(self, key: ResolverKey) -> Optional[FileId]:
+        store_key = self._store_key(key)
+        if store_key is None or not self.store_ttl:
+            return None
+        try:
+            doc = await db.get_file_id_entry(store_key)
+            if not doc:
+                return None
+            file_id = FileId.decode(doc["file_id"])
+        except Exception as e:
+            LOGGER.debug("Stored FileId %s unusable: %s", store_key, e)
+            return None
+        for attr in ("file_name", "file_size", "mime_type", "unique_id"):
+            setattr(file_id, attr, doc.get(attr))
+        self.store_hits += 1
+        return file_id
+
+    async def _save_stored(self, key: ResolverKey, file_id: FileId) -> None:
+        store_key = self._store_key(key)
+        if store_key is None or not self.store_ttl:
+            return
+        try:
+            await db.save_file_id_entry(store_key, {
+                "file_id": file_id.encode(),
+                "file_name": getattr(file_id, "file_name", ""),
+                "file_size": getattr(file_id, "file_size", 0),
+                "mime_type": getattr(file_id, "mime_type", ""),
+                "unique_id": getattr(file_id, "unique_id", ""),
+            }, self.store_ttl)
+        except Exception as e:
+            LOGGER.debug("Could not store FileId %s: %s", store_key, e)
+
+    async def resolve(self, client_index: int, chat_id: int, msg_id: int, fresh: bool = False) -> FileId:
+        """FileId for this bot, from memory, then the DB store, then Telegram.
+
+        ``fresh`` skips the DB store, for references known to be stale.
+        """
+        key = (client_index, int(chat_id), int(msg_id))
+        while True:
+            file_id = self._get(key)
+            if file_id is not None:
+                self.hits += 1
+                return file_id
+
+            pending = self._in_flight.get(key)
+            if pending is None:
+                break
+            self.hits += 1
+            try:
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                # The leading resolve was cancelled (its client went away) but
+                # we were not: look again, and lead the next attempt if nobody
+                # else already does.
+                if not pending.cancelled():
+                    raise
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            file_id = None if fresh else await self._load_stored(key)
+            if file_id is None:
+                file_id = await get_file_ids(multi_clients[client_index], key[1], key[2])
+                if not file_id:
+                    LOGGER.warning("Message %s not found", msg_id)
+                    raise FIleNotFound
+                task = asyncio.create_task(self._save_stored(key, file_id))
+                _saves.add(task)
+                task.add_done_callback(_saves.discard)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # nobody may be waiting; mark as retrieved
+            raise
+        finally:
+            if self._in_flight.get(key) is future:
+                del self._in_flight[key]
+
+        # Remember where the FileId came from so streamers can refresh it.
+        setattr(file_id, "source_chat_id", key[1])
+        setattr(file_id, "source_msg_id", key[2])
+        self._store(key, file_id)
+        future.set_result(file_id)
+        return file_id
+
+    async def resolve_any(self, chat_id: int, msg_id: int) -> FileId:
+        """Return a FileId from any bot, resolving with the least-loaded bot on a miss."""
+        file_id = self.peek(chat_id, msg_id)
+        if file_id is not None:
+            self.hits += 1
+            return file_id
+
+        client_index = min(
+            multi_clients.keys(),
+            key=lambda i: work_loads.get(i, 0) + 3 * client_failures.get(i, 0),
+        )
+        return await self.resolve(client_index, chat_id, msg_id)
+
+    async def refresh(self, client_index: int, chat_id: int, msg_id: int) -> FileId:
+        """Drop a (stale) entry and resolve it again, e.g. on FILE_REFERENCE_EXPIRED."""
+        self.refreshes += 1
+        self.invalidate(client_index, chat_id, msg_id)
+        return await self.resolve(client_index, chat_id, msg_id, fresh=True)
+
+    def invalidate(self, client_index: int, chat_id: int, msg_id: int) -> None:
+        self._entries.pop((client_index, int(chat_id), int(msg_id)), None)
+
+    def clear(self) -> int:
+        count = len(self._entries)
+        self._entries.clear()
+        return count
+
+    async def clear_store(self) -> int:
+        try:
+            return await db.clear_file_id_entries()
+        except Exception as e:
+            LOGGER.warning(f"Could not clear stored FileIds: {e}")
+            return 0
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "refreshes": self.refreshes,
+            "store_hits": self.store_hits,
+            "evictions": self.evictions,
+            "in_flight": len(self._in_flight),
+        }
+
+
+file_id_resolver = FileIdResolver(
+    Telegram.FILE_ID_CACHE_TTL, Telegram.FILE_ID_CACHE_SIZE, Telegram.FILE_ID_STORE_TTL
+)
@@ -0,0 +1,199 @@
+import asyncio
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+from Backend.logger import LOGGER
+
+STORAGE = "storage"
+TRACKING = "tracking"
+
+
+class IndexSpec:
+    """One index a collection is expected to have, on storage or tracking databases."""
+
+    __slots__ = ("kind", "collection", "model")
+
+    def __init__(self, kind: str, collection: str, keys: List[Tuple[str, int]], **options):
+        self.kind = kind
+        self.collection = collection
+        self.model = IndexModel(keys, **options)
+
+    @property
+    def name(self) -> str:
+        return self.model.document["name"]
+
+
+def _media(collection: str, stream_field: str, dead_field: str) -> List[IndexSpec]:
+    return [
+        # Lookups when a file is added or its metadata is rescanned.
+        IndexSpec(STORAGE, collection, [("imdb_id", ASCENDING)]),
+        IndexSpec(STORAGE, collection, [("tmdb_id", ASCENDING)]),
+        IndexSpec(STORAGE, collection, [("kitsu_id", ASCENDING)],
+                  partialFilterExpression={"kitsu_id": {"$exists": True}}),
+        IndexSpec(STORAGE, collection, [("title", ASCENDING), ("release_year", ASCENDING)]),
+        # Stream id -> document, on every playback.
+        IndexSpec(STORAGE, collection, [(stream_field, ASCENDING)]),
+        # Catalog pages: plain and per-genre keyset sorts, _id breaks ties.
+        IndexSpec(STORAGE, collection, [("updated_on", DESCENDING), ("_id", DESCENDING)]),
+        IndexSpec(STORAGE, collection, [("rating", DESCENDING), ("_id", DESCENDING)]),
+        IndexSpec(STORAGE, collection, [("genres", ASCENDING), ("updated_on", DESCENDING), ("_id", DESCENDING)]),
+        IndexSpec(STORAGE, collection, [("genres", ASCENDING), ("rating", DESCENDING), ("_id", DESCENDING)]),
+        # Dead-link report; only the few dead entries are indexed.
+        IndexSpec(STORAGE, collection, [(dead_field, ASCENDING)],
+                  partialFilterExpression={dead_field: True}),
+    ]
+
+
+INDEXES: List[IndexSpec] = [
+    *_media("movie", "telegram.id", "telegram.is_dead"),
+    *_media("tv", "seasons.episodes.telegram.id", "seasons.episodes.telegram.is_dead"),
+    IndexSpec(TRACKING, "api_tokens", [("token", ASCENDING)]),
+    IndexSpec(TRACKING, "api_tokens", [("user_id", ASCENDING)],
+              partialFilterExpression={"user_id": {"$exists": True}}),
+    IndexSpec(TRACKING, "users", [("subscription_status", ASCENDING), ("subscription_expiry", ASCENDING)]),
+    IndexSpec(TRACKING, "stream_analytics", [("logged_at", DESCENDING)]),
+    # Stream lookup: stale entries of an edited title, rescan purges, backfill cleanup.
+    IndexSpec(TRACKING, "streams", [("media_type", ASCENDING), ("tmdb_id", ASCENDING)]),
+    IndexSpec(TRACKING, "streams", [("chat_id", ASCENDING), ("msg_id", ASCENDING)]),
+    IndexSpec(TRACKING, "streams", [("indexed_at", ASCENDING)]),
+    # Persisted FileIds expire on their own.
+    IndexSpec(TRACKING, "file_ids", [("expires_at", ASCENDING)], expireAfterSeconds=0),
+]
+
+# (label, kind, collection, filter, sort) of the hot queries the report explains.
+HOT_QUERIES = [
+    ("movie by imdb_id", STORAGE, "movie", {"imdb_id": "tt0000000"}, None),
+    ("movie by tmdb_id", STORAGE, "movie", {"tmdb_id": 0}, None),
+    ("movie by stream id", STORAGE, "movie", {"telegram.id": ""}, None),
+    ("tv by stream id", STORAGE, "tv", {"seasons.episodes.telegram.id": ""}, None),
+    ("movie catalog latest", STORAGE, "movie", {}, [("updated_on", DESCENDING), ("_id", DESCENDING)]),
+    ("movie catalog top rated", STORAGE, "movie", {}, [("rating", DESCENDING), ("_id", DESCENDING)]),
+    ("movie catalog by genre", STORAGE, "movie", {"genres": {"$in": ["Drama"]}},
+     [("updated_on", DESCENDING), ("_id", DESCENDING)]),
+    ("tv catalog latest", STORAGE, "tv", {}, [("updated_on", DESCENDING), ("_id", DESCENDING)]),
+    ("tv catalog by genre", STORAGE, "tv", {"genres": {"$in": ["Drama"]}},
+     [("updated_on", DESCENDING), ("_id", DESCENDING)]),
+    ("dead movie links", STORAGE, "movie", {"telegram.is_dead": True}, None),
+    ("dead tv links", STORAGE, "tv", {"seasons.episodes.telegram.is_dead": True}, None),
+    ("stream lookup", TRACKING, "streams", {"_id": ""}, None),
+    ("streams of a title", TRACKING, "streams", {"media_type": "movie", "tmdb_id": 0}, None),
+    ("token lookup", TRACKING, "api_tokens", {"token": ""}, None),
+    ("expired subscriptions", TRACKING, "users",
+     {"subscription_expiry": {"$lt": datetime(2000, 1, 1)}, "subscription_status": "active"}, None),
+]
+
+
+def _kind(db_key: str) -> str:
+    return TRACKING if db_key == "tracking" else STORAGE
+
+
+def _plan_stages(plan: dict) -> List[str]:
+    stages = []
+    while plan:
+        stage = plan.get("stage")
+        if stage:
+            stages.append(f"{stage}({plan['indexName']})" if plan.get("indexName") else stage)
+        inputs = plan.get("inputStages")
+        plan = plan.get("inputStage") or (inputs[0] if inputs else None)
+    return stages
+
+
+class IndexManager:
+    """Creates the declared indexes on every database and reports how they are used.
+
+    ``ensure`` runs at startup; an index that already exists is a no-op, and
+    one that conflicts with an existing index of the same name is reported,
+    not replaced. ``report`` lists missing and undeclared indexes, access
+    counts from ``$indexStats`` (indexes never used since the server started
+    show as unused) and the winning plan of each hot query from ``explain``.
+    """
+
+    def __init__(self, specs: List[IndexSpec], hot_queries: list):
+        self.specs = specs
+        self.hot_queries = hot_queries
+        self.failed: Dict[str, str] = {}
+
+    def _specs_for(self, db_key: str) -> List[IndexSpec]:
+        kind = _kind(db_key)
+        return [spec for spec in self.specs if spec.kind == kind]
+
+    async def _create(self, db_key: str, database, spec: IndexSpec) -> None:
+        label = f"{db_key}.{spec.collection}.{spec.name}"
+        try:
+            await database[spec.collection].create_indexes([spec.model])
+            self.failed.pop(label, None)
+        except OperationFailure as e:
+            self.failed[label] = str(e)
+            LOGGER.warning(f"Index {label} not created: {e}")
+
+    async def ensure(self, dbs: Dict[str, object]) -> None:
+        await asyncio.gather(*(
+            self._create(db_key, database, spec)
+            for db_key, database in dbs.items()
+            for spec in self._specs_for(db_key)
+        ))
+        total = sum(len(self._specs_for(db_key)) for db_key in dbs)
+        LOGGER.info(f"Verified {total - len(self.failed)}/{total} database indexes")
+
+    @staticmethod
+    async def _usage(collection) -> Dict[str, dict]:
+        try:
+            stats = await collection.aggregate([{"$indexStats": {}}]).to_list(None)
+        except OperationFailure:
+            return {}
+        return {
+            s["name"]: {"ops": s.get("accesses", {}).get("ops", 0), "since": s.get("accesses", {}).get("since")}
+            for s in stats
+        }
+
+    @staticmethod
+    async def explain(collection, query: dict, sort: Optional[list] = None) -> dict:
+        cursor = collection.find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        plan = await cursor.limit(20).explain()
+        planner = plan.get("queryPlanner", {})
+        winning = planner.get("winningPlan", {})
+        winning = winning.get("queryPlan", winning)  # slot-based engine nests it
+        stats = plan.get("executionStats", {})
+        stages = _plan_stages(winning)
+        return {
+            "plan": " <- ".join(stages),
+            "collection_scan": any(stage.startswith("COLLSCAN") for stage in stages),
+            "docs_examined": stats.get("totalDocsExamined"),
+            "keys_examined": stats.get("totalKeysExamined"),
+            "returned": stats.get("nReturned"),
+            "time_ms": stats.get("executionTimeMillis"),
+        }
+
+    async def report(self, dbs: Dict[str, object]) -> dict:
+        databases = {}
+        for db_key, database in dbs.items():
+            collections = {}
+            specs = self._specs_for(db_key)
+            for name in sorted({spec.collection for spec in specs}):
+                declared = [spec.name for spec in specs if spec.collection == name]
+                existing = await database[name].index_information()
+                usage = await self._usage(database[name])
+                collections[name] = {
+                    "missing": [idx for idx in declared if idx not in existing],
+                    "undeclared": [idx for idx in existing if idx != "_id_" and idx not in declared],
+                    "unused": [idx for idx, u in usage.items() if idx != "_id_" and not u["ops"]],
+                    "usage": {idx: u["ops"] for idx, u in usage.items()},
+                }
+            queries = []
+            for label, kind, name, query, sort in self.hot_queries:
+                if kind != _kind(db_key):
+                    continue
+                try:
+                    queries.append({"query": label, **await self.explain(database[name], query, sort)})
+                except Exception as e:
+                    queries.append({"query": label, "error": str(e)})
+            databases[db_key] = {"collections": collections, "queries": queries}
+        return {"failed": dict(self.failed), "databases": databases}
+
+
+index_manager = IndexManager(INDEXES, HOT_QUERIES)
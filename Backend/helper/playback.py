@@ -0,0 +1,223 @@
+import asyncio
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+from Backend.config import Telegram
+from Backend.logger import LOGGER
+
+PlaybackKey = Tuple[str, int, int]  # (token, chat_id, msg_id)
+# Starts a fetch of the part at ``offset`` and returns ``(size, task)``.
+PartFetcher = Callable[[int], Tuple[int, asyncio.Future]]
+
+
+class PlaybackSession:
+    """Read-ahead state shared by the HTTP Range requests of one playback.
+
+    Parts are kept as ``offset -> (size, awaitable)``; the awaitable resolves to
+    the ``(seq, data, sample)`` tuple produced by the streamer. When a request
+    ends, its in-flight and buffered parts are handed over here instead of
+    being cancelled, and for ``grace`` seconds the session keeps reading ahead
+    of the last delivered byte. The next request that overlaps takes them.
+
+    A request starting close to where the previous one stopped counts as
+    sequential playback and doubles the read-ahead window (up to
+    ``max_readahead``); anything else is a seek and resets it.
+    """
+
+    MIN_READAHEAD = 4 * 1024 * 1024
+    SEEK_SLACK = 2 * 1024 * 1024
+    FILL_DEPTH = 4
+
+    def __init__(self, key: PlaybackKey, file_size: int, grace: float, max_readahead: int, on_expire):
+        self.key = key
+        self.file_size = file_size
+        self.grace = grace
+        self.max_readahead = max(self.MIN_READAHEAD, max_readahead)
+        self.readahead = self.MIN_READAHEAD
+        self.position: Optional[int] = None
+        self.parts: Dict[int, Tuple[int, asyncio.Future]] = {}
+        self.attached = 0
+        self.sequential = 0
+        self.seeks = 0
+        self.reused_parts = 0
+        self.last_used = time.time()
+        self._fetch: Optional[PartFetcher] = None
+        self._fill_task: Optional[asyncio.Task] = None
+        self._expiry: Optional[asyncio.TimerHandle] = None
+        self._on_expire = on_expire
+
+    def begin(self, start: int) -> None:
+        """A Range request starting at ``start`` attaches to this playback."""
+        self.last_used = time.time()
+        if self.position is not None and self.position - self.SEEK_SLACK <= start <= self.position + self.readahead:
+            self.sequential += 1
+            self.readahead = min(self.max_readahead, self.readahead * 2)
+        elif self.position is not None:
+            self.seeks += 1
+            self.readahead = self.MIN_READAHEAD
+        self.position = start
+        self.attached += 1
+
+        # The new request drives fetching from here on.
+        if self._expiry is not None:
+            self._expiry.cancel()
+            self._expiry = None
+        if self._fill_task is not None and not self._fill_task.done():
+            self._fill_task.cancel()
+        self._fill_task = None
+
+    def covering(self, position: int) -> Optional[int]:
+        """Offset of a warm part containing ``position``, if any."""
+        for offset, (size, _) in self.parts.items():
+            if offset <= position < offset + size:
+                return offset
+        return None
+
+    def take(self, offset: int) -> Optional[Tuple[int, asyncio.Future]]:
+        part = self.parts.pop(offset, None)
+        if part is not None:
+            self.reused_parts += 1
+        return part
+
+    def advance(self, position: int) -> None:
+        self.position = position
+        self.last_used = time.time()
+
+    def keep(self, offset: int, size: int, source: asyncio.Future) -> None:
+        """Adopt a part from a request that is going away."""
+        if self.position is not None and not (
+            self.position - self.SEEK_SLACK <= offset < self.position + self.max_readahead
+        ):
+            self._discard(source)
+            return
+        old = self.parts.get(offset)
+        if old is not None:
+            self._discard(old[1])
+        self.parts[offset] = (size, source)
+
+    def keep_data(self, offset: int, data, sample=None) -> None:
+        future = asyncio.get_running_loop().create_future()
+        future.set_result((-1, data, sample))
+        self.keep(offset, len(data), future)
+
+    def end(self, fetch: Optional[PartFetcher]) -> Optional[asyncio.Task]:
+        """A Range request detached; keep reading ahead for the grace period.
+
+        Returns the read-ahead task calling ``fetch``, if one was started.
+        """
+        self.attached = max(0, self.attached - 1)
+        self.last_used = time.time()
+        if self.attached:
+            return None
+        self._fetch = fetch
+        if fetch is not None and self.position is not None:
+            self._fill_task = asyncio.create_task(self._fill())
+        self._expiry = asyncio.get_running_loop().call_later(self.grace, self.expire)
+        return self._fill_task
+
+    async def _fill(self) -> None:
+        frontier = self.position
+        limit = min(self.file_size, self.position + self.readahead)
+        try:
+            while frontier < limit:
+                existing = self.parts.get(frontier)
+                if existing is not None:
+                    frontier += existing[0]
+                    continue
+                pending = [src for _, src in self.parts.values() if not src.done()]
+                if len(pending) >= self.FILL_DEPTH:
+                    await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    continue
+                size, source = self._fetch(frontier)
+                self.parts[frontier] = (size, source)
+                frontier += size
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            LOGGER.debug("Playback read-ahead stopped for %s: %s", self.key[1:], e)
+
+    @staticmethod
+    def _discard(source: asyncio.Future) -> None:
+        if not source.done():
+            source.cancel()
+
+    def expire(self) -> None:
+        if self.attached:
+            return
+        if self._expiry is not None:
+            self._expiry.cancel()
+            self._expiry = None
+        if self._fill_task is not None and not self._fill_task.done():
+            self._fill_task.cancel()
+        for _, source in self.parts.values():
+            self._discard(source)
+        self.parts.clear()
+        self._fetch = None
+        self._on_expire(self)
+
+    def warm_bytes(self) -> int:
+        return sum(size for size, source in self.parts.values() if source.done())
+
+    def stats(self) -> dict:
+        return {
+            "chat_id": self.key[1],
+            "msg_id": self.key[2],
+            "attached": self.attached,
+            "position": self.position,
+            "readahead_mb": round(self.readahead / (1024 * 1024), 1),
+            "warm_parts": len(self.parts),
+            "warm_bytes": self.warm_bytes(),
+            "sequential": self.sequential,
+            "seeks": self.seeks,
+            "reused_parts": self.reused_parts,
+            "idle_sec": round(time.time() - self.last_used, 1),
+        }
+
+
+class PlaybackSessions:
+    """Registry of live playback sessions keyed by token and file."""
+
+    def __init__(self, grace: float, max_readahead: int):
+        self.grace = grace
+        self.max_readahead = max_readahead
+        self._sessions: Dict[PlaybackKey, PlaybackSession] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.grace > 0 and self.max_readahead > 0
+
+    def get(self, token: str, chat_id: int, msg_id: int, file_size: int) -> Optional[PlaybackSession]:
+        if not self.enabled or not token:
+            return None
+        # Sessions whose response body never started (the client left first)
+        # have no expiry timer; sweep them once they have been idle a while.
+        now = time.time()
+        for stale in [s for s in self._sessions.values() if not s.attached and now - s.last_used > self.grace]:
+            stale.expire()
+
+        key = (token, int(chat_id), int(msg_id))
+        session = self._sessions.get(key)
+        if session is None:
+            session = self._sessions[key] = PlaybackSession(
+                key, file_size, self.grace, self.max_readahead, self._drop
+            )
+        return session
+
+    def _drop(self, session: PlaybackSession) -> None:
+        if self._sessions.get(session.key) is session:
+            del self._sessions[session.key]
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "sessions": [s.stats() for s in self._sessions.values()],
+        }
+
+
+playback_sessions = PlaybackSessions(
+    Telegram.PLAYBACK_GRACE_SECONDS,
+    Telegram.PLAYBACK_READAHEAD_MB * 1024 * 1024,
+)
@@ -0,0 +1,141 @@
+import asyncio
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from Backend.config import Telegram
+from Backend.logger import LOGGER
+
+# Fetches ``limit`` bytes at ``offset`` with a single GetFile.
+RegionFetcher = Callable[[int, int], Awaitable[Optional[bytes]]]
+
+
+class ProbeCache:
+    """Long-lived cache of the head and tail regions of recently played files.
+
+    Before playing or seeking, players read the start of a file and its last
+    few MB to find the MKV cues or the MP4 ``moov`` atom, and Stremio adds a
+    burst of tiny ``bytes=0-1`` style probes. Ranges that fall entirely inside
+    one of these regions are answered from here instead of going through
+    ``prefetch_stream``, so they never register a stream or count towards a
+    bot's workload. A region is fetched once, on the first probe that needs
+    it, and shared by every bot; eviction is LRU under a byte budget.
+    """
+
+    HEAD_BYTES = 512 * 1024
+    TAIL_BYTES = 4 * 1024 * 1024
+    PART = 1024 * 1024  # largest GetFile limit; tail regions start on a multiple of it
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max(0, max_bytes)
+        self._entries: "OrderedDict[Hashable, bytes]" = OrderedDict()
+        self._in_flight: Dict[Hashable, asyncio.Future] = {}
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def region(self, start: int, end: int, file_size: int) -> Optional[Tuple[str, int, int]]:
+        """``(name, offset, length)`` of the region holding ``start..end``, if any."""
+        if not self.enabled or start < 0 or end < start:
+            return None
+        head_len = min(self.HEAD_BYTES, file_size)
+        if end < head_len:
+            return "head", 0, head_len
+        tail_start = max(0, (file_size - self.TAIL_BYTES) // self.PART * self.PART)
+        if start >= tail_start:
+            return "tail", tail_start, file_size - tail_start
+        return None
+
+    async def read(
+        self, media_id: int, file_size: int, start: int, end: int, fetch: RegionFetcher
+    ) -> Optional[bytes]:
+        """Return bytes ``start..end`` (inclusive), loading their region on a miss.
+
+        ``None`` means the range is not a probe or the region could not be read.
+        """
+        region = self.region(start, end, file_size)
+        if region is None:
+            return None
+        name, offset, length = region
+        key = (media_id, name)
+
+        while True:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                break
+            pending = self._in_flight.get(key)
+            if pending is None:
+                self.misses += 1
+                data = await self._load(key, offset, length, fetch)
+                break
+            self.hits += 1
+            try:
+                data = await asyncio.shield(pending)
+                break
+            except asyncio.CancelledError:
+                # The leading probe was cancelled (its client went away) but
+                # we were not: look again, loading the region ourselves if
+                # nobody else already does.
+                if not pending.cancelled():
+                    raise
+
+        if data is None or end - offset >= len(data):
+            return None
+        return data[start - offset:end - offset + 1]
+
+    async def _load(self, key: Hashable, offset: int, length: int, fetch: RegionFetcher) -> Optional[bytes]:
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            # The head is one request; the tail is fetched as parallel 1 MB parts.
+            if offset == 0 and length <= self.HEAD_BYTES:
+                parts = [await fetch(0, self.HEAD_BYTES)]
+            else:
+                parts = await asyncio.gather(
+                    *(fetch(off, self.PART) for off in range(offset, offset + length, self.PART))
+                )
+            data = None if any(part is None for part in parts) else b"".join(parts)[:length]
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # nobody may be waiting; mark as retrieved
+            raise
+        finally:
+            if self._in_flight.get(key) is future:
+                del self._in_flight[key]
+
+        if data:
+            self._put(key, data)
+        future.set_result(data)
+        return data
+
+    def _put(self, key: Hashable, data: bytes) -> None:
+        if len(data) > self.max_bytes:
+            return
+        self._entries[key] = data
+        self.current_bytes += len(data)
+        while self.current_bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.current_bytes -= len(evicted)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "bytes": self.current_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+probe_cache = ProbeCache(Telegram.PROBE_CACHE_MB * 1024 * 1024)
+if probe_cache.enabled:
+    LOGGER.info(f"Probe cache enabled ({Telegram.PROBE_CACHE_MB} MB)")
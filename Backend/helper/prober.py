@@ -0,0 +1,302 @@
+import asyncio
+import random
+import time
+from bisect import bisect_left
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+from pyrogram import raw
+from pyrogram.errors import FileReferenceExpired
+
+from Backend.config import Telegram
+from Backend.logger import LOGGER
+from Backend.helper.bandwidth import bandwidth_model
+from Backend.helper.custom_dl import ByteStreamer
+from Backend.helper.fetch_scheduler import fetch_scheduler, PRIORITY_READAHEAD
+from Backend.helper.file_resolver import file_id_resolver
+from Backend.pyrofork.bot import multi_clients, client_dc_map, client_failures
+
+LATENCY_BUCKETS_MS = (25, 50, 100, 200, 400, 800, 1600, 3200)
+THROUGHPUT_BUCKETS_MBPS = (0.5, 1, 2, 4, 8, 16, 32)
+PING_BYTES = 4096
+# Smallest throughput probe worth sending; below this only the ping goes out.
+MIN_PROBE_BYTES = 64 * 1024
+# A probe slower than this multiple of the link's median latency marks it degraded.
+DEGRADED_FACTOR = 3.0
+
+
+def _histogram(edges) -> List[int]:
+    return [0] * (len(edges) + 1)
+
+
+def _bucket_labels(edges, unit: str) -> List[str]:
+    return [f"<{edge}{unit}" for edge in edges] + [f">={edges[-1]}{unit}"]
+
+
+class _LinkProbes:
+    __slots__ = (
+        "latency_hist", "throughput_hist", "recent", "last_ping", "last_mbps",
+        "last_bytes", "last_elapsed", "last_error", "probes", "failures", "degraded", "updated",
+        "sampled_at",
+    )
+
+    def __init__(self):
+        self.latency_hist = _histogram(LATENCY_BUCKETS_MS)
+        self.throughput_hist = _histogram(THROUGHPUT_BUCKETS_MBPS)
+        self.recent: deque = deque(maxlen=50)
+        self.last_ping: Optional[float] = None
+        self.last_mbps: Optional[float] = None
+        self.last_bytes = 0
+        self.last_elapsed: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.probes = 0
+        self.failures = 0
+        self.degraded = False
+        self.updated = 0.0
+        self.sampled_at = 0.0   # bandwidth_model clock of this link's last probe sample
+
+    def median_latency(self) -> Optional[float]:
+        if not self.recent:
+            return None
+        ordered = sorted(self.recent)
+        return ordered[len(ordered) // 2]
+
+
+class ClientProber:
+    """Small periodic GetFile probes on every bot for every DC we stream from.
+
+    The reference file for a DC is the last one streamed from it (or speed
+    tested). Each round sends, per idle ``(client, DC)`` link, one 4 KB
+    request for latency and one request of the link's planned chunk size at
+    a random offset for throughput, both at read-ahead priority behind real
+    viewers. Samples feed ``bandwidth_model`` (and through it client
+    selection and chunk sizing); timeouts, errors and latency spikes count as
+    client failures, so a degraded session is avoided before a viewer lands
+    on it.
+
+    Links the model got a sample for from real streams within the last
+    interval are skipped, that traffic already keeps it current. A round
+    downloads at most ``budget_bytes``: links probed longest ago go first,
+    and once the budget runs low the throughput request shrinks and then
+    only the ping is sent.
+    """
+
+    def __init__(self, interval: int, budget_bytes: int = 0):
+        self.interval = interval
+        self.budget_bytes = max(0, budget_bytes)
+        self._references: Dict[int, Tuple[int, int]] = {}  # dc_id -> (chat_id, msg_id)
+        self._links: Dict[Tuple[int, int], _LinkProbes] = {}
+        self._rng = random.Random()
+        self._task: Optional[asyncio.Task] = None
+        self.bytes_used = 0
+        self.round_bytes = 0
+        self.skipped_organic = 0
+        self.shrunk = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.interval > 0
+
+    def remember(self, file_id) -> None:
+        """Use this file as the probe reference for its DC."""
+        chat_id = getattr(file_id, "source_chat_id", None)
+        msg_id = getattr(file_id, "source_msg_id", None)
+        if chat_id is not None and msg_id is not None:
+            self._references[file_id.dc_id] = (int(chat_id), int(msg_id))
+
+    def start(self) -> None:
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self._run_loop())
+            LOGGER.info(f"Started client prober (Interval: {self.interval}s)")
+
+    async def _run_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval * self._rng.uniform(0.8, 1.2))
+            try:
+                await self.probe_round()
+            except Exception as e:
+                LOGGER.error(f"Error in client prober round: {e}")
+
+    def _organic(self, idx: int, dc_id: int) -> bool:
+        """Whether real streams gave the model a sample for this link within the interval."""
+        idle = bandwidth_model.idle_for(idx, dc_id)
+        if idle is None or idle >= self.interval:
+            return False
+        link = self._links.get((idx, dc_id))
+        last_sample = bandwidth_model.clock() - idle
+        return link is None or last_sample > link.sampled_at + 0.5
+
+    def _probe_size(self, idx: int, dc_id: int, remaining: Optional[int]) -> int:
+        """Throughput request for this link: its planned chunk, halved to fit what is left."""
+        size, _ = bandwidth_model.plan(idx, dc_id)
+        if remaining is None:
+            return size
+        while size > remaining and size >= MIN_PROBE_BYTES:
+            size //= 2
+        if size < MIN_PROBE_BYTES:
+            return 0
+        return size
+
+    async def probe_round(self) -> None:
+        candidates = []
+        for dc_id, (chat_id, msg_id) in list(self._references.items()):
+            for idx in list(multi_clients):
+                if self._organic(idx, dc_id):
+                    self.skipped_organic += 1
+                    continue
+                link = self._links.get((idx, dc_id))
+                candidates.append((link.updated if link else 0.0, idx, dc_id, chat_id, msg_id))
+        candidates.sort(key=lambda c: c[0])
+
+        remaining = self.budget_bytes if self.budget_bytes else None
+        jobs = []
+        for _, idx, dc_id, chat_id, msg_id in candidates:
+            if remaining is not None and remaining < PING_BYTES:
+                break
+            if remaining is not None:
+                remaining -= PING_BYTES
+            size = self._probe_size(idx, dc_id, remaining)
+            if remaining is not None:
+                remaining -= size
+                if size < bandwidth_model.plan(idx, dc_id)[0]:
+                    self.shrunk += 1
+            jobs.append(self.probe(idx, chat_id, msg_id, size))
+        self.round_bytes = 0
+        if jobs:
+            await asyncio.gather(*jobs, return_exceptions=True)
+
+    async def _get_file(self, idx: int, session, location, dc_id: int, offset: int, limit: int):
+        async with fetch_scheduler.slot(idx, dc_id, PRIORITY_READAHEAD):
+            sent_at = time.perf_counter()
+            r = await asyncio.wait_for(
+                session.send(raw.functions.upload.GetFile(location=location, offset=offset, limit=limit)),
+                timeout=15.0,
+            )
+            return getattr(r, "bytes", None) or b"", time.perf_counter() - sent_at
+
+    async def probe(self, client_index: int, chat_id: int, msg_id: int, size: Optional[int] = None) -> dict:
+        """Probe one bot against one file now and return its view row.
+
+        ``size`` is the throughput request (the link's planned chunk when
+        ``None``); with ``0`` only the latency ping is sent.
+        """
+        dc_id = None
+        error = None
+        try:
+            streamer = ByteStreamer._instances.get(client_index) or ByteStreamer(
+                multi_clients[client_index], client_index
+            )
+            file_id = await file_id_resolver.resolve(client_index, chat_id, msg_id)
+            dc_id = file_id.dc_id
+            link = self._links.setdefault((client_index, dc_id), _LinkProbes())
+            session = await streamer._get_media_session(file_id)
+            location = await ByteStreamer._get_location(file_id)
+
+            if size is None:
+                size, _ = bandwidth_model.plan(client_index, dc_id)
+            data, elapsed = b"", 0.0
+            for attempt in range(2):
+                try:
+                    _, ping = await self._get_file(client_index, session, location, dc_id, 0, PING_BYTES)
+                    if size:
+                        offset = self._rng.randrange(max(1, file_id.file_size // size)) * size
+                        data, elapsed = await self._get_file(client_index, session, location, dc_id, offset, size)
+                    break
+                except FileReferenceExpired:
+                    if attempt:
+                        raise
+                    fresh = await file_id_resolver.refresh(client_index, chat_id, msg_id)
+                    location = await ByteStreamer._get_location(fresh)
+
+            self._record(client_index, dc_id, link, ping, len(data), elapsed)
+        except Exception as e:
+            error = str(e) or type(e).__name__
+            client_failures[client_index] = client_failures.get(client_index, 0) + 1
+            if dc_id is not None:
+                link = self._links.setdefault((client_index, dc_id), _LinkProbes())
+                link.failures += 1
+                link.degraded = True
+                link.last_error = error
+                link.updated = time.time()
+            LOGGER.debug("Probe failed client=%s dc=%s: %s", client_index, dc_id, error)
+        return self.view(client_index, dc_id, error)
+
+    def _record(self, idx: int, dc_id: int, link: _LinkProbes, ping: float, nbytes: int, elapsed: float) -> None:
+        median = link.median_latency()
+        link.degraded = median is not None and len(link.recent) >= 5 and ping > DEGRADED_FACTOR * median
+        if link.degraded:
+            client_failures[idx] = client_failures.get(idx, 0) + 1
+
+        link.probes += 1
+        link.recent.append(ping)
+        link.last_ping = ping
+        link.last_error = None
+        link.last_bytes = nbytes
+        link.last_elapsed = elapsed
+        link.updated = time.time()
+        link.latency_hist[bisect_left(LATENCY_BUCKETS_MS, ping * 1000)] += 1
+        self.bytes_used += PING_BYTES + nbytes
+        self.round_bytes += PING_BYTES + nbytes
+        if nbytes and elapsed > 0:
+            link.last_mbps = nbytes / elapsed / (1024 * 1024)
+            link.throughput_hist[bisect_left(THROUGHPUT_BUCKETS_MBPS, link.last_mbps)] += 1
+            bandwidth_model.observe(idx, dc_id, nbytes, elapsed)
+            link.sampled_at = bandwidth_model.clock()
+
+    def view(self, client_index: int, dc_id: Optional[int], error: Optional[str] = None) -> dict:
+        """Speed-test style row for one bot and DC, built from probe and model data."""
+        link = self._links.get((client_index, dc_id))
+        estimate = bandwidth_model.throughput(client_index, dc_id) if dc_id is not None else 0.0
+        median = link.median_latency() if link else None
+        return {
+            "client_index": client_index,
+            "dc_id": client_dc_map.get(client_index, "?"),
+            "file_dc_id": dc_id,
+            "ping_ms": round(link.last_ping * 1000, 2) if link and link.last_ping else None,
+            "median_ping_ms": round(median * 1000, 2) if median else None,
+            "speed_mbps": round(estimate, 3) if estimate else None,
+            "probe_mbps": round(link.last_mbps, 3) if link and link.last_mbps else None,
+            "time_taken_sec": round(link.last_elapsed, 3) if link and link.last_elapsed else None,
+            "bytes_downloaded": link.last_bytes if link else 0,
+            "probes": link.probes if link else 0,
+            "degraded": link.degraded if link else False,
+            "error": error,
+        }
+
+    async def speed_test(self, chat_id: int, msg_id: int) -> List[dict]:
+        """Probe every bot against one file and return rows sorted by estimated speed."""
+        if not multi_clients:
+            return [{"error": "No bot clients connected"}]
+        try:
+            self.remember(await file_id_resolver.resolve_any(chat_id, msg_id))
+        except Exception:
+            pass
+        results = await asyncio.gather(*(self.probe(idx, chat_id, msg_id) for idx in list(multi_clients)))
+        results.sort(key=lambda r: r.get("speed_mbps") or -1, reverse=True)
+        return list(results)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "interval_sec": self.interval,
+            "bytes_used": self.bytes_used,
+            "budget_bytes": self.budget_bytes,
+            "last_round_bytes": self.round_bytes,
+            "skipped_organic": self.skipped_organic,
+            "shrunk": self.shrunk,
+            "references": {dc: {"chat_id": c, "msg_id": m} for dc, (c, m) in self._references.items()},
+            "latency_buckets": _bucket_labels(LATENCY_BUCKETS_MS, "ms"),
+            "throughput_buckets": _bucket_labels(THROUGHPUT_BUCKETS_MBPS, "MB/s"),
+            "links": [
+                {
+                    **self.view(idx, dc, link.last_error),
+                    "failures": link.failures,
+                    "latency_hist": link.latency_hist,
+                    "throughput_hist": link.throughput_hist,
+                }
+                for (idx, dc), link in sorted(self._links.items())
+            ],
+        }
+
+
+client_prober = ClientProber(Telegram.PROBE_INTERVAL, int(Telegram.PROBE_BUDGET_MB * 1024 * 1024))
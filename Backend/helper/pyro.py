@@ -152,6 +152,7 @@ commands = [
     BotCommand("search", "🔎 Search DB by title"),
     BotCommand("stats", "📊 DB and system stats"),
     BotCommand("dbcheck", "🩺 Check DB integrity"),
+    BotCommand("backfillstreams", "🗂 Rebuild stream lookup"),
     # BotCommand("fixmetadata", "⚙️ Fix empty fields of Metadata"),
     BotCommand("log", "📄 Send the log file"),
     BotCommand("restart", "♻️ Restart the bot"),
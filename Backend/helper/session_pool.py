@@ -0,0 +1,196 @@
+import asyncio
+import time
+from typing import Dict, List, Optional, Tuple
+
+from pyrogram import raw
+from pyrogram.session import Session
+
+from Backend.config import Telegram
+from Backend.logger import LOGGER
+
+PoolKey = Tuple[int, int]  # (client_index, dc_id)
+
+# A connection with this many timeouts since its last successful health check is replaced.
+MAX_SESSION_FAILURES = 3
+HEALTH_CHECK_TIMEOUT = 10.0
+
+
+class _PooledSession:
+    __slots__ = ("session", "primary", "streams", "failures", "created", "last_used")
+
+    def __init__(self, session: Session, primary: bool):
+        self.session = session
+        self.primary = primary  # the one pyrogram keeps in client.media_sessions
+        self.streams = 0
+        self.failures = 0
+        self.created = time.time()
+        self.last_used = self.created
+
+
+class MediaSessionPool:
+    """Up to ``size`` MTProto media connections per ``(client_index, dc_id)``.
+
+    The first connection is the bot's own ``client.media_sessions[dc]``.
+    Extra ones reuse its auth key, which is already authorized on that DC, so
+    opening one is a TCP connect and a ping, with no key exchange or
+    authorization import. Streams lease the connection carrying the fewest
+    streams; when every connection is busy and the pool is not full a new
+    one is opened in the background and picked up by the next stream, so
+    nobody waits for a connect. The reaper closes extra connections idle for
+    ``idle_timeout`` seconds and pings idle ones, replacing those that do not
+    answer or keep timing out.
+    """
+
+    def __init__(self, size: int, idle_timeout: int):
+        self.size = max(1, size)
+        self.idle_timeout = idle_timeout
+        self._pools: Dict[PoolKey, List[_PooledSession]] = {}
+        self._by_session: Dict[int, _PooledSession] = {}
+        self._growing: Dict[PoolKey, asyncio.Task] = {}
+        self._clients: Dict[int, object] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.opened = 0
+        self.reaped = 0
+        self.replaced = 0
+
+    def _track(self, key: PoolKey, session: Session, primary: bool) -> _PooledSession:
+        conn = _PooledSession(session, primary)
+        self._pools.setdefault(key, []).append(conn)
+        self._by_session[id(session)] = conn
+        return conn
+
+    def _drop(self, key: PoolKey, conn: _PooledSession) -> None:
+        conns = self._pools.get(key, [])
+        if conn in conns:
+            conns.remove(conn)
+        self._by_session.pop(id(conn.session), None)
+
+    async def acquire(self, client_index: int, client, dc_id: int, primary: Session) -> Session:
+        """Lease the least-loaded connection to ``dc_id``; pair with ``release``."""
+        key = (client_index, dc_id)
+        self._clients[client_index] = client
+        conns = self._pools.setdefault(key, [])
+        if not any(conn.session is primary for conn in conns):
+            # First lease, or pyrogram's session was replaced under us.
+            for conn in [c for c in conns if c.primary]:
+                self._drop(key, conn)
+            self._track(key, primary, primary=True)
+            conns = self._pools[key]
+
+        conn = min(conns, key=lambda c: (c.failures > 0, c.streams))
+        if conn.streams > 0 and len(conns) < self.size and key not in self._growing:
+            self._growing[key] = asyncio.create_task(self._grow(key, client, primary))
+        conn.streams += 1
+        conn.last_used = time.time()
+        return conn.session
+
+    def release(self, session: Session) -> None:
+        conn = self._by_session.get(id(session))
+        if conn is not None:
+            conn.streams = max(0, conn.streams - 1)
+            conn.last_used = time.time()
+
+    def report_failure(self, session: Session) -> None:
+        """Count a request timeout against the connection it was sent on."""
+        conn = self._by_session.get(id(session))
+        if conn is not None:
+            conn.failures += 1
+
+    async def _open(self, client, dc_id: int, primary: Session) -> Session:
+        session = Session(client, dc_id, primary.auth_key, primary.test_mode, is_media=True)
+        session.no_updates = True
+        session.timeout = 30
+        session.sleep_threshold = 60
+        await session.start()
+        return session
+
+    async def _grow(self, key: PoolKey, client, primary: Session) -> None:
+        try:
+            session = await self._open(client, key[1], primary)
+            self._track(key, session, primary=False)
+            self.opened += 1
+            LOGGER.debug("Opened media connection %s for client %s DC %s", len(self._pools[key]), *key)
+        except Exception as e:
+            LOGGER.debug("Could not open extra media connection for client %s DC %s: %s", *key, e)
+        finally:
+            self._growing.pop(key, None)
+
+    async def _close(self, session: Session) -> None:
+        try:
+            await session.stop()
+        except Exception:
+            pass
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run_loop())
+
+    async def _run_loop(self) -> None:
+        while True:
+            await asyncio.sleep(max(10, min(60, self.idle_timeout // 2 or 60)))
+            try:
+                await self.maintain()
+            except Exception as e:
+                LOGGER.error(f"Error in media session pool maintenance: {e}")
+
+    async def maintain(self) -> None:
+        """Reap idle extra connections and health-check the idle rest."""
+        now = time.time()
+        checks = []
+        for key, conns in list(self._pools.items()):
+            for conn in list(conns):
+                if conn.streams:
+                    continue
+                if not conn.primary and now - conn.last_used > self.idle_timeout:
+                    self._drop(key, conn)
+                    self.reaped += 1
+                    asyncio.create_task(self._close(conn.session))
+                    continue
+                checks.append(self._check(key, conn))
+        if checks:
+            await asyncio.gather(*checks, return_exceptions=True)
+
+    async def _check(self, key: PoolKey, conn: _PooledSession) -> None:
+        try:
+            await asyncio.wait_for(
+                conn.session.send(raw.functions.Ping(ping_id=int(time.time()))), timeout=HEALTH_CHECK_TIMEOUT
+            )
+            if conn.failures < MAX_SESSION_FAILURES:
+                conn.failures = 0
+                return
+        except Exception as e:
+            LOGGER.debug("Media connection health check failed for client %s DC %s: %s", *key, e)
+        if conn.streams:
+            return  # picked up a stream meanwhile; look again next round
+        self._drop(key, conn)
+        self.replaced += 1
+        if conn.primary:
+            # The next stream makes ByteStreamer open a fresh one.
+            client = self._clients.get(key[0])
+            media_sessions = getattr(client, "media_sessions", {})
+            if media_sessions.get(key[1]) is conn.session:
+                media_sessions.pop(key[1], None)
+        asyncio.create_task(self._close(conn.session))
+
+    def stats(self) -> dict:
+        return {
+            "size": self.size,
+            "idle_timeout_sec": self.idle_timeout,
+            "opened": self.opened,
+            "reaped": self.reaped,
+            "replaced": self.replaced,
+            "pools": [
+                {
+                    "client_index": idx,
+                    "dc_id": dc,
+                    "connections": len(conns),
+                    "streams": [conn.streams for conn in conns],
+                    "failures": [conn.failures for conn in conns],
+                }
+                for (idx, dc), conns in sorted(self._pools.items())
+                if conns
+            ],
+        }
+
+
+session_pool = MediaSessionPool(Telegram.MEDIA_SESSIONS_PER_DC, Telegram.MEDIA_SESSION_IDLE_SEC)
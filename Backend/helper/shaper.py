@@ -0,0 +1,188 @@
+import asyncio
+import time
+from typing import Dict, Optional
+
+from Backend.config import Telegram
+
+MB = 1024 * 1024
+
+
+class _TokenBucket:
+    """Byte bucket shared by every stream of one API token."""
+
+    __slots__ = ("limit", "weight", "rate", "level", "updated", "flows", "delayed_sec", "delayed_bytes")
+
+    def __init__(self, limit: float, weight: float):
+        self.limit = limit      # bytes/s configured for the token, 0 = none
+        self.weight = weight
+        self.rate = limit       # bytes/s currently enforced, 0 = unshaped
+        self.level = 0.0
+        self.updated = time.monotonic()
+        self.flows = 0
+        self.delayed_sec = 0.0
+        self.delayed_bytes = 0
+
+    def burst(self) -> float:
+        return max(self.rate, MB)
+
+    def debit(self, nbytes: int) -> float:
+        """Take ``nbytes`` and return how long the caller has to wait for them."""
+        now = time.monotonic()
+        if not self.rate:
+            self.updated = now
+            return 0.0
+        self.level = min(self.burst(), self.level + (now - self.updated) * self.rate)
+        self.updated = now
+        # The bucket may go into debt; later callers then wait behind it, which
+        # splits the rate between a token's parallel streams.
+        self.level -= nbytes
+        return -self.level / self.rate if self.level < 0 else 0.0
+
+
+class StreamFlow:
+    """One stream's handle on its token's bucket.
+
+    The stream body calls ``open`` when it starts, ``throttle`` per part and
+    ``close`` when it ends, so a response that is never sent never takes a
+    share of the budget.
+    """
+
+    def __init__(self, shaper: "BandwidthShaper", key: str, limit: float):
+        self._shaper = shaper
+        self.key = key
+        self.limit = limit
+        self.bucket: Optional[_TokenBucket] = None
+        self.delayed_sec = 0.0
+        self.delayed_bytes = 0
+        self._closed = False
+
+    def open(self) -> None:
+        if self.bucket is None and not self._closed:
+            self.bucket = self._shaper._attach(self)
+
+    async def throttle(self, nbytes: int) -> float:
+        delay = self.bucket.debit(nbytes)
+        if delay > 0:
+            self.delayed_sec += delay
+            self.delayed_bytes += nbytes
+            self.bucket.delayed_sec += delay
+            self.bucket.delayed_bytes += nbytes
+            await asyncio.sleep(delay)
+        return delay
+
+    def close(self) -> None:
+        if not self._closed:
+            self._closed = True
+            if self.bucket is not None:
+                self._shaper._detach(self)
+
+    def stats(self) -> dict:
+        rate = self.bucket.rate if self.bucket is not None else 0
+        return {
+            "rate_mbps": round(rate / MB, 2) if rate else None,
+            "delayed_sec": round(self.delayed_sec, 2),
+            "delayed_bytes": self.delayed_bytes,
+        }
+
+
+class BandwidthShaper:
+    """Per-token token-bucket shaping with weighted fair sharing of total egress.
+
+    A token's own cap is ``limits.rate_limit_mbps`` (``default_mbps`` when it
+    has none). Rates are set per token rather than per subscription plan:
+    plans only carry a duration and a price, and users do not record which
+    one they bought, so there is no plan to resolve a rate from.
+
+    When ``total_mbps`` is set it is split between the tokens that are
+    streaming right now in proportion to their weight: their configured rate
+    in MB/s, and for unlimited tokens the highest rate among the capped ones
+    streaming, so no token gets a smaller share than a capped one. A token
+    capped below its share leaves the difference to the others. A token's
+    parallel streams share its bucket, so opening more connections does not
+    buy more bandwidth. A new bucket starts full, so the first ``burst``
+    bytes of a stream are never delayed. Shares are recomputed whenever a
+    token starts or stops streaming. With neither limit configured nothing
+    is shaped.
+    """
+
+    def __init__(self, total_mbps: float, default_mbps: float):
+        self.total = max(0.0, total_mbps) * MB
+        self.default = max(0.0, default_mbps) * MB
+        self._buckets: Dict[str, _TokenBucket] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.total or self.default)
+
+    def flow(self, token: str, token_data: Optional[dict]) -> Optional[StreamFlow]:
+        if not self.enabled or not token:
+            return None
+        limits = (token_data or {}).get("limits") or {}
+        try:
+            limit = float(limits.get("rate_limit_mbps") or 0) * MB or self.default
+        except (TypeError, ValueError):
+            limit = self.default
+        return StreamFlow(self, token, limit)
+
+    def _attach(self, flow: StreamFlow) -> _TokenBucket:
+        bucket = self._buckets.get(flow.key)
+        new = bucket is None
+        if new:
+            bucket = self._buckets[flow.key] = _TokenBucket(flow.limit, 1.0)
+        bucket.limit = flow.limit
+        bucket.flows += 1
+        self._rebalance()
+        if new:
+            bucket.level = bucket.burst()
+        return bucket
+
+    def _detach(self, flow: StreamFlow) -> None:
+        bucket = self._buckets.get(flow.key)
+        if bucket is not flow.bucket:
+            return
+        bucket.flows -= 1
+        if bucket.flows <= 0:
+            del self._buckets[flow.key]
+        self._rebalance()
+
+    def _rebalance(self) -> None:
+        if not self.total:
+            for bucket in self._buckets.values():
+                bucket.rate = bucket.limit
+            return
+        # Weighted max-min fairness: tokens capped below their share keep
+        # their cap and the rest of the budget is split among the others.
+        top = max((b.limit for b in self._buckets.values() if b.limit), default=MB)
+        for bucket in self._buckets.values():
+            bucket.weight = (bucket.limit or top) / MB
+        remaining, pending = self.total, list(self._buckets.values())
+        while pending:
+            weight = sum(b.weight for b in pending)
+            capped = [b for b in pending if b.limit and b.limit <= remaining * b.weight / weight]
+            if not capped:
+                for bucket in pending:
+                    bucket.rate = remaining * bucket.weight / weight
+                return
+            for bucket in capped:
+                bucket.rate = bucket.limit
+                remaining -= bucket.limit
+                pending.remove(bucket)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "total_mbps": round(self.total / MB, 2) if self.total else None,
+            "tokens": [
+                {
+                    "token": key[:6] + "…",
+                    "streams": b.flows,
+                    "rate_mbps": round(b.rate / MB, 2) if b.rate else None,
+                    "delayed_sec": round(b.delayed_sec, 2),
+                    "delayed_bytes": b.delayed_bytes,
+                }
+                for key, b in self._buckets.items()
+            ],
+        }
+
+
+bandwidth_shaper = BandwidthShaper(Telegram.STREAM_RATE_LIMIT_MBPS, Telegram.TOKEN_RATE_LIMIT_MBPS)
@@ -0,0 +1,92 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from Backend.config import Telegram
+from Backend.logger import LOGGER
+
+ShardQuery = Callable[[int, Any], Awaitable[Any]]
+
+
+class ShardResults:
+    """Per-shard answers of one fan-out, keyed by storage ``db_index``.
+
+    ``failed`` holds the shards that timed out or raised; callers decide
+    whether a partial answer is good enough, usually it is.
+    """
+
+    __slots__ = ("values", "failed")
+
+    def __init__(self):
+        self.values: Dict[int, Any] = {}
+        self.failed: Dict[int, str] = {}
+
+    @property
+    def partial(self) -> bool:
+        return bool(self.failed)
+
+    def ordered(self, reverse: bool = False) -> List[Any]:
+        """Answers in ``db_index`` order (newest storage first with ``reverse``)."""
+        return [self.values[i] for i in sorted(self.values, reverse=reverse)]
+
+
+class ShardFanout:
+    """Runs one query on several storage databases at once.
+
+    Each shard gets ``timeout`` seconds; a shard that times out or fails is
+    left out of the answer and logged, so one slow or unreachable cluster
+    costs at most the timeout instead of failing the whole request, and the
+    request takes as long as the slowest shard rather than the sum of all.
+    """
+
+    def __init__(self, timeout: float):
+        self.timeout = timeout
+        self.calls = 0
+        self.timeouts: Dict[int, int] = {}
+        self.errors: Dict[int, int] = {}
+        self.last_ms: Dict[int, float] = {}
+
+    async def _run(self, db_index: int, database, query: ShardQuery, timeout: Optional[float]):
+        started = time.perf_counter()
+        try:
+            if timeout and timeout > 0:
+                return await asyncio.wait_for(query(db_index, database), timeout=timeout)
+            return await query(db_index, database)
+        finally:
+            self.last_ms[db_index] = round((time.perf_counter() - started) * 1000, 2)
+
+    async def gather(
+        self, shards: Dict[int, Any], query: ShardQuery, timeout: Optional[float] = None
+    ) -> ShardResults:
+        timeout = self.timeout if timeout is None else timeout
+        self.calls += 1
+        indexes = list(shards)
+        answers = await asyncio.gather(
+            *(self._run(i, shards[i], query, timeout) for i in indexes), return_exceptions=True
+        )
+
+        results = ShardResults()
+        for db_index, answer in zip(indexes, answers):
+            if isinstance(answer, asyncio.TimeoutError):
+                self.timeouts[db_index] = self.timeouts.get(db_index, 0) + 1
+                results.failed[db_index] = f"timed out after {timeout}s"
+            elif isinstance(answer, BaseException):
+                self.errors[db_index] = self.errors.get(db_index, 0) + 1
+                results.failed[db_index] = str(answer) or type(answer).__name__
+            else:
+                results.values[db_index] = answer
+        for db_index, error in results.failed.items():
+            LOGGER.warning(f"storage_{db_index} left out of {getattr(query, '__name__', 'query')}: {error}")
+        return results
+
+    def stats(self) -> dict:
+        return {
+            "timeout_sec": self.timeout,
+            "calls": self.calls,
+            "timeouts": {f"storage_{i}": n for i, n in sorted(self.timeouts.items())},
+            "errors": {f"storage_{i}": n for i, n in sorted(self.errors.items())},
+            "last_ms": {f"storage_{i}": ms for i, ms in sorted(self.last_ms.items())},
+        }
+
+
+shard_fanout = ShardFanout(Telegram.SHARD_TIMEOUT)
@@ -0,0 +1,130 @@
+import asyncio
+import time
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from Backend.config import Telegram
+
+Loader = Callable[..., Awaitable[Optional[dict]]]
+
+
+class TokenCache:
+    """Short-lived in-process copies of ``api_tokens`` and ``users`` documents.
+
+    ``verify_token`` runs on every catalog, meta, stream and Range request;
+    serving it from here takes its one or two ``find_one`` calls off the hot
+    path. Entries expire after ``ttl`` seconds and are dropped explicitly by
+    the Database methods that change them. Usage counters are write-through:
+    ``update_token_usage`` adds every delta to the cached document as well, so
+    limit checks see the bytes streamed since it was loaded. Misses (unknown
+    tokens included) are cached too, and concurrent misses share one query.
+    """
+
+    def __init__(self, ttl: int):
+        self.ttl = ttl
+        self._entries: Dict[Hashable, Tuple[Optional[dict], float]] = {}
+        self._in_flight: Dict[Hashable, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    async def _get(self, key: Hashable, loader: Loader, *args) -> Optional[dict]:
+        if not self.enabled:
+            return await loader(*args)
+
+        while True:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > time.monotonic():
+                self.hits += 1
+                return entry[0]
+
+            pending = self._in_flight.get(key)
+            if pending is None:
+                break
+            self.hits += 1
+            try:
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                # The leading lookup was cancelled (its client went away) but
+                # we were not: look again, and lead the next attempt if nobody
+                # else already does.
+                if not pending.cancelled() or asyncio.current_task().cancelling():
+                    raise
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            doc = await loader(*args)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # nobody may be waiting; mark as retrieved
+            raise
+        finally:
+            if self._in_flight.get(key) is future:
+                del self._in_flight[key]
+
+        self._entries[key] = (doc, time.monotonic() + self.ttl)
+        future.set_result(doc)
+        return doc
+
+    async def token(self, token: str, loader: Loader) -> Optional[dict]:
+        """Return a copy of the token document that callers may annotate freely."""
+        doc = await self._get(("token", token), loader, token)
+        return dict(doc) if doc else None
+
+    async def user(self, user_id: int, loader: Loader) -> Optional[dict]:
+        return await self._get(("user", int(user_id)), loader, int(user_id))
+
+    def add_usage(self, token: str, bytes_delta: int) -> None:
+        """Mirror an ``update_token_usage`` increment into the cached document."""
+        entry = self._entries.get(("token", token))
+        if not entry or not entry[0]:
+            return
+        now = datetime.now(timezone.utc)
+        today_str = now.strftime("%Y-%m-%d")
+        month_str = now.strftime("%Y-%m")
+
+        usage = dict(entry[0].get("usage") or {})
+        daily = dict(usage.get("daily") or {})
+        if daily.get("date") != today_str:
+            daily = {"date": today_str, "bytes": 0}
+        monthly = dict(usage.get("monthly") or {})
+        if monthly.get("month") != month_str:
+            monthly = {"month": month_str, "bytes": 0}
+
+        daily["bytes"] = daily.get("bytes", 0) + bytes_delta
+        monthly["bytes"] = monthly.get("bytes", 0) + bytes_delta
+        usage.update({
+            "total_bytes": usage.get("total_bytes", 0) + bytes_delta,
+            "daily": daily,
+            "monthly": monthly,
+        })
+        # Replace rather than mutate: copies handed out earlier keep their view.
+        entry[0]["usage"] = usage
+
+    def invalidate_token(self, token: str) -> None:
+        self._entries.pop(("token", token), None)
+
+    def invalidate_user(self, user_id: int) -> None:
+        self._entries.pop(("user", int(user_id)), None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+token_cache = TokenCache(Telegram.TOKEN_CACHE_TTL)
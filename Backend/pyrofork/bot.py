@@ -26,4 +26,5 @@ multi_clients = {}
 work_loads = {}
 client_dc_map = {}
 client_failures = {}  
-client_avg_mbps = {}
\ No newline at end of file
+client_avg_mbps = {}
+client_session_keys = {}  # client_index -> key of its stored session in the tracking DB
\ No newline at end of file
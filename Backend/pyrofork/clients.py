@@ -1,8 +1,10 @@
 from asyncio import gather, create_task
+from hashlib import sha256
 from pyrogram import Client
+from Backend import db
 from Backend.logger import LOGGER
 from Backend.config import Telegram
-from Backend.pyrofork.bot import multi_clients, work_loads, StreamBot, client_dc_map
+from Backend.pyrofork.bot import multi_clients, work_loads, StreamBot, client_dc_map, client_session_keys
 from os import environ
 
 class TokenParser:
@@ -19,18 +21,45 @@ class TokenParser:
         }
         return tokens
 
+def session_key(token: str) -> str:
+    """Stored sessions are keyed by token, so a MULTI_TOKEN moving to another slot keeps its session."""
+    return sha256(token.encode()).hexdigest()[:16]
+
+
+def _build_client(client_id, token, session_string=None) -> Client:
+    return Client(
+        name=str(client_id),
+        api_id=Telegram.API_ID,
+        api_hash=Telegram.API_HASH,
+        bot_token=token,
+        session_string=session_string,
+        sleep_threshold=100,
+        no_updates=True,
+        in_memory=True
+    )
+
+
 async def start_client(client_id, token):
     try:
         LOGGER.info(f"Starting - Bot Client {client_id}")
-        client = await Client(
-            name=str(client_id),
-            api_id=Telegram.API_ID,
-            api_hash=Telegram.API_HASH,
-            bot_token=token,
-            sleep_threshold=100,
-            no_updates=True,
-            in_memory=True
-        ).start()
+        key = session_key(token)
+        # Session strings are stored in plaintext, so resuming them is opt-in.
+        stored = (await db.get_bot_session(key) or {}) if Telegram.PERSIST_BOT_SESSIONS else {}
+        client = None
+        if stored.get("session_string"):
+            # Resume the stored authorization instead of logging the bot in again.
+            try:
+                client = await _build_client(client_id, token, stored["session_string"]).start()
+            except Exception as e:
+                LOGGER.warning(f"Stored session of Client {client_id} rejected, logging in again: {e}")
+        if client is None:
+            client = await _build_client(client_id, token).start()
+            if Telegram.PERSIST_BOT_SESSIONS:
+                try:
+                    await db.save_bot_session(key, await client.export_session_string())
+                except Exception as e:
+                    LOGGER.warning(f"Could not store session of Client {client_id}: {e}")
+        client_session_keys[client_id] = key
         
         try:
             client_dc = await client.storage.dc_id()
@@ -48,6 +77,7 @@ async def start_client(client_id, token):
 
 async def initialize_clients():
     multi_clients[0], work_loads[0] = StreamBot, 0
+    client_session_keys[0] = session_key(Telegram.BOT_TOKEN)
     
     try:
         main_dc = await StreamBot.storage.dc_id()
@@ -64,7 +94,7 @@ async def initialize_clients():
 
     tasks = [create_task(start_client(i, token)) for i, token in all_tokens.items()]
     clients = await gather(*tasks)
-    clients = {client_id: client for client_id, client in clients if client}
+    clients = dict(result for result in clients if result)
     multi_clients.update(clients)
 
     if len(multi_clients) != 1:
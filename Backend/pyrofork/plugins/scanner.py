@@ -67,16 +67,7 @@ async def _stream_id_exists(channel: int, msg_id: int) -> bool:
     except Exception:
         return False
 
-    # Check across all storage DBs
-    for i in range(1, db.current_db_index + 1):
-        storage = db.dbs.get(f"storage_{i}")
-        if storage is None:
-            continue
-        if await storage["movie"].find_one({"telegram.id": stream_hash}):
-            return True
-        if await storage["tv"].find_one({"seasons.episodes.telegram.id": stream_hash}):
-            return True
-    return False
+    return await db.has_stream(stream_hash)
 
 
 async def _update_progress(force: bool = False):
@@ -386,6 +377,10 @@ async def rescan_command(client: Client, message: Message):
     for ch_id_str in channels:
         channel_int = int(ch_id_str.replace("-100", ""))
         purged += await _purge_channel_entries(channel_int)
+        await db.delete_stream_entries_for_chat(int(f"-100{channel_int}"))
+    # The purge edits the storage DBs directly; drop cached pages, totals and positions.
+    for collection_name in ("movie", "tv"):
+        db._catalog_changed(collection_name)
 
     await purge_msg.edit_text(
         f"🗑 Purged <code>{purged}</code> stream entries. Starting full scan…",
@@ -6,6 +6,7 @@ Commands (owner-only, private chat):
     /search <title>         — Search your DB for a movie or show
     /dbcheck                — Find orphaned stream entries (dead Telegram messages)
     /dbcheck purge          — Find and delete orphaned entries
+    /backfillstreams        — Rebuild the stream id lookup from the library
     /exportchannels         — Export AUTH_CHANNEL list as JSON
     /importchannels <json>  — Import channels from JSON
 """
@@ -258,6 +259,55 @@ async def process_batch(client, batch):
     return await asyncio.gather(*tasks, return_exceptions=True)
 
 
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+# Stream ids to check
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+async def _stream_id_batches():
+    """Every stored stream id, from the streams lookup once it is backfilled,
+    otherwise by paging through each storage DB's documents."""
+    if db.streams_ready:
+        async for stream_ids in db.iter_stream_ids(BATCH_SIZE):
+            yield stream_ids
+        return
+
+    for i in range(1, db.current_db_index + 1):
+        storage = db.dbs.get(f"storage_{i}")
+
+        if storage is None:
+            continue
+
+        for collection_name in ("movie", "tv"):
+            last_id = None
+
+            while True:
+                query = {"_id": {"$gt": last_id}} if last_id else {}
+
+                docs = await storage[collection_name] \
+                    .find(query) \
+                    .sort("_id", 1) \
+                    .limit(BATCH_SIZE) \
+                    .to_list(length=BATCH_SIZE)
+
+                if not docs:
+                    break
+
+                for doc in docs:
+                    last_id = doc["_id"]
+
+                    if collection_name == "movie":
+                        qualities = doc.get("telegram", [])
+                    else:
+                        qualities = [
+                            q for season in doc.get("seasons", [])
+                            for episode in season.get("episodes", [])
+                            for q in episode.get("telegram", [])
+                        ]
+
+                    stream_ids = [q["id"] for q in qualities if q.get("id")]
+                    if stream_ids:
+                        yield stream_ids
+
+
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 # /dbcheck — Integrity checker (find orphaned streams)
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
@@ -283,117 +333,34 @@ async def dbcheck_command(client: Client, message: Message):
     start_time = time.time()
 
     try:
-        for i in range(1, db.current_db_index + 1):
-            storage = db.dbs.get(f"storage_{i}")
-
-            if storage is None:
-                continue
-
-            # ───────── MOVIES (PAGINATION) ─────────
-            last_id = None
-
-            while True:
-                query = {"_id": {"$gt": last_id}} if last_id else {}
-
-                docs = await storage["movie"] \
-                    .find(query) \
-                    .sort("_id", 1) \
-                    .limit(BATCH_SIZE) \
-                    .to_list(length=BATCH_SIZE)
-
-                if not docs:
-                    break
-
-                for movie in docs:
-                    last_id = movie["_id"]
-                    title = movie.get("title", "Unknown")
-
-                    stream_ids = [
-                        q.get("id") for q in movie.get("telegram", [])
-                        if q.get("id")
-                    ]
-
-                    for x in range(0, len(stream_ids), CONCURRENT_TASKS):
-                        batch = stream_ids[x:x + CONCURRENT_TASKS]
-                        results = await process_batch(client, batch)
-
-                        for stream_hash, result in zip(batch, results):
-                            checked += 1
-
-                            if result is True:
-                                alive += 1
-                            elif result is False:
-                                dead += 1
-                                dead_entries.append(stream_hash)
-                            else:
-                                errors += 1
-
-                        if checked % PROGRESS_UPDATE_EVERY == 0:
-                            elapsed = int(time.time() - start_time)
-                            speed = checked // max(1, elapsed)
-
-                            await status_msg.edit_text(
-                                f"🚀 DB Check Running...\n\n"
-                                f"Checked: {checked}\n"
-                                f"Alive: {alive}\n"
-                                f"Dead: {dead}\n"
-                                f"Errors: {errors}\n\n"
-                                f"⚡ Speed: {speed}/sec"
-                            )
-
-            # ───────── TV (PAGINATION) ─────────
-            last_id = None
-
-            while True:
-                query = {"_id": {"$gt": last_id}} if last_id else {}
-
-                docs = await storage["tv"] \
-                    .find(query) \
-                    .sort("_id", 1) \
-                    .limit(BATCH_SIZE) \
-                    .to_list(length=BATCH_SIZE)
-
-                if not docs:
-                    break
-
-                for show in docs:
-                    last_id = show["_id"]
-
-                    stream_ids = []
-
-                    for season in show.get("seasons", []):
-                        for episode in season.get("episodes", []):
-                            for q in episode.get("telegram", []):
-                                if q.get("id"):
-                                    stream_ids.append(q["id"])
-
-                    for x in range(0, len(stream_ids), CONCURRENT_TASKS):
-                        batch = stream_ids[x:x + CONCURRENT_TASKS]
-                        results = await process_batch(client, batch)
-
-                        for stream_hash, result in zip(batch, results):
-                            checked += 1
-
-                            if result is True:
-                                alive += 1
-                            elif result is False:
-                                dead += 1
-                                dead_entries.append(stream_hash)
-                            else:
-                                errors += 1
-
-                        if checked % PROGRESS_UPDATE_EVERY == 0:
-                            elapsed = int(time.time() - start_time)
-                            speed = checked // max(1, elapsed)
-
-                            await status_msg.edit_text(
-                                f"🚀 DB Check Running...\n\n"
-                                f"Checked: {checked}\n"
-                                f"Alive: {alive}\n"
-                                f"Dead: {dead}\n"
-                                f"Errors: {errors}\n\n"
-                                f"⚡ Speed: {speed}/sec"
-                            )
+        async for stream_ids in _stream_id_batches():
+            for x in range(0, len(stream_ids), CONCURRENT_TASKS):
+                batch = stream_ids[x:x + CONCURRENT_TASKS]
+                results = await process_batch(client, batch)
+
+                for stream_hash, result in zip(batch, results):
+                    checked += 1
+
+                    if result is True:
+                        alive += 1
+                    elif result is False:
+                        dead += 1
+                        dead_entries.append(stream_hash)
+                    else:
+                        errors += 1
+
+                if checked % PROGRESS_UPDATE_EVERY == 0:
+                    elapsed = int(time.time() - start_time)
+                    speed = checked // max(1, elapsed)
+
+                    await status_msg.edit_text(
+                        f"🚀 DB Check Running...\n\n"
+                        f"Checked: {checked}\n"
+                        f"Alive: {alive}\n"
+                        f"Dead: {dead}\n"
+                        f"Errors: {errors}\n\n"
+                        f"⚡ Speed: {speed}/sec"
+                    )
 
         # ───────── PURGE ─────────
         if purge_mode and dead_entries:
@@ -430,6 +397,32 @@ async def dbcheck_command(client: Client, message: Message):
         await status_msg.edit_text(f"❌ DB check failed: {e}")
 
 
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+#  /backfillstreams — Rebuild the stream id lookup
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+@Client.on_message(filters.command('backfillstreams') & filters.private & CustomFilters.owner, group=10)
+async def backfill_streams_command(client: Client, message: Message):
+    """Index every stored quality into the streams lookup (run once for existing libraries)."""
+    status_msg = await message.reply_text("🗂 Backfilling stream lookup…", quote=True)
+    start_time = time.time()
+    try:
+        counts = await db.backfill_streams()
+    except Exception as e:
+        LOGGER.error(f"[Backfill] Error: {e}")
+        await status_msg.edit_text(f"❌ Backfill failed: {e}")
+        return
+
+    await status_msg.edit_text(
+        f"✅ STREAM LOOKUP BACKFILLED\n\n"
+        f"Movies: {counts['movie']}\n"
+        f"TV Shows: {counts['tv']}\n"
+        f"Streams: {counts['streams']}\n"
+        f"🗑 Stale removed: {counts['removed']}\n"
+        f"⏱ Time: {int(time.time() - start_time)}s"
+    )
+
+
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 #  /exportchannels & /importchannels — Backup/restore channel config
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
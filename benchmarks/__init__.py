@@ -0,0 +1,9 @@
+"""Offline benchmarks for the streaming and database paths.
+
+Run from the repository root, e.g. ``python -m benchmarks.bench_range_slicing``.
+Importing ``Backend`` needs two DATABASE URIs; a placeholder is set here so the
+benchmarks never require (or touch) a real config.env.
+"""
+import os
+
+os.environ.setdefault("DATABASE", "mongodb://127.0.0.1:27017,mongodb://127.0.0.1:27017")
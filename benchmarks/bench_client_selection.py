@@ -0,0 +1,165 @@
+"""Simulated comparison of client selection policies.
+
+No Telegram and no event loop: bots are links of fixed capacity and base
+latency, streams arrive as a Poisson process and each bot splits its
+capacity max-min fairly between its streams (each capped at ``--burst``
+times the playback bitrate, like a player filling its buffer). The real
+``bandwidth_model`` runs on the simulated clock and gets one GetFile sample
+per chunk a bot moves, so the ``p2c`` policy sees the same kind of
+estimates it does in production.
+
+Policies:
+
+* ``legacy`` - lowest ``work_loads + 3 * client_failures`` (the old scoring)
+* ``p2c``    - ``Backend.helper.client_selection.pick_client``
+
+Half way through the run the fastest bot degrades to ``--degraded-mbps``.
+
+    python -m benchmarks.bench_client_selection --rate 0.5 --duration 600
+"""
+import argparse
+import math
+import random
+
+import benchmarks  # noqa: F401  (sets the placeholder DATABASE env)
+from Backend.helper import client_selection
+from Backend.helper.bandwidth import bandwidth_model
+from Backend.pyrofork.bot import work_loads, client_failures
+
+DC_ID = 2
+MB = 1024 * 1024
+STARTUP_MB = 4.0  # buffered before playback starts
+
+
+def legacy_pick(candidates, dc_id):
+    return min(candidates, key=lambda idx: work_loads.get(idx, 0) + 3 * client_failures.get(idx, 0))
+
+
+def _share(capacity: float, caps: list) -> list:
+    """Max-min fair split of ``capacity`` between demands ``caps``."""
+    rates = [0.0] * len(caps)
+    pending = sorted(range(len(caps)), key=lambda i: caps[i])
+    remaining = capacity
+    while pending:
+        fair = remaining / len(pending)
+        i = pending[0]
+        if caps[i] <= fair:
+            rates[i] = caps[i]
+            remaining -= caps[i]
+            pending.pop(0)
+        else:
+            for j in pending:
+                rates[j] = fair
+            break
+    return rates
+
+
+def simulate(args, policy, bots):
+    rng = random.Random(args.seed)
+    bandwidth_model._links.clear()
+    work_loads.clear()
+    client_failures.clear()
+    for idx in range(len(bots)):
+        work_loads[idx] = 0
+    client_selection._rng.seed(args.seed)
+
+    capacity = [mbps for mbps, _ in bots]
+    latency = [lat for _, lat in bots]
+    moved = [0.0] * len(bots)  # bytes fetched and not yet reported as a chunk
+    streams = []  # dicts: bot, start, delivered, remaining, started_at, below, alive
+    startups, below_time, total_time = [], 0.0, 0.0
+    next_arrival = rng.expovariate(args.rate)
+    t = 0.0
+    dt = args.tick
+    bandwidth_model.clock = lambda: t
+
+    while t < args.duration:
+        if t >= args.duration / 2:
+            capacity[0] = args.degraded_mbps
+
+        while next_arrival <= t:
+            pick = policy(range(len(bots)), DC_ID)
+            work_loads[pick] += 1
+            streams.append({
+                "bot": pick, "arrived": t, "delivered": 0.0, "bytes": 0.0,
+                "length": rng.expovariate(1 / args.mean_length), "playing": False,
+            })
+            next_arrival += rng.expovariate(args.rate)
+
+        for idx in range(len(bots)):
+            mine = [s for s in streams if s["bot"] == idx]
+            if not mine:
+                continue
+            caps = [args.bitrate * args.burst for _ in mine]
+            rates = _share(capacity[idx], caps)
+            for s, rate in zip(mine, rates):
+                s["bytes"] += rate * dt
+                if not s["playing"]:
+                    if s["bytes"] >= STARTUP_MB:
+                        s["playing"] = True
+                        startups.append(t + dt - s["arrived"] + latency[idx])
+                else:
+                    total_time += dt
+                    if s["bytes"] < s["delivered"] + args.bitrate * dt:
+                        below_time += dt
+                    s["delivered"] = min(s["bytes"], s["delivered"] + args.bitrate * dt)
+
+            # One GetFile sample per chunk moved: requests of all the bot's
+            # streams share the link, so each takes longer as load grows.
+            size, depth = bandwidth_model.plan(idx, DC_ID)
+            in_flight = len(mine) * depth
+            sample = latency[idx] + (size / MB) * in_flight / capacity[idx]
+            moved[idx] += sum(rates) * MB * dt
+            while moved[idx] >= size:
+                bandwidth_model.observe(idx, DC_ID, size, sample)
+                moved[idx] -= size
+
+        for s in list(streams):
+            if s["playing"] and s["delivered"] >= s["length"] * args.bitrate:
+                streams.remove(s)
+                work_loads[s["bot"]] -= 1
+        t += dt
+
+    startups.sort()
+
+    def pct(p):
+        return startups[min(len(startups) - 1, int(len(startups) * p))] if startups else math.nan
+
+    return {
+        "streams": len(startups),
+        "p50": pct(0.5),
+        "p95": pct(0.95),
+        "stall": below_time / total_time if total_time else 0.0,
+    }
+
+
+def main(args):
+    bots = list(zip(args.bot_mbps, args.bot_latency_ms))
+    bots = [(mbps, lat / 1000) for mbps, lat in bots]
+    print(
+        f"{len(bots)} bots {[mbps for mbps, _ in bots]} MB/s, {args.rate}/s arrivals, "
+        f"{args.bitrate} MB/s playback, bot 0 drops to {args.degraded_mbps} MB/s at "
+        f"{args.duration / 2:.0f}s"
+    )
+    print(f"{'policy':<8}{'streams':>9}{'start p50 s':>13}{'start p95 s':>13}{'stall %':>9}")
+    for name, policy in (("legacy", legacy_pick), ("p2c", client_selection.pick_client)):
+        result = simulate(args, policy, bots)
+        print(
+            f"{name:<8}{result['streams']:>9}{result['p50']:>13.2f}{result['p95']:>13.2f}"
+            f"{result['stall'] * 100:>9.1f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bot-mbps", type=float, nargs="+", default=[40, 20, 12, 8, 5, 3])
+    parser.add_argument("--bot-latency-ms", type=float, nargs="+", default=[40, 60, 80, 120, 200, 300])
+    parser.add_argument("--rate", type=float, default=0.5, help="stream arrivals per second")
+    parser.add_argument("--mean-length", type=float, default=60.0, help="seconds of playback per stream")
+    parser.add_argument("--bitrate", type=float, default=1.0, help="MB/s a player consumes")
+    parser.add_argument("--burst", type=float, default=3.0, help="max fetch rate as a multiple of bitrate")
+    parser.add_argument("--degraded-mbps", type=float, default=4.0)
+    parser.add_argument("--duration", type=float, default=600.0)
+    parser.add_argument("--tick", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=0)
+    main(parser.parse_args())
@@ -0,0 +1,123 @@
+"""Hot query latency on a storage database before and after the declared indexes.
+
+Needs a real MongoDB (``--uri``). Seeds a scratch database with ``--docs``
+synthetic movies and as many TV shows, times every storage query in
+``Backend.helper.indexes.HOT_QUERIES`` with no indexes but ``_id``, creates
+the indexes through ``index_manager`` and times them again. The plan column
+is the winning plan after indexing. The scratch database is dropped at the
+end unless ``--keep`` is given.
+
+    python -m benchmarks.bench_indexes --uri mongodb://127.0.0.1:27017 --docs 50000
+"""
+import argparse
+import asyncio
+import random
+import secrets
+import statistics
+import time
+from datetime import datetime, timedelta
+
+import motor.motor_asyncio
+
+import benchmarks  # noqa: F401  (sets the placeholder DATABASE env)
+from Backend.helper.indexes import HOT_QUERIES, STORAGE, index_manager
+
+GENRES = ["Action", "Comedy", "Drama", "Horror", "Romance", "Thriller", "Animation", "Crime"]
+
+
+def _stream(rng: random.Random) -> dict:
+    return {
+        "id": secrets.token_hex(8),
+        "name": f"file.{rng.randrange(10**6)}.mkv",
+        "quality": rng.choice(["720p", "1080p", "2160p"]),
+        "is_dead": rng.random() < 0.01,
+    }
+
+
+def _media(rng: random.Random, i: int, now: datetime) -> dict:
+    return {
+        "tmdb_id": i,
+        "imdb_id": f"tt{i:07d}",
+        "title": f"Title {i}",
+        "release_year": 1950 + i % 75,
+        "rating": round(rng.uniform(1, 10), 1),
+        "genres": rng.sample(GENRES, 2),
+        "updated_on": now - timedelta(minutes=rng.randrange(10**6)),
+    }
+
+
+async def seed(database, docs: int, seed_value: int) -> None:
+    rng = random.Random(seed_value)
+    now = datetime.utcnow()
+    batch = 1000
+    for start in range(0, docs, batch):
+        movies, shows = [], []
+        for i in range(start, min(docs, start + batch)):
+            movies.append({**_media(rng, i, now), "telegram": [_stream(rng) for _ in range(2)]})
+            shows.append({
+                **_media(rng, i, now),
+                "seasons": [
+                    {"season_number": s, "episodes": [
+                        {"episode_number": e, "telegram": [_stream(rng)]} for e in range(1, 9)
+                    ]}
+                    for s in range(1, 3)
+                ],
+            })
+        await database["movie"].insert_many(movies)
+        await database["tv"].insert_many(shows)
+
+
+async def time_queries(database, repeat: int) -> dict:
+    results = {}
+    for label, kind, name, query, sort in HOT_QUERIES:
+        if kind != STORAGE:
+            continue
+        samples = []
+        for _ in range(repeat):
+            cursor = database[name].find(query)
+            if sort:
+                cursor = cursor.sort(sort)
+            started = time.perf_counter()
+            await cursor.limit(20).to_list(None)
+            samples.append((time.perf_counter() - started) * 1000)
+        results[label] = statistics.median(samples)
+    return results
+
+
+async def main(args):
+    client = motor.motor_asyncio.AsyncIOMotorClient(args.uri)
+    database = client[args.db]
+    try:
+        await database.drop_collection("movie")
+        await database.drop_collection("tv")
+        started = time.perf_counter()
+        await seed(database, args.docs, args.seed)
+        print(f"Seeded {args.docs} movies and {args.docs} shows in {time.perf_counter() - started:.1f}s")
+
+        before = await time_queries(database, args.repeat)
+        started = time.perf_counter()
+        await index_manager.ensure({"storage_1": database})
+        print(f"Built indexes in {time.perf_counter() - started:.1f}s")
+        after = await time_queries(database, args.repeat)
+
+        print(f"{'query':<26}{'before ms':>11}{'after ms':>10}  plan")
+        for label, kind, name, query, sort in HOT_QUERIES:
+            if kind != STORAGE:
+                continue
+            plan = await index_manager.explain(database[name], query, sort)
+            print(f"{label:<26}{before[label]:>11.2f}{after[label]:>10.2f}  {plan['plan']}")
+    finally:
+        if not args.keep:
+            await client.drop_database(args.db)
+        client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--uri", default="mongodb://127.0.0.1:27017")
+    parser.add_argument("--db", default="bench_indexes")
+    parser.add_argument("--docs", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--keep", action="store_true")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,74 @@
+"""Microbenchmark for the ordered prefetch producer at high parallelism.
+
+Streams a file through ``ByteStreamer.prefetch_stream`` against a
+``FakeMediaSession`` whose per-call latency is jittered, so parts complete
+out of order and exercise the reorder buffer. Reports parts/s and event-loop
+CPU per part for 16, 32 and 64 in-flight parts.
+
+    python -m benchmarks.bench_prefetch_producer [--parts 2000] [--latency-ms 5]
+"""
+import argparse
+import asyncio
+import time
+
+from Backend import db
+from Backend.helper.chunk_cache import chunk_cache
+from Backend.helper.custom_dl import ByteStreamer
+from Backend.pyrofork.bot import multi_clients, work_loads
+from benchmarks.fake_session import FakeClient, FakeMediaSession, fake_file_id
+
+
+async def _noop(*args, **kwargs):
+    return None
+
+
+async def run_one(streamer, file_id, parts, chunk_size, parallelism):
+    started = time.perf_counter()
+    cpu_started = time.process_time()
+    body = await streamer.prefetch_stream(
+        file_id=file_id,
+        client_index=0,
+        start=0,
+        end=parts * chunk_size - 1,
+        chunk_size=chunk_size,
+        prefetch=parallelism,
+        parallelism=parallelism,
+    )
+    received = 0
+    async for part in body:
+        received += len(part)
+    return received, time.perf_counter() - started, time.process_time() - cpu_started
+
+
+async def main(args):
+    chunk_size = args.chunk_kb * 1024
+    file_size = args.parts * chunk_size
+    session = FakeMediaSession(file_size, latency=args.latency_ms / 1000, jitter=args.jitter_ms / 1000)
+    client = FakeClient(session)
+    multi_clients[0], work_loads[0] = client, 0
+
+    chunk_cache.max_bytes = 0  # measure the producer, not the cache
+    db.log_stream_stats = _noop
+
+    streamer = ByteStreamer(client, 0)
+    file_id = fake_file_id(file_size)
+
+    print(f"{args.parts} parts x {args.chunk_kb} KB, latency {args.latency_ms} ms +/- {args.jitter_ms} ms")
+    print(f"{'in-flight':>9}{'parts/s':>12}{'MB/s':>10}{'cpu us/part':>14}")
+    for parallelism in args.parallelism:
+        received, wall, cpu = await run_one(streamer, file_id, args.parts, chunk_size, parallelism)
+        assert received == file_size, (received, file_size)
+        print(
+            f"{parallelism:>9}{args.parts / wall:>12.0f}"
+            f"{received / (1024 * 1024) / wall:>10.1f}{cpu / args.parts * 1e6:>14.1f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--parts", type=int, default=2000)
+    parser.add_argument("--chunk-kb", type=int, default=64)
+    parser.add_argument("--latency-ms", type=float, default=5.0)
+    parser.add_argument("--jitter-ms", type=float, default=20.0)
+    parser.add_argument("--parallelism", type=int, nargs="+", default=[16, 32, 64])
+    asyncio.run(main(parser.parse_args()))
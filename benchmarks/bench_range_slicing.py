@@ -0,0 +1,100 @@
+"""Bytes copied per Range request: bytes slicing vs. memoryview slicing.
+
+Replays a mix of player-style Range requests through the consumer's part
+trimming and measures, with tracemalloc, how many bytes are allocated to
+produce the response body. Chunks are pre-built so only the trimming cost
+is measured.
+
+    python -m benchmarks.bench_range_slicing [--requests 500] [--chunk-kb 1024]
+"""
+import argparse
+import math
+import random
+import time
+import tracemalloc
+
+from Backend.helper.custom_dl import slice_chunk
+
+
+def _legacy_parts(chunk, idx, part_count, first_cut, last_cut):
+    if part_count == 1:
+        return chunk[first_cut:last_cut]
+    if idx == 1:
+        return chunk[first_cut:]
+    if idx == part_count:
+        return chunk[:last_cut]
+    return chunk
+
+
+def _view_parts(chunk, idx, part_count, first_cut, last_cut):
+    if part_count == 1:
+        return slice_chunk(chunk, first_cut, last_cut)
+    if idx == 1:
+        return slice_chunk(chunk, first_cut)
+    if idx == part_count:
+        return slice_chunk(chunk, 0, last_cut)
+    return slice_chunk(chunk)
+
+
+def _requests(count, file_size, rng):
+    """Mostly short probes and seeks, some long sequential reads."""
+    for _ in range(count):
+        kind = rng.random()
+        if kind < 0.3:
+            start = rng.randrange(0, file_size - 1)
+            yield start, min(file_size - 1, start + rng.randrange(1, 64 * 1024))
+        elif kind < 0.8:
+            start = rng.randrange(0, file_size - 1)
+            yield start, min(file_size - 1, start + rng.randrange(1, 16 * 1024 * 1024))
+        else:
+            yield rng.randrange(0, file_size // 2), file_size - 1
+
+
+def run(trim, requests, chunk, chunk_size, file_size):
+    copied = 0
+    body = 0
+    started = time.perf_counter()
+    for start, end in requests:
+        offset = start - (start % chunk_size)
+        first_cut = start - offset
+        last_cut = (end % chunk_size) + 1
+        part_count = math.ceil(end / chunk_size) - math.floor(offset / chunk_size)
+        # A 60 MB sequential read is represented by its first and last parts;
+        # middle parts are passed through untouched by both strategies.
+        for idx in {1, max(1, part_count)}:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            part = trim(chunk, idx, part_count, first_cut, last_cut)
+            copied += tracemalloc.get_traced_memory()[1] - before
+            body += len(part)
+            del part
+    return copied, body, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--chunk-kb", type=int, default=1024)
+    parser.add_argument("--file-mb", type=int, default=2048)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    chunk_size = args.chunk_kb * 1024
+    file_size = args.file_mb * 1024 * 1024
+    chunk = random.randbytes(chunk_size)
+    requests = list(_requests(args.requests, file_size, random.Random(args.seed)))
+
+    tracemalloc.start()
+    print(f"{args.requests} requests, chunk={args.chunk_kb} KB")
+    print(f"{'strategy':<12}{'copied/request':>18}{'total copied':>16}{'time':>10}")
+    for name, trim in (("bytes", _legacy_parts), ("memoryview", _view_parts)):
+        copied, _, elapsed = run(trim, requests, chunk, chunk_size, file_size)
+        print(
+            f"{name:<12}{copied / args.requests / 1024:>15.1f} KB"
+            f"{copied / (1024 * 1024):>13.1f} MB{elapsed * 1000:>8.1f}ms"
+        )
+    tracemalloc.stop()
+
+
+if __name__ == "__main__":
+    main()
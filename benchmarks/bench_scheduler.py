@@ -0,0 +1,127 @@
+"""Time-to-first-byte of new streams on a bot that is already busy.
+
+Starts ``--background`` streams that keep one fake media session saturated,
+then opens ``--probes`` new streams at random offsets one after another and
+measures how long each waits for its first byte. Runs once without the
+GetFile scheduler and once per ``--cap``, so the effect of queueing the
+first part of a stream ahead of everyone's read-ahead is visible.
+
+    python -m benchmarks.bench_scheduler --background 100 --bandwidth-mbps 40 \\
+        --cap 8 16 32
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from benchmarks import bench_streaming
+from Backend import db
+from Backend.helper.chunk_cache import chunk_cache
+from Backend.helper.custom_dl import ByteStreamer
+from Backend.helper.disk_cache import disk_chunk_cache
+from Backend.helper.fetch_scheduler import fetch_scheduler
+from Backend.pyrofork.bot import multi_clients, work_loads, client_dc_map
+from benchmarks.fake_session import FakeClient, FakeMediaSession, fake_file_id
+
+DC_ID = 2
+
+
+async def _first_byte(streamer, file_id, start: int, chunk_size: int, parallelism: int) -> float:
+    started = time.perf_counter()
+    body = await streamer.prefetch_stream(
+        file_id=file_id, client_index=0, start=start, end=file_id.file_size - 1,
+        chunk_size=chunk_size, prefetch=parallelism, parallelism=parallelism,
+    )
+    try:
+        await body.__anext__()
+        return time.perf_counter() - started
+    finally:
+        await body.aclose()
+
+
+async def _background(streamer, file_id, chunk_size: int, parallelism: int, stop: asyncio.Event):
+    while not stop.is_set():
+        body = await streamer.prefetch_stream(
+            file_id=file_id, client_index=0, start=0, end=file_id.file_size - 1,
+            chunk_size=chunk_size, prefetch=parallelism, parallelism=parallelism,
+        )
+        try:
+            async for _ in body:
+                if stop.is_set():
+                    break
+        finally:
+            await body.aclose()
+
+
+async def run(args, streamer, file_id, cap: int):
+    fetch_scheduler.max_concurrent = cap
+    fetch_scheduler._gates.clear()
+    chunk_size = args.chunk_kb * 1024
+    rng = random.Random(args.seed)
+
+    stop = asyncio.Event()
+    tasks = [
+        asyncio.create_task(_background(streamer, file_id, chunk_size, args.parallelism, stop))
+        for _ in range(args.background)
+    ]
+    await asyncio.sleep(args.warmup)
+
+    ttfbs = []
+    for _ in range(args.probes):
+        start = rng.randrange(0, file_id.file_size // chunk_size) * chunk_size
+        ttfbs.append(await _first_byte(streamer, file_id, start, chunk_size, args.parallelism))
+
+    stop.set()
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    ttfbs.sort()
+    p50 = ttfbs[len(ttfbs) // 2]
+    p95 = ttfbs[min(len(ttfbs) - 1, len(ttfbs) * 95 // 100)]
+    label = str(cap) if cap else "off"
+    print(f"{label:>6}{p50 * 1000:>10.1f}{p95 * 1000:>10.1f}{ttfbs[-1] * 1000:>10.1f}")
+
+
+async def main(args):
+    session = FakeMediaSession(
+        file_size=args.size_mb * 1024 * 1024,
+        latency=args.latency_ms / 1000,
+        jitter=args.jitter_ms / 1000,
+        bandwidth_mbps=args.bandwidth_mbps,
+        seed=args.seed,
+    )
+    chunk_cache.max_bytes = 0
+    disk_chunk_cache.max_bytes = 0
+    db.log_stream_stats = bench_streaming._noop
+
+    client = FakeClient(session, dc_id=DC_ID)
+    multi_clients[0], work_loads[0], client_dc_map[0] = client, 0, DC_ID
+    streamer = ByteStreamer(client, 0)
+    file_id = fake_file_id(session.file_size, dc_id=DC_ID)
+
+    print(
+        f"{args.background} background streams x {args.parallelism} in flight, "
+        f"{args.chunk_kb} KB chunks, latency {args.latency_ms} ms, "
+        f"bandwidth {args.bandwidth_mbps} MB/s, {args.probes} new streams"
+    )
+    print(f"{'cap':>6}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}")
+    for cap in [0] + args.cap:
+        await run(args, streamer, file_id, cap)
+    session.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size-mb", type=int, default=1024)
+    parser.add_argument("--latency-ms", type=float, default=30.0)
+    parser.add_argument("--jitter-ms", type=float, default=10.0)
+    parser.add_argument("--bandwidth-mbps", type=float, default=40.0)
+    parser.add_argument("--background", type=int, default=100)
+    parser.add_argument("--parallelism", type=int, default=4)
+    parser.add_argument("--chunk-kb", type=int, default=512)
+    parser.add_argument("--probes", type=int, default=20)
+    parser.add_argument("--warmup", type=float, default=2.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--cap", type=int, nargs="+", default=[8, 32])
+    asyncio.run(main(parser.parse_args()))
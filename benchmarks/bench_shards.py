@@ -0,0 +1,166 @@
+"""Latency of the Database read paths as storage shards are added.
+
+Every storage database is replaced by an in-memory fake that answers each
+query after ``--latency-ms`` (plus up to ``--jitter-ms``), like a remote
+Atlas cluster. Each read path is timed with the shard fan-out (all shards
+queried together) and with the shards awaited one after another, as the
+old loops did, for each shard count in ``--shards``; queries a path sends
+to one shard run together in both modes. ``--slow-shard-ms`` makes the
+last shard that slow, to show the per-shard timeout (``--timeout``)
+cutting it off and the partial result that is returned.
+
+    python -m benchmarks.bench_shards --shards 1 2 4 6 --latency-ms 60 --jitter-ms 20
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+import benchmarks  # noqa: F401  (sets the placeholder DATABASE env)
+from Backend import db
+from Backend.helper.shards import ShardResults, shard_fanout
+
+MOVIES_PER_SHARD = 200
+
+
+class _Cursor:
+    def __init__(self, collection, docs):
+        self.collection = collection
+        self.docs = docs
+        self._skip = 0
+        self._limit = None
+
+    def sort(self, *_):
+        return self
+
+    def skip(self, n):
+        self._skip = n
+        return self
+
+    def limit(self, n):
+        self._limit = n
+        return self
+
+    async def to_list(self, _length=None):
+        await self.collection.shard.wait()
+        docs = self.docs[self._skip:]
+        return docs[:self._limit] if self._limit is not None else docs
+
+    async def __aiter__(self):
+        for doc in await self.to_list():
+            yield doc
+
+
+class _Collection:
+    def __init__(self, shard, docs):
+        self.shard = shard
+        self.docs = docs
+
+    async def count_documents(self, _query):
+        await self.shard.wait()
+        return len(self.docs)
+
+    def find(self, *_):
+        return _Cursor(self, self.docs)
+
+    def aggregate(self, _pipeline):
+        return _Cursor(self, self.docs[:5])
+
+    async def find_one(self, query):
+        await self.shard.wait()
+        imdb_id = query.get("imdb_id")
+        return next((d for d in self.docs if imdb_id and d.get("imdb_id") == imdb_id), None)
+
+
+class FakeShard:
+    def __init__(self, index: int, latency: float, jitter: float, rng: random.Random):
+        self.latency = latency
+        self.jitter = jitter
+        self.rng = rng
+        self.queries = 0
+        movies = [
+            {"_id": f"{index}-{i}", "tmdb_id": index * 10**6 + i, "imdb_id": f"tt{index}{i:06d}",
+             "title": f"Movie {index}-{i}", "telegram": []}
+            for i in range(MOVIES_PER_SHARD)
+        ]
+        self.collections = {"movie": _Collection(self, movies), "tv": _Collection(self, [])}
+
+    async def wait(self):
+        self.queries += 1
+        await asyncio.sleep(self.latency + self.rng.uniform(0, self.jitter))
+
+    def __getitem__(self, name):
+        return self.collections[name]
+
+    async def command(self, _name):
+        await self.wait()
+        return {"storageSize": 0, "dataSize": 0}
+
+
+async def _sequential(shards, query, timeout=None):
+    results = ShardResults()
+    for db_index, database in shards.items():
+        results.values[db_index] = await query(db_index, database)
+    return results
+
+
+def _install(count: int, args, rng: random.Random):
+    for key in [k for k in db.dbs if k.startswith("storage_")]:
+        del db.dbs[key]
+    latency, jitter = args.latency_ms / 1000, args.jitter_ms / 1000
+    for i in range(1, count + 1):
+        slow = args.slow_shard_ms and i == count and count > 1
+        db.dbs[f"storage_{i}"] = FakeShard(i, args.slow_shard_ms / 1000 if slow else latency, jitter, rng)
+    db.dbs.setdefault("tracking", None)
+    db.current_db_index = count
+
+
+def _paths(count: int):
+    # The movie to look up lives in the oldest shard, the worst case for the old loop.
+    return [
+        ("catalog page 1", lambda: db.sort_movies([("updated_on", "desc")], 1, 20)),
+        ("catalog deep page", lambda: db.sort_movies([("updated_on", "desc")], (count * MOVIES_PER_SHARD) // 20 - 1, 20)),
+        ("search", lambda: db.search_documents("movie", 1, 20)),
+        ("media details", lambda: db.get_media_details(imdb_id="tt1000000")),
+        ("database stats", lambda: db.get_database_stats()),
+        ("dead links", lambda: db.get_all_dead_links()),
+    ]
+
+
+async def _time(call, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await call()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+async def main(args):
+    rng = random.Random(args.seed)
+    shard_fanout.timeout = args.timeout
+    gather = shard_fanout.gather
+    print(f"{'shards':>6}  {'path':<18}{'sequential ms':>14}{'fan-out ms':>12}{'speedup':>9}")
+    for count in args.shards:
+        _install(count, args, rng)
+        for label, call in _paths(count):
+            shard_fanout.gather = _sequential
+            sequential = await _time(call, args.repeat)
+            shard_fanout.gather = gather
+            fanned = await _time(call, args.repeat)
+            print(f"{count:>6}  {label:<18}{sequential:>14.1f}{fanned:>12.1f}{sequential / fanned:>8.1f}x")
+    if args.slow_shard_ms:
+        print(f"\nTimed out shards: {shard_fanout.stats()['timeouts']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4, 6])
+    parser.add_argument("--latency-ms", type=float, default=60)
+    parser.add_argument("--jitter-ms", type=float, default=20)
+    parser.add_argument("--slow-shard-ms", type=float, default=0)
+    parser.add_argument("--timeout", type=float, default=10)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,207 @@
+"""End-to-end streaming benchmark against a fake MTProto media session.
+
+Runs ``ByteStreamer.prefetch_stream`` directly and/or the full
+``media_streamer`` route handler over a ``FakeMediaSession`` for every
+combination of chunk size and parallelism, and reports time-to-first-byte,
+sustained MB/s, p99 GetFile latency and CPU seconds per GB streamed.
+``adaptive`` mode leaves chunk size and depth to the bandwidth model and
+streams the file ``--repeat`` times so its convergence is visible.
+
+    python -m benchmarks.bench_streaming --size-mb 256 --latency-ms 40 \\
+        --jitter-ms 30 --bandwidth-mbps 60 --chunk-kb 256 512 1024 \\
+        --parallelism 2 4 8 16 --mode all
+
+Pass ``--file`` to serve real bytes from a local file instead of zeros,
+``--timeout-rate`` / ``--flood-rate`` to inject failures, and ``--clients`` /
+``--stripe`` to register several bots (each with its own link) and spread
+each ``media_streamer`` stream over them.
+"""
+import argparse
+import asyncio
+import time
+
+from starlette.requests import Request
+
+from Backend import db
+from Backend.config import Telegram
+from Backend.helper.bandwidth import bandwidth_model
+from Backend.helper.chunk_cache import chunk_cache
+from Backend.helper.custom_dl import ByteStreamer
+from Backend.helper.disk_cache import disk_chunk_cache
+from Backend.helper.file_resolver import file_id_resolver
+from Backend.fastapi.routes import stream_routes
+from Backend.pyrofork.bot import multi_clients, work_loads, client_dc_map, client_failures
+from benchmarks.fake_session import FakeClient, FakeMediaSession, fake_file_id
+
+CHAT_ID = -1001234567890
+MSG_ID = 1
+DC_ID = 2
+
+
+async def _noop(*args, **kwargs):
+    return None
+
+
+def _request(path: str = "/dl/bench/bench/benchmark.mkv", range_header: str = "bytes=0-") -> Request:
+    async def receive():
+        # Never report a disconnect; is_disconnected() polls with a cancelled scope.
+        await asyncio.Event().wait()
+
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "headers": [(b"range", range_header.encode())],
+        "client": ("127.0.0.1", 0),
+        "server": ("127.0.0.1", 8000),
+        "scheme": "http",
+        "path_params": {"name": "benchmark.mkv"},
+    }
+    return Request(scope, receive)
+
+
+async def _drain(body, started: float):
+    ttfb = None
+    received = 0
+    async for part in body:
+        if ttfb is None:
+            ttfb = time.perf_counter() - started
+        received += len(part)
+    return received, ttfb or 0.0
+
+
+async def run_prefetch(streamer, file_id, chunk_size: int, parallelism: int):
+    started = time.perf_counter()
+    body = await streamer.prefetch_stream(
+        file_id=file_id,
+        client_index=0,
+        start=0,
+        end=file_id.file_size - 1,
+        chunk_size=chunk_size,
+        prefetch=parallelism,
+        parallelism=parallelism,
+    )
+    return await _drain(body, started)
+
+
+async def run_media_streamer(chunk_size: int = 0, parallelism: int = 0, stripe: int = 1):
+    # media_streamer asks the bandwidth model for chunk size and depth; pin
+    # them for matrix rows and restore the real planner for adaptive runs.
+    if chunk_size:
+        bandwidth_model.plan = lambda *_: (chunk_size, parallelism)
+    else:
+        vars(bandwidth_model).pop("plan", None)
+    Telegram.STRIPE_CLIENTS = stripe
+
+    started = time.perf_counter()
+    response = await stream_routes.media_streamer(
+        request=_request(),
+        chat_id=CHAT_ID,
+        msg_id=MSG_ID,
+        secure_hash="SKIP_HASH_CHECK",
+        token="benchmark",
+        token_data=None,
+    )
+    return await _drain(response.body_iterator, started)
+
+
+async def main(args):
+    sessions = [
+        FakeMediaSession(
+            file_size=args.size_mb * 1024 * 1024,
+            path=args.file,
+            latency=args.latency_ms / 1000,
+            jitter=args.jitter_ms / 1000,
+            bandwidth_mbps=args.bandwidth_mbps,
+            timeout_rate=args.timeout_rate,
+            flood_rate=args.flood_rate,
+            flood_wait=args.flood_wait,
+            seed=args.seed + index,
+        )
+        for index in range(args.clients)
+    ]
+    session = sessions[0]
+
+    # Measure the fetch pipeline, not the caches or the database.
+    chunk_cache.max_bytes = 0
+    disk_chunk_cache.max_bytes = 0
+    db.log_stream_stats = _noop
+    db.update_token_usage = _noop
+
+    for index, fake_session in enumerate(sessions):
+        client = FakeClient(fake_session, dc_id=DC_ID)
+        multi_clients[index], work_loads[index], client_dc_map[index] = client, 0, DC_ID
+        file_id = fake_file_id(session.file_size, dc_id=DC_ID, chat_id=CHAT_ID, msg_id=MSG_ID)
+        file_id_resolver._store((index, CHAT_ID, MSG_ID), file_id)
+        stream_routes._streamer_by_client[client] = ByteStreamer(client, index)
+    streamer = stream_routes._streamer_by_client[multi_clients[0]]
+
+    modes = ["prefetch", "streamer", "adaptive"] if args.mode == "all" else [args.mode]
+    print(
+        f"{session.file_size / (1024 * 1024):.0f} MB from {args.file or 'memory'}, "
+        f"latency {args.latency_ms} ms +/- {args.jitter_ms} ms, "
+        f"bandwidth {args.bandwidth_mbps or 'unlimited'} MB/s, "
+        f"timeouts {args.timeout_rate:.1%}, flood waits {args.flood_rate:.1%}, "
+        f"{args.clients} client(s), stripe {args.stripe}"
+    )
+    print(
+        f"{'mode':<10}{'chunk KB':>9}{'parallel':>9}{'ttfb ms':>10}{'MB/s':>9}"
+        f"{'p99 ms':>9}{'cpu s/GB':>10}{'calls':>8}{'errors':>8}"
+    )
+    for mode in modes:
+        if mode == "adaptive":
+            runs = [(0, 0)] * args.repeat
+        else:
+            runs = [(kb * 1024, p) for kb in args.chunk_kb for p in args.parallelism]
+        for chunk_size, parallelism in runs:
+            for fake_session in sessions:
+                fake_session.reset_stats()
+            client_failures.clear()
+            cpu_started = time.process_time()
+            wall_started = time.perf_counter()
+            if mode == "prefetch":
+                received, ttfb = await run_prefetch(streamer, file_id, chunk_size, parallelism)
+            else:
+                received, ttfb = await run_media_streamer(chunk_size, parallelism, args.stripe)
+            wall = time.perf_counter() - wall_started
+            cpu = time.process_time() - cpu_started
+            if mode == "adaptive":
+                chunk_size, parallelism = bandwidth_model.plan(0, DC_ID)
+
+            if received != session.file_size:
+                print(f"  short read: {received} of {session.file_size} bytes")
+            gb = max(received, 1) / (1024 ** 3)
+            latencies = sorted(lat for fake_session in sessions for lat in fake_session.latencies)
+            p99 = latencies[min(len(latencies) - 1, len(latencies) * 99 // 100)] if latencies else 0.0
+            calls = sum(fake_session.calls for fake_session in sessions)
+            errors = sum(fake_session.timeouts + fake_session.flood_waits for fake_session in sessions)
+            print(
+                f"{mode:<10}{chunk_size // 1024:>9}{parallelism:>9}{ttfb * 1000:>10.1f}"
+                f"{received / (1024 * 1024) / wall:>9.1f}{p99 * 1000:>9.1f}"
+                f"{cpu / gb:>10.2f}{calls:>8}{errors:>8}"
+            )
+
+    for fake_session in sessions:
+        fake_session.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--file", help="serve GetFile from this local file instead of zeros")
+    parser.add_argument("--size-mb", type=int, default=128)
+    parser.add_argument("--latency-ms", type=float, default=30.0)
+    parser.add_argument("--jitter-ms", type=float, default=20.0)
+    parser.add_argument("--bandwidth-mbps", type=float, default=0.0, help="0 = unlimited")
+    parser.add_argument("--timeout-rate", type=float, default=0.0)
+    parser.add_argument("--flood-rate", type=float, default=0.0)
+    parser.add_argument("--flood-wait", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--clients", type=int, default=1, help="fake bots, each with its own link")
+    parser.add_argument("--stripe", type=int, default=1, help="STRIPE_CLIENTS for media_streamer runs")
+    parser.add_argument("--chunk-kb", type=int, nargs="+", default=[256, 512, 1024])
+    parser.add_argument("--parallelism", type=int, nargs="+", default=[2, 4, 8, 16])
+    parser.add_argument("--repeat", type=int, default=3, help="streams per adaptive run")
+    parser.add_argument("--mode", choices=["prefetch", "streamer", "adaptive", "all"], default="all")
+    asyncio.run(main(parser.parse_args()))
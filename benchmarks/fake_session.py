@@ -0,0 +1,164 @@
+"""In-process stand-ins for a pyrogram Client and its media Session.
+
+``FakeMediaSession`` answers ``upload.GetFile`` like a Telegram media DC
+would, with configurable latency, jitter, bandwidth, timeout rate and
+FloodWait injection. Bytes come from a local file when one is given,
+otherwise from a zero-filled payload of ``file_size`` bytes.
+
+It plugs into the real streaming code through ``client.media_sessions``:
+``ByteStreamer._get_media_session`` returns an existing session for a DC
+before it ever tries to dial Telegram, so a ``FakeClient`` whose
+``media_sessions`` are pre-populated keeps the whole pipeline local.
+"""
+import asyncio
+import os
+import random
+import time
+from types import SimpleNamespace
+from typing import List, Optional
+
+from pyrogram.errors import FloodWait
+from pyrogram.file_id import FileId, FileType
+
+
+class FakeMediaSession:
+    """Stand-in for ``pyrogram.session.Session`` serving ``upload.GetFile``.
+
+    * ``latency`` / ``jitter`` - seconds of round-trip delay per request,
+      plus a uniform random extra of up to ``jitter`` seconds.
+    * ``bandwidth_mbps`` - the session's link speed in MB/s. Concurrent
+      requests share it, so transfers queue behind each other like they
+      would on one TCP connection. ``0`` means unlimited.
+    * ``timeout_rate`` - probability that a request fails with
+      ``asyncio.TimeoutError`` after its latency has elapsed.
+    * ``flood_rate`` / ``flood_wait`` - probability that a request raises
+      ``FloodWait`` asking the caller to wait ``flood_wait`` seconds.
+    """
+
+    def __init__(
+        self,
+        file_size: Optional[int] = None,
+        path: Optional[str] = None,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        bandwidth_mbps: float = 0.0,
+        timeout_rate: float = 0.0,
+        flood_rate: float = 0.0,
+        flood_wait: int = 1,
+        seed: int = 0,
+    ):
+        if path is None and file_size is None:
+            raise ValueError("FakeMediaSession needs a file_size or a path")
+        self.path = path
+        self.file_size = os.path.getsize(path) if path else file_size
+        self.latency = latency
+        self.jitter = jitter
+        self.bandwidth = bandwidth_mbps * 1024 * 1024
+        self.timeout_rate = timeout_rate
+        self.flood_rate = flood_rate
+        self.flood_wait = flood_wait
+        self._rng = random.Random(seed)
+        self._fd = os.open(path, os.O_RDONLY) if path else None
+        self._block = b""
+        self._link_free_at = 0.0
+
+        self.calls = 0
+        self.timeouts = 0
+        self.flood_waits = 0
+        self.bytes_sent = 0
+        self.latencies: List[float] = []
+
+    def close(self) -> None:
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def _read(self, offset: int, limit: int) -> bytes:
+        length = max(0, min(limit, self.file_size - offset))
+        if self._fd is not None:
+            return os.pread(self._fd, length, offset)
+        if len(self._block) < length:
+            self._block = bytes(length)
+        return self._block[:length]
+
+    async def send(self, query, *args, **kwargs):
+        self.calls += 1
+        started = time.perf_counter()
+
+        delay = self.latency + (self._rng.uniform(0, self.jitter) if self.jitter else 0.0)
+        await asyncio.sleep(delay)
+
+        roll = self._rng.random()
+        if roll < self.flood_rate:
+            self.flood_waits += 1
+            raise FloodWait(value=self.flood_wait)
+        if roll < self.flood_rate + self.timeout_rate:
+            self.timeouts += 1
+            raise asyncio.TimeoutError
+
+        data = self._read(query.offset, query.limit)
+        if self.bandwidth and data:
+            now = time.perf_counter()
+            self._link_free_at = max(self._link_free_at, now) + len(data) / self.bandwidth
+            await asyncio.sleep(self._link_free_at - now)
+
+        self.bytes_sent += len(data)
+        self.latencies.append(time.perf_counter() - started)
+        return SimpleNamespace(bytes=data)
+
+    def percentile(self, pct: float) -> float:
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+    def reset_stats(self) -> None:
+        self.calls = self.timeouts = self.flood_waits = self.bytes_sent = 0
+        self.latencies.clear()
+
+
+class _FakeStorage:
+    def __init__(self, dc_id: int):
+        self._dc_id = dc_id
+
+    async def dc_id(self) -> int:
+        return self._dc_id
+
+    async def test_mode(self) -> bool:
+        return False
+
+    async def auth_key(self) -> bytes:
+        return b"\x00" * 256
+
+
+class FakeClient:
+    """Just enough of ``pyrogram.Client`` for ByteStreamer's streaming path."""
+
+    def __init__(self, session: FakeMediaSession, dc_id: int = 2):
+        self.storage = _FakeStorage(dc_id)
+        # Every DC maps to the fake session so pre-warming never dials out.
+        self.media_sessions = {dc: session for dc in (1, 2, 3, 4, 5)}
+
+
+def fake_file_id(
+    file_size: int,
+    dc_id: int = 2,
+    media_id: int = 1,
+    chat_id: Optional[int] = None,
+    msg_id: Optional[int] = None,
+) -> FileId:
+    file_id = FileId(
+        file_type=FileType.DOCUMENT,
+        dc_id=dc_id,
+        media_id=media_id,
+        access_hash=0,
+        file_reference=b"",
+    )
+    file_id.file_size = file_size
+    file_id.file_name = "benchmark.mkv"
+    file_id.mime_type = "video/x-matroska"
+    file_id.unique_id = "benchm"
+    if chat_id is not None and msg_id is not None:
+        file_id.source_chat_id = chat_id
+        file_id.source_msg_id = msg_id
+    return file_id
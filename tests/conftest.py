@@ -0,0 +1,4 @@
+import os
+
+# Importing Backend needs two DATABASE URIs; nothing here ever connects.
+os.environ.setdefault("DATABASE", "mongodb://127.0.0.1:27017,mongodb://127.0.0.1:27017")
@@ -0,0 +1,19 @@
+from Backend.config import Telegram
+from Backend.helper.bandwidth import BandwidthModel, bandwidth_model
+from Backend.helper.chunk_cache import chunk_cache
+
+
+def _feed(model, client_index, chunk_size, latency, count=50):
+    for _ in range(count):
+        size, _ = model.plan(client_index, 2)
+        model.observe(client_index, 2, size or chunk_size, latency)
+
+
+def test_slow_link_gets_small_chunks_with_the_default_config():
+    assert chunk_cache.enabled  # CHUNK_CACHE_MB defaults to 256
+    model = BandwidthModel(Telegram.PRE_FETCH, Telegram.MAX_PRE_FETCH)
+    assert model.plan(0, 2)[0] == bandwidth_model.plan(-99, 2)[0] == BandwidthModel.DEFAULT_CHUNK
+    _feed(model, 0, BandwidthModel.DEFAULT_CHUNK, latency=0.05)   # fast link
+    _feed(model, 1, BandwidthModel.DEFAULT_CHUNK, latency=2.0)    # slow link
+    assert model.plan(0, 2)[0] == BandwidthModel.MAX_CHUNK
+    assert model.plan(1, 2)[0] < BandwidthModel.DEFAULT_CHUNK
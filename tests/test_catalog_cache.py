@@ -0,0 +1,29 @@
+import asyncio
+
+from Backend.helper.catalog_cache import CatalogCache
+
+
+def test_waiters_survive_a_cancelled_leader():
+    cache = CatalogCache(ttl=60)
+    calls = []
+
+    async def build(skip):
+        calls.append(skip)
+        await asyncio.sleep(0.05)
+        return b'{"metas": []}'
+
+    def page():
+        return cache.get(("movie", "latest", 0), build, 0)
+
+    async def scenario():
+        leader = asyncio.create_task(page())
+        await asyncio.sleep(0)
+        waiters = [asyncio.create_task(page()) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        return leader, await asyncio.gather(*waiters)
+
+    leader, results = asyncio.run(scenario())
+    assert leader.cancelled()
+    assert results == [b'{"metas": []}'] * 3
+    assert len(calls) == 2
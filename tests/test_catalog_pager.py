@@ -0,0 +1,113 @@
+import asyncio
+import random
+
+from pymongo import DESCENDING
+
+from Backend.helper import database as database_module
+from Backend.helper.catalog_pager import CATALOG_WALK_BATCH, CatalogPager, sort_key
+from Backend.helper.database import Database
+
+
+def test_invalidate_drops_positions_and_counts_of_that_collection():
+    pager = CatalogPager(count_ttl=300)
+    movies = pager.scope("movie", {}, "rating", -1)
+    shows = pager.scope("tv", {}, "rating", -1)
+    for scope in (movies, shows):
+        pager.remember(scope, 20, (7.5, "id20"))
+        pager.store_count(pager.scope(scope.split("|")[0], {}), 100)
+
+    pager.invalidate("movie")
+
+    assert pager.lookup(movies, 20) == (0, None)
+    assert pager.cached_count(pager.scope("movie", {})) is None
+    assert pager.lookup(shows, 20) == (20, (7.5, "id20"))
+    assert pager.cached_count(pager.scope("tv", {})) == 100
+
+
+def _matches(doc, query):
+    for key, cond in query.items():
+        if key == "$and":
+            if not all(_matches(doc, q) for q in cond):
+                return False
+        elif key == "$or":
+            if not any(_matches(doc, q) for q in cond):
+                return False
+        else:
+            value = doc.get(key)
+            if isinstance(cond, dict):
+                for op, bound in cond.items():
+                    if op == "$ne" and value == bound:
+                        return False
+                    if op == "$gt" and (value is None or not value > bound):
+                        return False
+                    if op == "$lt" and (value is None or not value < bound):
+                        return False
+            elif value != cond:
+                return False
+    return True
+
+
+class _Cursor:
+    def __init__(self, shard, docs):
+        self.shard, self.docs = shard, docs
+
+    def sort(self, keys):
+        (field, direction), _ = keys
+        self.docs.sort(key=lambda doc: sort_key(doc, field), reverse=direction == DESCENDING)
+        return self
+
+    def limit(self, n):
+        self.docs = self.docs[:n]
+        return self
+
+    async def to_list(self, length):
+        self.shard.read += len(self.docs)
+        return self.docs
+
+
+class _Shard:
+    """Storage DB with one collection that counts the documents it returns."""
+
+    def __init__(self, docs):
+        self.docs, self.read = docs, 0
+
+    def __getitem__(self, name):
+        return self
+
+    def find(self, query):
+        return _Cursor(self, [doc for doc in self.docs if _matches(doc, query)])
+
+    async def count_documents(self, query):
+        return sum(_matches(doc, query) for doc in self.docs)
+
+
+def test_deep_cold_skip_reads_a_bounded_batch_per_shard(monkeypatch):
+    rng = random.Random(0)
+    shards = {
+        i: _Shard([{"_id": f"{i}-{n:04d}", "rating": rng.choice([None, *range(10)])} for n in range(1500)])
+        for i in (1, 2, 3)
+    }
+    database = Database()
+    database.dbs = {f"storage_{i}": shard for i, shard in shards.items()}
+    database.current_db_index = 3
+    pager = CatalogPager(count_ttl=300)
+    monkeypatch.setattr(database_module, "catalog_pager", pager)
+
+    page, page_size = 101, 20
+    results, _, total = asyncio.run(
+        database._paginate_collection("movie", {"rating": DESCENDING}, page, page_size)
+    )
+
+    ordered = sorted(
+        (doc for shard in shards.values() for doc in shard.docs),
+        key=lambda doc: sort_key(doc, "rating"), reverse=True,
+    )
+    skip = (page - 1) * page_size
+    assert total == 4500
+    assert results == ordered[skip:skip + page_size]
+    for i, shard in shards.items():
+        contributed = sum(doc["_id"].startswith(f"{i}-") for doc in ordered[:skip + page_size])
+        assert shard.read <= contributed + CATALOG_WALK_BATCH
+    # Every page boundary passed on the way is remembered.
+    scope = pager.scope("movie", {}, "rating", DESCENDING)
+    assert pager.lookup(scope, 40 * page_size)[0] == 40 * page_size
@@ -0,0 +1,74 @@
+import asyncio
+
+from Backend.helper import chunk_cache
+from Backend.helper.chunk_cache import BLOCK_SIZE, ChunkCache
+
+KB = 1024
+FILE = bytes(range(256)) * (BLOCK_SIZE // 256) + b"tail"
+
+
+def _fetcher(calls, offset, size):
+    async def fetch():
+        calls.append((offset, size))
+        return FILE[offset:offset + size]
+    return fetch
+
+
+def test_small_chunks_assemble_a_block_that_whole_block_readers_share():
+    cache = ChunkCache(8 * BLOCK_SIZE)
+    calls = []
+
+    async def scenario():
+        parts = [
+            await cache.read_range(1, off, 256 * KB, _fetcher(calls, off, 256 * KB))
+            for off in range(0, BLOCK_SIZE, 256 * KB)
+        ]
+        whole = await cache.read_range(1, 0, BLOCK_SIZE, _fetcher(calls, 0, BLOCK_SIZE))
+        middle = await cache.read_range(1, 512 * KB, 128 * KB, _fetcher(calls, 512 * KB, 128 * KB))
+        return parts, whole, middle
+
+    parts, whole, middle = asyncio.run(scenario())
+    assert b"".join(parts) == whole == FILE[:BLOCK_SIZE]
+    assert bytes(middle) == FILE[512 * KB:640 * KB]
+    assert len(calls) == 4  # only the 256 KB parts went to Telegram
+
+
+def test_short_last_part_ends_its_block():
+    cache = ChunkCache(8 * BLOCK_SIZE)
+    calls = []
+
+    async def scenario():
+        await cache.read_range(1, BLOCK_SIZE, 64 * KB, _fetcher(calls, BLOCK_SIZE, 64 * KB))
+        return await cache.read_range(1, BLOCK_SIZE, BLOCK_SIZE, _fetcher(calls, BLOCK_SIZE, BLOCK_SIZE))
+
+    assert asyncio.run(scenario()) == b"tail"
+    assert len(calls) == 1
+
+
+class _SlowDisk:
+    enabled = True
+
+    def __init__(self):
+        self.written = []
+
+    async def read(self, key):
+        return None
+
+    async def write(self, key, data):
+        await asyncio.sleep(0.05)
+        self.written.append(key)
+
+
+def test_disk_write_is_held_until_it_finishes():
+    cache = ChunkCache(8 * BLOCK_SIZE)
+    disk = _SlowDisk()
+
+    async def scenario():
+        await cache.read_range(1, 0, BLOCK_SIZE, _fetcher([], 0, BLOCK_SIZE), disk)
+        pending = len(chunk_cache._writes)
+        await asyncio.sleep(0.1)
+        return pending
+
+    assert asyncio.run(scenario()) == 1
+    assert disk.written == [(1, 0, BLOCK_SIZE)]
+    assert not chunk_cache._writes
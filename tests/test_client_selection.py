@@ -0,0 +1,36 @@
+from Backend.helper import client_selection
+from Backend.helper.bandwidth import BandwidthModel
+from Backend.pyrofork.bot import work_loads
+
+MB = 1024 * 1024
+DC_ID = 2
+
+
+def _run(model, now, client_index, link_mbps, base_latency, streams, seconds):
+    """Feed ``seconds`` of a saturated link: ``streams`` streams share ``link_mbps``."""
+    start = now[0]
+    while now[0] < start + seconds:
+        depth = model.plan(client_index, DC_ID)[1]
+        latency = base_latency + streams * depth / link_mbps
+        for _ in range(round(link_mbps * 0.1)):
+            model.observe(client_index, DC_ID, MB, latency)
+        now[0] += 0.1
+
+
+def test_busy_fast_bot_has_less_headroom_than_idle_slow_bot(monkeypatch):
+    now = [0.0]
+    model = BandwidthModel(initial_depth=2, max_depth=16)
+    model.clock = lambda: now[0]
+    monkeypatch.setattr(client_selection, "bandwidth_model", model)
+    monkeypatch.setitem(work_loads, 0, 4)
+    monkeypatch.setitem(work_loads, 1, 0)
+
+    # Bot 1 streamed at its 10 MB/s for a while and has been idle since;
+    # bot 0 is moving all of its 40 MB/s for four streams right now.
+    _run(model, now, 1, link_mbps=10, base_latency=0.1, streams=1, seconds=10)
+    _run(model, now, 0, link_mbps=40, base_latency=0.05, streams=4, seconds=10)
+
+    busy, idle = client_selection.headroom(0, DC_ID), client_selection.headroom(1, DC_ID)
+    assert busy < client_selection.MIN_HEADROOM_MBPS
+    assert idle > 5
+    assert client_selection.pick_client([0, 1], DC_ID) == 1
@@ -0,0 +1,101 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from Backend import db
+from Backend.config import Telegram
+from Backend.helper import custom_dl
+from Backend.helper.custom_dl import ByteStreamer
+from Backend.pyrofork.bot import client_session_keys
+from benchmarks.fake_session import FakeClient, FakeMediaSession
+
+CLIENT_INDEX = 7
+HOME_DC = 2
+DC_ID = 4
+
+
+class _Session:
+    """Media session whose start never finishes on a stale key."""
+
+    started = []
+    stopped = []
+
+    def __init__(self, client, dc, auth_key, test_mode, is_media=False):
+        self.client, self.auth_key, self.connection = client, auth_key, None
+
+    async def start(self):
+        self.connection = object()
+        if self.auth_key == b"stale":
+            await asyncio.sleep(3600)
+        self.started.append(self.auth_key)
+
+    async def stop(self):
+        self.stopped.append(self.auth_key)
+
+    async def send(self, query, *args, **kwargs):
+        return await self.client.import_result(query)
+
+
+class _Auth:
+    def __init__(self, client, dc, test_mode):
+        pass
+
+    async def create(self):
+        return b"fresh"
+
+
+@pytest.fixture
+def streamer(monkeypatch):
+    saved = []
+
+    async def get_bot_session(key):
+        return {"media_auth_keys": {str(DC_ID): b"stale"}}
+
+    async def save_media_auth_key(key, dc_id, auth_key):
+        saved.append((key, dc_id, auth_key))
+
+    async def invoke(query):
+        return SimpleNamespace(id=1, bytes=b"")
+
+    async def import_result(query):
+        return True
+
+    monkeypatch.setattr(Telegram, "PERSIST_BOT_SESSIONS", True)
+    monkeypatch.setattr(custom_dl, "STORED_KEY_TIMEOUT", 0.05)
+    monkeypatch.setattr(custom_dl, "Session", _Session)
+    monkeypatch.setattr(custom_dl, "Auth", _Auth)
+    monkeypatch.setattr(db, "get_bot_session", get_bot_session)
+    monkeypatch.setattr(db, "save_media_auth_key", save_media_auth_key)
+    monkeypatch.setitem(client_session_keys, CLIENT_INDEX, "bot")
+    monkeypatch.setattr(_Session, "started", [])
+    monkeypatch.setattr(_Session, "stopped", [])
+    monkeypatch.setattr(ByteStreamer, "_instances", dict(ByteStreamer._instances))
+
+    client = FakeClient(FakeMediaSession(file_size=1), dc_id=HOME_DC)
+    client.media_sessions.pop(DC_ID)
+    client.invoke = invoke
+    client.import_result = import_result
+    return ByteStreamer(client, CLIENT_INDEX), saved
+
+
+def test_stored_key_that_never_connects_falls_back_to_a_fresh_key(streamer):
+    streamer, saved = streamer
+    session = asyncio.run(streamer.get_dc_session(DC_ID))
+    assert session.auth_key == b"fresh"
+    assert _Session.stopped == [b"stale"]
+    assert saved == [("bot", DC_ID, None), ("bot", DC_ID, b"fresh")]
+
+
+def test_failed_import_does_not_cache_the_session(streamer):
+    streamer, saved = streamer
+
+    async def import_result(query):
+        raise RuntimeError("AUTH_BYTES_NOT_EXPORTED")
+
+    streamer.client.import_result = import_result
+    with pytest.raises(RuntimeError):
+        asyncio.run(streamer.get_dc_session(DC_ID))
+    assert _Session.stopped == [b"stale", b"fresh"]
+    assert DC_ID not in streamer.client.media_sessions
+    assert saved == [("bot", DC_ID, None)]
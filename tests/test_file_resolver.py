@@ -0,0 +1,34 @@
+import asyncio
+
+from Backend.helper import file_resolver
+from Backend.helper.file_resolver import FileIdResolver
+from Backend.pyrofork.bot import multi_clients
+from benchmarks.fake_session import fake_file_id
+
+
+def test_waiters_survive_a_cancelled_leader(monkeypatch):
+    calls = []
+
+    async def slow_get_file_ids(client, chat_id, msg_id):
+        calls.append(msg_id)
+        await asyncio.sleep(0.05)
+        return fake_file_id(1024)
+
+    monkeypatch.setattr(file_resolver, "get_file_ids", slow_get_file_ids)
+    monkeypatch.setitem(multi_clients, 0, object())
+    resolver = FileIdResolver(ttl=60, max_entries=10, store_ttl=0)
+
+    async def scenario():
+        leader = asyncio.create_task(resolver.resolve(0, -100, 1))
+        await asyncio.sleep(0)
+        waiters = [asyncio.create_task(resolver.resolve(0, -100, 1)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        results = await asyncio.gather(*waiters)
+        return leader, results
+
+    leader, results = asyncio.run(scenario())
+    assert leader.cancelled()
+    assert all(r.source_msg_id == 1 for r in results)
+    # One waiter took over; the others joined its lookup.
+    assert len(calls) == 2
@@ -0,0 +1,29 @@
+import asyncio
+
+from Backend.helper.probe_cache import ProbeCache
+
+
+def test_waiters_survive_a_cancelled_leader():
+    cache = ProbeCache(64 * 1024 * 1024)
+    calls = []
+
+    async def fetch(offset, limit):
+        calls.append(offset)
+        await asyncio.sleep(0.05)
+        return bytes(range(256)) * (limit // 256)
+
+    def read():
+        return cache.read(1, 100 * 1024 * 1024, 0, 1, fetch)
+
+    async def scenario():
+        leader = asyncio.create_task(read())
+        await asyncio.sleep(0)
+        waiters = [asyncio.create_task(read()) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        return leader, await asyncio.gather(*waiters)
+
+    leader, results = asyncio.run(scenario())
+    assert leader.cancelled()
+    assert results == [b"\x00\x01"] * 3
+    assert len(calls) == 2
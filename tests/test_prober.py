@@ -0,0 +1,47 @@
+import asyncio
+
+from Backend.config import Telegram
+from Backend.helper import prober
+from Backend.helper.bandwidth import BandwidthModel
+from Backend.helper.prober import PING_BYTES, ClientProber
+
+DC_ID = 4
+
+
+def _prober(monkeypatch, clients, budget_bytes):
+    model = BandwidthModel(Telegram.PRE_FETCH, Telegram.MAX_PRE_FETCH)
+    monkeypatch.setattr(prober, "bandwidth_model", model)
+    monkeypatch.setattr(prober, "multi_clients", {idx: None for idx in clients})
+    probe = ClientProber(interval=120, budget_bytes=budget_bytes)
+    probe._references[DC_ID] = (-100, 1)
+    sent = {}
+
+    async def fake_probe(client_index, chat_id, msg_id, size=None):
+        sent[client_index] = size
+        link = probe._links.setdefault((client_index, DC_ID), prober._LinkProbes())
+        probe._record(client_index, DC_ID, link, 0.05, size, 0.1)
+
+    probe.probe = fake_probe
+    return probe, model, sent
+
+
+def test_round_stays_within_budget_shrinking_then_pinging(monkeypatch):
+    chunk = BandwidthModel.DEFAULT_CHUNK
+    probe, _, sent = _prober(monkeypatch, range(4), budget_bytes=chunk + chunk // 2 + 4 * PING_BYTES)
+    asyncio.run(probe.probe_round())
+    assert sorted(sent.values()) == [0, 0, chunk // 2, chunk]
+    assert probe.round_bytes <= probe.budget_bytes
+
+
+def test_links_with_organic_samples_are_skipped(monkeypatch):
+    probe, model, sent = _prober(monkeypatch, range(2), budget_bytes=0)
+    asyncio.run(probe.probe_round())
+    assert set(sent) == {0, 1}
+
+    sent.clear()
+    now = model.clock()
+    model.clock = lambda: now + 10.0
+    model.observe(1, DC_ID, BandwidthModel.DEFAULT_CHUNK, 0.1)   # a real stream on client 1
+    asyncio.run(probe.probe_round())
+    assert set(sent) == {0}
+    assert probe.skipped_organic == 1
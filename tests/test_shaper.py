@@ -0,0 +1,34 @@
+import asyncio
+
+from Backend.helper.shaper import MB, BandwidthShaper
+
+
+def _token(rate_mbps):
+    return {"limits": {"rate_limit_mbps": rate_mbps}}
+
+
+def test_unlimited_tokens_get_at_least_the_largest_capped_share():
+    shaper = BandwidthShaper(total_mbps=12, default_mbps=0)
+    flows = [shaper.flow(token, _token(rate)) for token, rate in (("a", 5), ("b", 10), ("c", 0))]
+    for flow in flows:
+        flow.open()
+    rates = [flow.bucket.rate / MB for flow in flows]
+    assert rates == [12 * 5 / 25, 12 * 10 / 25, 12 * 10 / 25]
+
+
+def test_first_burst_is_not_delayed():
+    shaper = BandwidthShaper(total_mbps=0, default_mbps=2)
+    flow = shaper.flow("a", None)
+    flow.open()
+    assert asyncio.run(flow.throttle(2 * MB)) == 0.0  # one second at the rate
+    assert asyncio.run(flow.throttle(MB)) > 0
+
+
+def test_unsent_response_takes_no_share():
+    shaper = BandwidthShaper(total_mbps=10, default_mbps=0)
+    shaper.flow("a", None)  # response built but never iterated
+    flow = shaper.flow("b", None)
+    flow.open()
+    assert flow.bucket.rate == 10 * MB
+    flow.close()
+    assert shaper.stats()["tokens"] == []
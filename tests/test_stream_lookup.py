@@ -0,0 +1,57 @@
+import asyncio
+
+from Backend import db
+from Backend.helper.catalog_cache import catalog_cache
+
+STREAM_ID = "abc123"
+MOVIE = {"_id": 1, "tmdb_id": 550, "title": "Fight Club", "telegram": [{"id": STREAM_ID}]}
+
+
+class _Collection:
+    def __init__(self, docs=()):
+        self.docs = {doc["_id"]: doc for doc in docs}
+
+    async def find_one(self, query):
+        for doc in self.docs.values():
+            if "_id" in query and doc["_id"] == query["_id"]:
+                return doc
+            if query.get("telegram.id") in [q["id"] for q in doc.get("telegram", [])]:
+                return doc
+            if "tmdb_id" in query and doc.get("tmdb_id") == query["tmdb_id"]:
+                return doc
+        return None
+
+    async def bulk_write(self, ops, ordered=True):
+        for op in ops:
+            self.docs[op._doc["_id"]] = op._doc
+
+    async def delete_many(self, query):
+        pass
+
+
+def _install(monkeypatch):
+    monkeypatch.setattr(db, "dbs", {
+        "tracking": {"streams": _Collection()},
+        "storage_1": {"movie": _Collection([MOVIE]), "tv": _Collection()},
+    })
+    monkeypatch.setattr(db, "current_db_index", 1)
+    monkeypatch.setattr(db, "streams_ready", False)
+
+
+def test_lazy_indexing_on_play_keeps_catalog_caches(monkeypatch):
+    _install(monkeypatch)
+    before = catalog_cache.invalidations
+
+    entry = asyncio.run(db.get_stream_entry(STREAM_ID))
+
+    assert entry["tmdb_id"] == 550 and entry["db_index"] == 1
+    assert catalog_cache.invalidations == before
+
+
+def test_reindex_after_an_edit_drops_catalog_caches(monkeypatch):
+    _install(monkeypatch)
+    before = catalog_cache.invalidations
+
+    asyncio.run(db._reindex_streams("movie", 1, 550))
+
+    assert catalog_cache.invalidations == before + 1
@@ -0,0 +1,207 @@
+import asyncio
+
+import httpx
+import pytest
+import uvicorn
+from fastapi import FastAPI, Request
+
+from Backend import db
+from Backend.fastapi.routes import stream_routes
+from Backend.helper import custom_dl
+from Backend.helper.chunk_cache import chunk_cache
+from Backend.helper.custom_dl import ByteStreamer
+from Backend.helper.disk_cache import disk_chunk_cache
+from Backend.helper.file_resolver import file_id_resolver
+from Backend.helper.playback import PlaybackSessions
+from Backend.helper.probe_cache import ProbeCache
+from Backend.helper.session_pool import MediaSessionPool
+from Backend.pyrofork.bot import multi_clients, work_loads, client_dc_map, client_failures
+from benchmarks.fake_session import FakeClient, FakeMediaSession, fake_file_id
+
+CHAT_ID = -1001234567890
+MSG_ID = 1
+DC_ID = 2
+MB = 1024 * 1024
+
+
+async def _noop(*args, **kwargs):
+    return None
+
+
+@pytest.fixture
+def bots(monkeypatch):
+    """Register fake bots serving one file; returns ``install(*sessions) -> [streamer]``."""
+    monkeypatch.setattr(chunk_cache, "max_bytes", 0)
+    monkeypatch.setattr(disk_chunk_cache, "max_bytes", 0)
+    monkeypatch.setattr(db, "log_stream_stats", _noop)
+    monkeypatch.setattr(db, "update_token_usage", _noop)
+    monkeypatch.setattr(custom_dl, "session_pool", MediaSessionPool(1, 60))
+    monkeypatch.setattr(stream_routes, "playback_sessions", PlaybackSessions(grace=0.5, max_readahead=8 * MB))
+    saved = [(r, dict(r)) for r in (multi_clients, work_loads, client_dc_map, client_failures, ByteStreamer._instances)]
+
+    def install(*sessions):
+        streamers = []
+        for index, session in enumerate(sessions):
+            client = FakeClient(session, dc_id=DC_ID)
+            multi_clients[index], work_loads[index], client_dc_map[index] = client, 0, DC_ID
+            file_id = fake_file_id(session.file_size, dc_id=DC_ID, chat_id=CHAT_ID, msg_id=MSG_ID)
+            file_id_resolver._store((index, CHAT_ID, MSG_ID), file_id)
+            streamers.append(ByteStreamer(client, index))
+        return streamers
+
+    yield install
+
+    file_id_resolver.clear()
+    for registry, contents in saved:
+        registry.clear()
+        registry.update(contents)
+
+
+async def _drain(body) -> bytes:
+    return b"".join([bytes(part) async for part in body])
+
+
+async def _http_get(range_header: str) -> httpx.Response:
+    """GET the test file through ``media_streamer`` over a real uvicorn/h11 connection."""
+    app = FastAPI()
+
+    @app.get("/dl/{name}")
+    async def dl(request: Request, name: str):
+        return await stream_routes.media_streamer(request, CHAT_ID, MSG_ID, "SKIP_HASH_CHECK", "token")
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=0, http="h11", log_level="warning"))
+    serving = asyncio.create_task(server.serve())
+    try:
+        while not server.started:
+            await asyncio.sleep(0.01)
+        port = server.servers[0].sockets[0].getsockname()[1]
+        async with httpx.AsyncClient(timeout=30) as client:
+            return await client.get(f"http://127.0.0.1:{port}/dl/test.mkv", headers={"Range": range_header})
+    finally:
+        server.should_exit = True
+        await serving
+
+
+class _FirstCallTimesOut(FakeMediaSession):
+    async def send(self, query, *args, **kwargs):
+        if not self.calls:
+            self.calls += 1
+            raise asyncio.TimeoutError
+        return await super().send(query, *args, **kwargs)
+
+
+def test_playback_keeps_the_lease_while_reading_ahead(bots):
+    session = FakeMediaSession(file_size=32 * MB, latency=0.02)
+    streamer, = bots(session)
+    playback = PlaybackSessions(grace=0.5, max_readahead=8 * MB).get("token", CHAT_ID, MSG_ID, session.file_size)
+
+    async def scenario():
+        file_id = await streamer.get_file_properties(CHAT_ID, MSG_ID)
+        body = await streamer.prefetch_stream(
+            file_id, 0, 0, 2 * MB - 1, chunk_size=MB, parallelism=2, playback=playback,
+        )
+        data = await _drain(body)
+        conn = custom_dl.session_pool._pools[(0, DC_ID)][0]
+        during = conn.streams
+        await asyncio.sleep(0.4)
+        return data, during, conn.streams, len(playback.parts)
+
+    data, during, after, warm_parts = asyncio.run(scenario())
+    assert len(data) == 2 * MB
+    assert during == 1  # read-ahead still runs on the request's session
+    assert warm_parts
+    assert after == 0
+
+
+def test_failed_probe_read_falls_back_to_streaming(bots, monkeypatch):
+    monkeypatch.setattr(stream_routes, "probe_cache", ProbeCache(64 * MB))
+    bots(_FirstCallTimesOut(file_size=32 * MB))
+
+    response = asyncio.run(_http_get("bytes=0-1"))
+    assert response.status_code == 206
+    assert response.content == b"\x00\x00"
+
+
+class _RecordingFlow:
+    def __init__(self, charged):
+        self.charged = charged
+
+    def open(self):
+        self.charged.append("open")
+
+    async def throttle(self, nbytes):
+        self.charged.append(nbytes)
+        return 0.0
+
+    def close(self):
+        self.charged.append("close")
+
+
+def test_probe_cache_response_counts_as_token_traffic(bots, monkeypatch):
+    usage, charged = [], []
+
+    async def update_token_usage(token, nbytes):
+        usage.append((token, nbytes))
+
+    monkeypatch.setattr(stream_routes, "probe_cache", ProbeCache(64 * MB))
+    monkeypatch.setattr(db, "update_token_usage", update_token_usage)
+    monkeypatch.setattr(stream_routes.bandwidth_shaper, "flow", lambda token, data: _RecordingFlow(charged))
+    bots(FakeMediaSession(file_size=32 * MB))
+
+    response = asyncio.run(_http_get("bytes=0-4095"))
+    assert response.status_code == 206
+    assert len(response.content) == 4096
+    assert charged == ["open", 4096, "close"]
+    assert usage == [("token", 4096)]
+
+
+def test_failover_lane_leases_its_session(bots):
+    failing = FakeMediaSession(file_size=32 * MB, timeout_rate=1.0)
+    streamer, _ = bots(failing, FakeMediaSession(file_size=32 * MB))
+
+    async def scenario():
+        file_id = await streamer.get_file_properties(CHAT_ID, MSG_ID)
+        body = await streamer.prefetch_stream(file_id, 0, 0, 2 * MB - 1, chunk_size=MB, parallelism=2)
+        data = await _drain(body)
+        conns = custom_dl.session_pool._pools[(1, DC_ID)]
+        during = sum(conn.streams for conn in conns)
+        await asyncio.sleep(0.1)
+        return data, during, sum(conn.streams for conn in conns)
+
+    data, during, after = asyncio.run(scenario())
+    assert len(data) == 2 * MB
+    assert during <= 1
+    assert after == 0
+
+
+def test_stream_cut_short_by_failed_fetches_is_not_a_protocol_error(bots):
+    bots(FakeMediaSession(file_size=32 * MB, timeout_rate=1.0))
+
+    response = asyncio.run(_http_get(f"bytes={MB}-{3 * MB - 1}"))
+    assert response.status_code == 206
+    assert "content-length" not in response.headers
+    assert response.headers["content-range"] == f"bytes {MB}-{3 * MB - 1}/{32 * MB}"
+    assert len(response.content) < 2 * MB
+
+
+def test_lease_is_returned_when_the_body_fails_to_start(bots, monkeypatch):
+    session = FakeMediaSession(file_size=32 * MB)
+    streamer, = bots(session)
+
+    async def no_location(file_id):
+        raise ValueError("unsupported file type")
+
+    monkeypatch.setattr(ByteStreamer, "_get_location", staticmethod(no_location))
+
+    async def scenario():
+        file_id = await streamer.get_file_properties(CHAT_ID, MSG_ID)
+        unsent = await streamer.prefetch_stream(file_id, 0, 0, MB - 1, chunk_size=MB, parallelism=1)
+        body = await streamer.prefetch_stream(file_id, 0, 0, MB - 1, chunk_size=MB, parallelism=1)
+        with pytest.raises(ValueError):
+            await _drain(body)
+        await asyncio.sleep(0.05)
+        del unsent  # a response that was never sent
+        conns = custom_dl.session_pool._pools.get((0, DC_ID), [])
+        return sum(conn.streams for conn in conns), work_loads[0]
+
+    assert asyncio.run(scenario()) == (0, 0)
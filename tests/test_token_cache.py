@@ -0,0 +1,26 @@
+import asyncio
+
+from Backend.helper.token_cache import TokenCache
+
+
+def test_waiters_survive_a_cancelled_leader():
+    cache = TokenCache(ttl=60)
+    calls = []
+
+    async def load(token):
+        calls.append(token)
+        await asyncio.sleep(0.05)
+        return {"token": token}
+
+    async def scenario():
+        leader = asyncio.create_task(cache.token("abc", load))
+        await asyncio.sleep(0)
+        waiters = [asyncio.create_task(cache.token("abc", load)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        return leader, await asyncio.gather(*waiters)
+
+    leader, results = asyncio.run(scenario())
+    assert leader.cancelled()
+    assert results == [{"token": "abc"}] * 3
+    assert len(calls) == 2